@@ -0,0 +1,490 @@
+#!/usr/bin/env python3
+"""
+Alert engine - alerts derived from charger status transitions
+
+AlertEngine consumes status events (charger, status, time) - changes from
+the status feed, or repeats - and evaluates each rule against the
+charger's recent transitions:
+  - a rule with `count=1` fires when a charger enters one of its statuses
+    and resolves when the charger leaves them (Faulted, Offline, Maintenance),
+  - a windowed rule fires when a charger makes `count` matching transitions
+    within `window` seconds (flapping, repeated faults) and resolves once the
+    charger has been quiet for `window` seconds.
+A rule that fires while its alert is still open bumps that alert's count
+instead of opening another one, and a (charger, rule) pair that opened an
+alert less than `cooldown` seconds ago is rate-limited: a status alert is
+held back until the cooldown lapses and opens then if the charger is still
+in that status, so a re-fault is delayed rather than lost. The per-charger
+sliding windows are fixed-size deques of transition times, so each event
+costs a few dict lookups.
+
+Active alerts live in AlertStore, indexed by alert ID and by (charger,
+rule), so acknowledge and resolve are dict operations.
+
+    python alert_engine.py --events 1000000 --chargers 100000
+"""
+import argparse
+import itertools
+import json
+import threading
+import time
+from collections import Counter, deque
+
+import numpy as np
+import pandas as pd
+
+# Columns of AlertStore.frame(), in display order
+ALERT_COLUMNS = ['Alert ID', 'Charger ID', 'Site', 'Severity', 'Message', 'Count', 'Status', 'Created', 'Last Seen']
+
+
+class AlertRule:
+    """
+    Fires when a charger makes `count` transitions into `statuses` (None
+    means any status change) within `window` seconds
+    """
+
+    __slots__ = ('name', 'severity', 'message', 'statuses', 'count', 'window')
+
+    def __init__(self, name, severity, message, statuses=None, count=1, window=0):
+        self.name = name
+        self.severity = severity
+        self.message = message
+        self.statuses = frozenset(statuses) if statuses is not None else None
+        self.count = count
+        self.window = window
+
+    @property
+    def windowed(self):
+        return self.count > 1
+
+    def matches(self, status):
+        return self.statuses is None or status in self.statuses
+
+
+DEFAULT_RULES = [
+    AlertRule('faulted', 'ERROR', 'Charger reported a fault', ['Faulted']),
+    AlertRule('offline', 'ERROR', 'Charger stopped sending heartbeats', ['Offline']),
+    AlertRule('maintenance', 'WARNING', 'Maintenance required', ['Maintenance']),
+    AlertRule('repeated_faults', 'ERROR', 'Charger faulted repeatedly', ['Faulted'], count=3, window=3600),
+    AlertRule('flapping', 'WARNING', 'Charger status flapping', count=4, window=600),
+]
+
+
+def _stamp(at):
+    return time.strftime('%Y-%m-%d %H:%M', time.localtime(at))
+
+
+class Alert:
+    """One alert; `count` is how many times its rule fired while it was open"""
+
+    __slots__ = ('alert_id', 'charger_id', 'site', 'rule', 'severity', 'message',
+                 'opened', 'last_seen', 'count', 'acknowledged', 'resolved')
+
+    def __init__(self, alert_id, charger_id, site, rule, at):
+        self.alert_id = alert_id
+        self.charger_id = charger_id
+        self.site = site
+        self.rule = rule.name
+        self.severity = rule.severity
+        self.message = rule.message
+        self.opened = at
+        self.last_seen = at
+        self.count = 1
+        self.acknowledged = None
+        self.resolved = None
+
+    @property
+    def status(self):
+        if self.resolved is not None:
+            return 'Resolved'
+        return 'Acknowledged' if self.acknowledged is not None else 'Unacknowledged'
+
+
+class AlertStore:
+    """
+    Active alerts in opening order, indexed by alert ID and by (charger,
+    rule), plus the most recently resolved ones
+    """
+
+    def __init__(self, history=1000):
+        self._active = {}
+        self._keys = {}
+        self._by_charger = {}
+        self._severity = Counter()
+        self._unacknowledged = 0
+        self._ids = itertools.count(1)
+        self.resolved = deque(maxlen=history)
+
+    def __len__(self):
+        return len(self._active)
+
+    def get(self, alert_id):
+        return self._active.get(alert_id)
+
+    def find(self, charger_id, rule_name):
+        return self._keys.get((charger_id, rule_name))
+
+    def for_charger(self, charger_id):
+        """Active alerts on one charger"""
+        return list(self._by_charger.get(charger_id, {}).values())
+
+    def open(self, charger_id, site, rule, at):
+        alert = Alert(f"ALERT_{next(self._ids):07d}", charger_id, site, rule, at)
+        self._active[alert.alert_id] = alert
+        self._keys[(charger_id, rule.name)] = alert
+        self._by_charger.setdefault(charger_id, {})[rule.name] = alert
+        self._severity[alert.severity] += 1
+        self._unacknowledged += 1
+        return alert
+
+    def acknowledge(self, alert_id, at=None):
+        """Mark an active alert acknowledged; False if it isn't active"""
+        alert = self._active.get(alert_id)
+        if alert is None:
+            return False
+        if alert.acknowledged is None:
+            alert.acknowledged = at if at is not None else time.time()
+            self._unacknowledged -= 1
+        return True
+
+    def resolve(self, alert_id, at=None):
+        """Close an active alert and move it to the resolved history; False if it isn't active"""
+        alert = self._active.pop(alert_id, None)
+        if alert is None:
+            return False
+        del self._keys[(alert.charger_id, alert.rule)]
+        charger_alerts = self._by_charger[alert.charger_id]
+        del charger_alerts[alert.rule]
+        if not charger_alerts:
+            del self._by_charger[alert.charger_id]
+        self._severity[alert.severity] -= 1
+        if alert.acknowledged is None:
+            self._unacknowledged -= 1
+        alert.resolved = at if at is not None else time.time()
+        self.resolved.append(alert)
+        return True
+
+    def counts(self):
+        return {
+            'active': len(self._active),
+            'unacknowledged': self._unacknowledged,
+            'by_severity': {severity: n for severity, n in self._severity.items() if n},
+        }
+
+    def active(self, site=None, charger_ids=None):
+        """Active alerts, newest first; `charger_ids` is an optional set to keep"""
+        alerts = reversed(self._active.values())
+        if site is not None:
+            alerts = (alert for alert in alerts if alert.site == site)
+        if charger_ids is not None:
+            alerts = (alert for alert in alerts if alert.charger_id in charger_ids)
+        return alerts
+
+    @staticmethod
+    def frame(alerts):
+        """Alerts as display rows"""
+        return pd.DataFrame(
+            [
+                (alert.alert_id, alert.charger_id, alert.site, alert.severity, alert.message,
+                 alert.count, alert.status, _stamp(alert.opened), _stamp(alert.last_seen))
+                for alert in alerts
+            ],
+            columns=ALERT_COLUMNS,
+        )
+
+
+class AlertEngine:
+    """
+    Derives alerts from status events into an AlertStore. Safe to call from
+    several threads; each call holds the engine lock.
+    """
+
+    def __init__(self, rules=None, cooldown=300, expire_interval=10, store=None):
+        self.rules = list(rules if rules is not None else DEFAULT_RULES)
+        self.cooldown = cooldown
+        self.expire_interval = expire_interval
+        self.store = store if store is not None else AlertStore()
+        self.stats = Counter()
+        self._status_rules = [rule for rule in self.rules if not rule.windowed]
+        self._window_rules = {rule.name: rule for rule in self.rules if rule.windowed}
+        self._alert_statuses = frozenset().union(*(rule.statuses or () for rule in self._status_rules))
+        self._status = {}
+        self._windows = {}
+        self._last_opened = {}
+        # (charger, rule) -> (rule, site) of status alerts held back by the cooldown
+        self._deferred = {}
+        self._windowed_alerts = {}
+        self._longest = max([rule.window for rule in self._window_rules.values()] + [self.cooldown])
+        self._next_expiry = 0
+        self._next_prune = 0
+        self._lock = threading.Lock()
+
+    def status_of(self, charger_id):
+        """The last status seen for a charger, or None"""
+        return self._status.get(charger_id)
+
+    def observe(self, charger_id, status, at, site=None):
+        """Apply one event"""
+        with self._lock:
+            self._observe(charger_id, status, at, site)
+            self._expire(at)
+
+    def process(self, charger_ids, statuses, at=None, sites=None):
+        """Apply a batch of events that share one timestamp (defaults to now)"""
+        at = at if at is not None else time.time()
+        if sites is None:
+            sites = itertools.repeat(None)
+        with self._lock:
+            for charger_id, status, site in zip(charger_ids, statuses, sites):
+                self._observe(charger_id, status, at, site)
+            self._expire(at)
+
+    def expire(self, at=None):
+        """Resolve windowed alerts whose charger has been quiet for the rule's window"""
+        with self._lock:
+            self._next_expiry = 0
+            self._expire(at if at is not None else time.time())
+
+    def _observe(self, charger_id, status, at, site, seeding=False):
+        self.stats['events'] += 1
+        store = self.store
+        previous = self._status.get(charger_id)
+        if previous == status:
+            # A repeated status is a duplicate of the alert it raised, if any
+            for rule in self._status_rules:
+                if rule.matches(status):
+                    self._fire(rule, charger_id, site, at)
+            return
+        self._status[charger_id] = status
+        self.stats['transitions'] += 1
+
+        # Only chargers with open alerts have anything to resolve
+        open_alerts = store._by_charger.get(charger_id)
+        for rule in self._status_rules:
+            if rule.matches(status):
+                self._fire(rule, charger_id, site, at)
+            elif open_alerts:
+                alert = open_alerts.get(rule.name)
+                if alert is not None:
+                    store.resolve(alert.alert_id, at)
+                    self.stats['resolved'] += 1
+
+        # A snapshot only says where a charger is, not that it just moved there
+        if seeding:
+            return
+        for rule in self._window_rules.values():
+            if rule.matches(status):
+                key = (charger_id, rule.name)
+                window = self._windows.get(key)
+                if window is None:
+                    window = self._windows[key] = deque(maxlen=rule.count)
+                window.append(at)
+                if len(window) == rule.count and at - window[0] <= rule.window:
+                    self._fire(rule, charger_id, site, at)
+
+    def _fire(self, rule, charger_id, site, at):
+        alert = self.store.find(charger_id, rule.name)
+        if alert is not None:
+            alert.last_seen = at
+            alert.count += 1
+            if site is not None:
+                alert.site = site
+            self.stats['deduplicated'] += 1
+            return
+        key = (charger_id, rule.name)
+        last = self._last_opened.get(key)
+        if last is not None and at - last < self.cooldown:
+            self.stats['rate_limited'] += 1
+            if not rule.windowed:
+                self._deferred[key] = (rule, site)
+            return
+        self._last_opened[key] = at
+        self._deferred.pop(key, None)
+        alert = self.store.open(charger_id, site, rule, at)
+        if rule.windowed:
+            self._windowed_alerts[alert.alert_id] = alert
+        self.stats['opened'] += 1
+
+    def _expire(self, at):
+        if at < self._next_expiry:
+            return
+        self._next_expiry = at + self.expire_interval
+        for key, (rule, site) in list(self._deferred.items()):
+            charger_id = key[0]
+            if at - self._last_opened[key] < self.cooldown:
+                continue
+            del self._deferred[key]
+            # Still in the status that was rate-limited - open it now
+            status = self._status.get(charger_id)
+            if status is not None and rule.matches(status):
+                self._fire(rule, charger_id, site, at)
+        for alert in list(self._windowed_alerts.values()):
+            if alert.resolved is not None:
+                del self._windowed_alerts[alert.alert_id]
+            elif at - alert.last_seen > self._window_rules[alert.rule].window:
+                self.store.resolve(alert.alert_id, at)
+                del self._windowed_alerts[alert.alert_id]
+                self.stats['resolved'] += 1
+        if at >= self._next_prune:
+            # Drop windows and cooldowns that can no longer affect anything
+            self._next_prune = at + self._longest
+            self._windows = {key: window for key, window in self._windows.items() if at - window[-1] <= self._longest}
+            self._last_opened = {key: last for key, last in self._last_opened.items() if at - last < self.cooldown}
+
+    def snapshot(self, charger_ids, statuses, sites=None, at=None):
+        """
+        Reconcile with the chargers currently in an alerting status (e.g. after
+        a full reload): their status changes are observed, and chargers last
+        seen in an alerting status but missing from the snapshot have recovered
+        """
+        at = at if at is not None else time.time()
+        charger_ids = list(charger_ids)
+        if sites is None:
+            sites = itertools.repeat(None)
+        with self._lock:
+            for charger_id, status, site in zip(charger_ids, statuses, sites):
+                # Unchanged chargers aren't new events, so they don't count as repeats
+                if self._status.get(charger_id) != status:
+                    self._observe(charger_id, status, at, site, seeding=True)
+            current = set(charger_ids)
+            recovered = [
+                charger_id for charger_id, status in self._status.items()
+                if status in self._alert_statuses and charger_id not in current
+            ]
+            for charger_id in recovered:
+                del self._status[charger_id]
+                for alert in self.store.for_charger(charger_id):
+                    if alert.rule not in self._window_rules:
+                        self.store.resolve(alert.alert_id, at)
+                        self.stats['resolved'] += 1
+            self._expire(at)
+
+    @property
+    def alert_statuses(self):
+        """Statuses that raise an alert on their own - what snapshot() expects"""
+        return sorted(self._alert_statuses)
+
+    def _matching(self, site=None, status=None):
+        alerts = self.store.active(site=site)
+        if status is not None:
+            alerts = (alert for alert in alerts if self._status.get(alert.charger_id) == status)
+        return alerts
+
+    def count(self, site=None, status=None):
+        """Active alerts matching the filters; `status` keeps chargers whose last status matches"""
+        with self._lock:
+            if site is None and status is None:
+                return len(self.store)
+            return sum(1 for _ in self._matching(site, status))
+
+    def page(self, site=None, status=None, offset=0, limit=50):
+        """One page of the matching active alerts, newest first, as display rows"""
+        with self._lock:
+            alerts = itertools.islice(self._matching(site, status), offset, offset + limit)
+            return self.store.frame(list(alerts))
+
+    def counts(self):
+        with self._lock:
+            return self.store.counts()
+
+    def acknowledge(self, alert_ids, at=None):
+        """Acknowledge active alerts by ID; returns how many were active"""
+        with self._lock:
+            return sum(self.store.acknowledge(alert_id, at) for alert_id in alert_ids)
+
+    def resolve(self, alert_ids, at=None):
+        """Resolve active alerts by ID; returns how many were active"""
+        with self._lock:
+            resolved = sum(self.store.resolve(alert_id, at) for alert_id in alert_ids)
+            self.stats['resolved'] += resolved
+            return resolved
+
+
+# Status mix of the benchmark's events, and the share of chargers that flap
+EVENT_STATUSES = {'Available': 0.50, 'Charging': 0.35, 'Faulted': 0.06, 'Offline': 0.05, 'Maintenance': 0.04}
+FLAPPING_SHARE = 0.01
+
+
+def generate_events(events, chargers, rate, seed=0):
+    """
+    `events` status events over `chargers` chargers arriving at `rate` per
+    second of event time; FLAPPING_SHARE of the chargers send a fifth of them.
+    Returned as Python lists so the benchmark times the engine, not numpy.
+    """
+    rng = np.random.default_rng(seed)
+    ids = np.char.mod('CHG_%07d', np.arange(chargers)).astype(object)
+    flappers = max(int(chargers * FLAPPING_SHARE), 1)
+    charger = np.where(
+        rng.random(events) < 0.2,
+        rng.integers(0, flappers, events),
+        rng.integers(0, chargers, events),
+    )
+    statuses = np.array(list(EVENT_STATUSES), dtype=object)
+    status = statuses[rng.choice(len(statuses), events, p=list(EVENT_STATUSES.values()))]
+    sites = np.char.mod('STN_%05d', np.arange(chargers) // 12).astype(object)
+    times = time.time() + np.arange(events) / rate
+    return ids[charger].tolist(), status.tolist(), times.tolist(), sites[charger].tolist()
+
+
+def bench(events, chargers, rate, seed=0):
+    """Events per CPU second through AlertEngine.observe, then acknowledge/resolve cost per alert"""
+    ids, statuses, times, sites = generate_events(events, chargers, rate, seed)
+    engine = AlertEngine()
+    observe = engine.observe
+    start = time.process_time()
+    for charger_id, status, at, site in zip(ids, statuses, times, sites):
+        observe(charger_id, status, at, site)
+    observe_s = time.process_time() - start
+
+    active = [alert.alert_id for alert in engine.store.active()]
+    start = time.process_time()
+    engine.acknowledge(active)
+    acknowledge_s = time.process_time() - start
+    start = time.process_time()
+    engine.resolve(active)
+    resolve_s = time.process_time() - start
+    assert len(engine.store) == 0
+
+    return {
+        'events': events,
+        'chargers': chargers,
+        'event_seconds': events / rate,
+        'cpu_seconds': observe_s,
+        'events_per_second': events / observe_s,
+        'opened': engine.stats['opened'],
+        'deduplicated': engine.stats['deduplicated'],
+        'rate_limited': engine.stats['rate_limited'],
+        'auto_resolved': engine.stats['resolved'] - len(active),
+        'active': len(active),
+        'acknowledge_us': acknowledge_s / max(len(active), 1) * 1e6,
+        'resolve_us': resolve_s / max(len(active), 1) * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Status events per second through the alert engine on one core")
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--chargers", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--rate", type=float, default=1000, help="Events per second of event time")
+    parser.add_argument("--target", type=float, default=10_000, help="Events per second to sustain")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    results = [bench(args.events, chargers, args.rate) for chargers in args.chargers]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'chargers':>10} {'events/s':>10} {'opened':>8} {'dedup':>8} {'limited':>8} "
+          f"{'resolved':>9} {'active':>8} {'ack us':>7} {'resolve us':>10}")
+    for r in results:
+        print(f"{r['chargers']:>10,} {r['events_per_second']:>10,.0f} {r['opened']:>8,} {r['deduplicated']:>8,} "
+              f"{r['rate_limited']:>8,} {r['auto_resolved']:>9,} {r['active']:>8,} "
+              f"{r['acknowledge_us']:>7.2f} {r['resolve_us']:>10.2f}")
+    slowest = min(r['events_per_second'] for r in results)
+    print(f"\n{args.events:,} events per run; slowest run {slowest:,.0f} events/s "
+          f"({'meets' if slowest >= args.target else 'misses'} the {args.target:,.0f}/s target)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,73 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { simpleSnowflake } from '@/lib/snowflake-simple';
 
+// Sites returned with ?view=summary, for the power chart
+const TOP_SITES = 50;
+const MAX_PAGE_SIZE = 1000;
+
+// Totals (GROUPING_LEVEL 3), status breakdown (2) and top sites by power (1) in one query
+const SUMMARY_SQL = `
+  SELECT SITE_ID, STATUS, GROUPING(SITE_ID, STATUS) AS GROUPING_LEVEL,
+         COUNT(*) AS CHARGERS,
+         SUM(CASE WHEN STATUS IN ('Available', 'Charging') THEN 1 ELSE 0 END) AS ACTIVE,
+         SUM(KW) AS POWER,
+         COUNT(DISTINCT SITE_ID) AS SITES
+  FROM (
+    SELECT COALESCE(SITE_ID, '') AS SITE_ID, COALESCE(STATUS_LAST_SEEN, 'Unknown') AS STATUS,
+           COALESCE(MAX_POWER_KW, 0) AS KW
+    FROM CHARGERS
+  )
+  GROUP BY GROUPING SETS ((), (STATUS), (SITE_ID))
+  QUALIFY GROUPING(SITE_ID, STATUS) <> 1
+    OR ROW_NUMBER() OVER (PARTITION BY GROUPING(SITE_ID, STATUS) ORDER BY SUM(KW) DESC, SITE_ID) <= ${TOP_SITES}`;
+
+function pageParam(value: string | null, fallback: number, max: number) {
+  const parsed = Number.parseInt(value ?? '', 10);
+  return Number.isFinite(parsed) && parsed >= 0 ? Math.min(parsed, max) : fallback;
+}
+
 export async function GET(request: NextRequest) {
   try {
-    const { data, error } = await simpleSnowflake.query('SELECT * FROM CHARGERS');
-    
+    const params = request.nextUrl.searchParams;
+
+    // ?view=summary - dashboard aggregates computed in Snowflake instead of from every row
+    if (params.get('view') === 'summary') {
+      const { data, error } = await simpleSnowflake.query(SUMMARY_SQL);
+      if (error) {
+        console.error('Snowflake query error:', error);
+        return NextResponse.json({ error: error.message }, { status: 500 });
+      }
+      return NextResponse.json({ data: data || [] });
+    }
+
+    // ?site=&status=&limit=&offset= - one page of charger rows
+    const where: string[] = [];
+    const binds: any[] = [];
+    if (params.get('site')) {
+      where.push('SITE_ID = ?');
+      binds.push(params.get('site'));
+    }
+    if (params.get('status')) {
+      where.push("COALESCE(STATUS_LAST_SEEN, 'Unknown') = ?");
+      binds.push(params.get('status'));
+    }
+    let sql = 'SELECT * FROM CHARGERS';
+    if (where.length) {
+      sql += ` WHERE ${where.join(' AND ')}`;
+    }
+    if (params.has('limit')) {
+      const limit = pageParam(params.get('limit'), 100, MAX_PAGE_SIZE);
+      const offset = pageParam(params.get('offset'), 0, Number.MAX_SAFE_INTEGER);
+      sql += ` ORDER BY CHARGER_ID LIMIT ${limit} OFFSET ${offset}`;
+    }
+
+    const { data, error } = await simpleSnowflake.query(sql, binds);
+
     if (error) {
       console.error('Snowflake query error:', error);
       return NextResponse.json({ error: error.message }, { status: 500 });
     }
-    
+
     return NextResponse.json({ data: data || [] });
   } catch (error) {
     console.error('API error:', error);
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Benchmark - concurrent users against a real Streamlit server
+
+Starts `streamlit run` on the dashboard (with a synthetic fleet), connects N
+simulated browsers over the app's websocket and has each one change the
+sidebar filters in a loop, the way a user clicking around would. Every
+interaction is sent the way the browser sends it - all widget values, plus
+the fragment id when the widget belongs to a fragment - and timed until the
+server reports the run finished. Server CPU is read from /proc, so CPU per
+interaction covers every thread of the server process.
+
+With --feed-rate a status feed is written while the users run, and the
+simulated browsers also honour the app's auto-rerun timers (live status).
+
+--baseline REV runs the same load against streamlit_app.py from a git
+revision first (sibling modules come from the working tree), for a
+before/after comparison:
+
+    python bench_concurrent.py --users 20 --interactions 20 --baseline HEAD~1
+    python bench_concurrent.py --users 10 --feed-rate 200 --page Locations
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(APP_DIR, 'streamlit_app.py')
+WIDGET_TYPES = ('selectbox', 'radio', 'toggle', 'number_input', 'date_input')
+# Seconds to wait for a run to finish before counting it as timed out
+RERUN_TIMEOUT = 60
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def cpu_seconds(pid):
+    """User + system CPU of a process, all threads included (Linux /proc)"""
+    with open(f'/proc/{pid}/stat') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def start_server(app, port, env):
+    command = [
+        sys.executable, '-m', 'streamlit', 'run', app,
+        '--server.headless', 'true',
+        '--server.port', str(port),
+        '--server.enableXsrfProtection', 'false',
+        '--server.enableCORS', 'false',
+        '--browser.gatherUsageStats', 'false',
+        '--server.fileWatcherType', 'none',
+    ]
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/_stcore/health', timeout=1)
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("Streamlit server did not come up")
+
+
+class StatusFeedWriter(threading.Thread):
+    """Appends `rate` random status events per second to a JSONL status feed"""
+
+    def __init__(self, path, charger_ids, rate, seed=0):
+        super().__init__(daemon=True)
+        self.path = path
+        self.charger_ids = charger_ids
+        self.rate = rate
+        self.written = 0
+        self._random = random.Random(seed)
+        self._stop = threading.Event()
+
+    def run(self):
+        statuses = ['Available', 'Charging', 'Faulted', 'Offline', 'Maintenance']
+        with open(self.path, 'a') as f:
+            while not self._stop.wait(0.1):
+                for _ in range(max(int(self.rate / 10), 1)):
+                    f.write(json.dumps({
+                        'CHARGER_ID': self._random.choice(self.charger_ids),
+                        'STATUS': self._random.choice(statuses),
+                        'EVENT_TIME': time.time(),
+                    }) + '\n')
+                    self.written += 1
+                f.flush()
+
+    def stop(self):
+        self._stop.set()
+
+
+class Browser:
+    """
+    One simulated browser session: keeps the last widget of each label, sends
+    reruns with every widget value it has set, answers auto-rerun timers and,
+    like the browser, caches large elements so the server can send references
+    """
+
+    def __init__(self, url, live):
+        self.url = url
+        self.live = live
+        self.widgets = {}
+        self.values = {}
+        self.timers = {}
+        self.cache = {}
+        self.timeouts = 0
+        self.ws = None
+        self._finished = None
+
+    async def __aenter__(self):
+        from websockets.asyncio.client import connect
+
+        self.ws = await connect(self.url, subprotocols=['streamlit'], max_size=None, open_timeout=60)
+        self._finished = asyncio.Queue()
+        self._reader = asyncio.create_task(self._read())
+        return self
+
+    async def __aexit__(self, *exc):
+        self._reader.cancel()
+        await self.ws.close()
+
+    async def _read(self):
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        async for data in self.ws:
+            msg = ForwardMsg()
+            msg.ParseFromString(data)
+            if msg.metadata.cacheable:
+                self.cache[msg.hash] = msg
+            elif msg.WhichOneof('type') == 'ref_hash' and msg.ref_hash in self.cache:
+                msg = self.cache[msg.ref_hash]
+            kind = msg.WhichOneof('type')
+            if kind == 'delta' and msg.delta.WhichOneof('type') == 'new_element':
+                element = msg.delta.new_element
+                widget = element.WhichOneof('type')
+                if widget in WIDGET_TYPES:
+                    proto = getattr(element, widget)
+                    self.widgets[proto.label] = (widget, proto, msg.delta.fragment_id)
+            elif kind == 'auto_rerun':
+                self.timers[msg.auto_rerun.fragment_id] = (msg.auto_rerun.interval, time.monotonic())
+            elif kind == 'stop_auto_rerun':
+                self.timers.clear()
+            elif kind == 'script_finished':
+                if msg.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    self._finished.put_nowait(msg.script_finished)
+
+    def _widget_states(self):
+        from streamlit.proto.WidgetStates_pb2 import WidgetStates
+
+        states = WidgetStates()
+        for label, value in self.values.items():
+            widget, proto, _ = self.widgets[label]
+            state = states.widgets.add()
+            state.id = proto.id
+            if widget == 'toggle':
+                state.bool_value = value
+            else:
+                state.string_value = value
+        return states
+
+    async def rerun(self, fragment_id='', auto=False):
+        """Send a rerun and wait for it to finish; returns seconds taken, or None on timeout"""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+
+        msg = BackMsg()
+        msg.rerun_script.query_string = ''
+        msg.rerun_script.widget_states.CopyFrom(self._widget_states())
+        msg.rerun_script.fragment_id = fragment_id
+        msg.rerun_script.is_auto_rerun = auto
+        msg.rerun_script.cached_message_hashes.extend(self.cache)
+        start = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        try:
+            await asyncio.wait_for(self._finished.get(), timeout=RERUN_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            return None
+        return time.perf_counter() - start
+
+    async def set(self, label, value):
+        """Change a widget as a user would; reruns its fragment, or the app"""
+        _, _, fragment_id = self.widgets[label]
+        self.values[label] = value
+        return await self.rerun(fragment_id)
+
+    def options(self, label):
+        return list(self.widgets[label][1].options)
+
+    async def due_timers(self):
+        """Run every fragment whose auto-rerun interval has elapsed; returns their durations"""
+        durations = []
+        now = time.monotonic()
+        for fragment_id, (interval, last) in list(self.timers.items()):
+            if self.live and now - last >= interval:
+                self.timers[fragment_id] = (interval, now)
+                durations.append(await self.rerun(fragment_id, auto=True))
+        return durations
+
+
+async def user(url, page, interactions, think, live, seed, samples):
+    rng = random.Random(seed)
+    async with Browser(url, live) as browser:
+        samples['initial'].append(await browser.rerun())
+        if page != 'Dashboard':
+            samples['navigate'].append(await browser.set('', page))
+        statuses = [s for s in browser.options('Status') if s != 'All']
+        sites = [s for s in browser.options('Site') if s != 'All']
+        for i in range(interactions):
+            samples['live_tick'].extend(await browser.due_timers())
+            if i % 2:
+                label, value = ('Status', 'All') if i % 4 == 1 else ('Site', 'All')
+            else:
+                label, value = ('Status', rng.choice(statuses)) if i % 4 == 0 else ('Site', rng.choice(sites))
+            samples[f'{label.lower()}_filter'].append(await browser.set(label, value))
+            await asyncio.sleep(rng.uniform(0, 2 * think))
+        samples['timeouts'].append(browser.timeouts)
+
+
+async def run_users(url, users, page, interactions, think, live):
+    samples = {'initial': [], 'navigate': [], 'status_filter': [], 'site_filter': [], 'live_tick': [], 'timeouts': []}
+    await asyncio.gather(*(
+        user(url, page, interactions, think, live, seed, samples) for seed in range(users)
+    ))
+    return samples
+
+
+def summarize(durations):
+    durations = [d for d in durations if d is not None]
+    if not durations:
+        return None
+    ms = np.array(durations) * 1000
+    return {
+        'count': len(ms),
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p95_ms': float(np.percentile(ms, 95)),
+        'max_ms': float(ms.max()),
+    }
+
+
+def bench(app, args):
+    """One server, warmed up by a single user, then `users` users at once"""
+    port = free_port()
+    env = dict(os.environ, SYNTHETIC_FLEET_CHARGERS=str(args.chargers), PYTHONPATH=APP_DIR)
+    writer = None
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.feed_rate:
+            from synthetic_fleet import generate_fleet
+
+            env['CHARGER_STATUS_FEED_PATH'] = os.path.join(tmp, 'status.jsonl')
+            env['LIVE_REFRESH_SECONDS'] = str(args.live_seconds)
+            open(env['CHARGER_STATUS_FEED_PATH'], 'w').close()
+            charger_ids = generate_fleet(args.chargers)['CHARGER_ID'].tolist()
+            writer = StatusFeedWriter(env['CHARGER_STATUS_FEED_PATH'], charger_ids, args.feed_rate)
+
+        server = start_server(app, port, env)
+        url = f'ws://127.0.0.1:{port}/_stcore/stream'
+        try:
+            # Caches (fleet, index, charts) are filled once, outside the measurement
+            asyncio.run(run_users(url, 1, args.page, 4, 0, False))
+            if writer:
+                writer.start()
+            cpu_before = cpu_seconds(server.pid)
+            start = time.perf_counter()
+            samples = asyncio.run(run_users(
+                url, args.users, args.page, args.interactions, args.think, bool(args.feed_rate)
+            ))
+            elapsed = time.perf_counter() - start
+            cpu = cpu_seconds(server.pid) - cpu_before
+        finally:
+            if writer:
+                writer.stop()
+            server.terminate()
+            server.wait()
+
+    timeouts = sum(samples.pop('timeouts'))
+    updates = sum(len(durations) for durations in samples.values()) - timeouts
+    return {
+        'elapsed_s': elapsed,
+        'server_cpu_s': cpu,
+        'updates': updates,
+        'cpu_ms_per_update': cpu / updates * 1000 if updates else None,
+        'timeouts': timeouts,
+        'status_events': writer.written if writer else 0,
+        'timings': {name: summarize(durations) for name, durations in samples.items() if durations},
+    }
+
+
+def baseline_app(rev, directory):
+    """streamlit_app.py as of a git revision, written into `directory`"""
+    source = subprocess.run(
+        ['git', 'show', f'{rev}:./streamlit_app.py'],
+        capture_output=True, text=True, check=True, cwd=APP_DIR,
+    ).stdout
+    path = os.path.join(directory, 'streamlit_app.py')
+    with open(path, 'w') as f:
+        f.write(source)
+    return path
+
+
+def print_result(name, result):
+    print(f"\n{name}: {result['updates']} updates in {result['elapsed_s']:.1f} s, "
+          f"server CPU {result['server_cpu_s']:.1f} s ({result['cpu_ms_per_update']:.1f} ms per update)")
+    if result['timeouts']:
+        print(f"  {result['timeouts']} runs timed out after {RERUN_TIMEOUT} s")
+    if result['status_events']:
+        print(f"  {result['status_events']:,} status events written")
+    for timing, stats in result['timings'].items():
+        print(f"  {timing:<14} n={stats['count']:<5} p50 {stats['p50_ms']:>8.1f} ms  "
+              f"p95 {stats['p95_ms']:>8.1f} ms  max {stats['max_ms']:>8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent simulated users against the Streamlit dashboard")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--interactions", type=int, default=20, help="Filter changes per user")
+    parser.add_argument("--think", type=float, default=0.2, help="Mean seconds between a user's interactions")
+    parser.add_argument("--page", default="Dashboard", choices=["Dashboard", "Locations", "Tickets", "Alerts"])
+    parser.add_argument("--chargers", type=int, default=100_000, help="Synthetic fleet size")
+    parser.add_argument("--feed-rate", type=float, default=0, help="Status events per second (enables live status)")
+    parser.add_argument("--live-seconds", type=float, default=1, help="LIVE_REFRESH_SECONDS for the server")
+    parser.add_argument("--baseline", help="Also benchmark streamlit_app.py from this git revision")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.baseline:
+            results[args.baseline] = bench(baseline_app(args.baseline, tmp), args)
+        results['working tree'] = bench(APP_PATH, args)
+
+    if args.json:
+        print(json.dumps({'config': vars(args), 'results': results}, indent=2))
+        return
+    for name, result in results.items():
+        print_result(name, result)
+    if args.baseline:
+        before, after = results[args.baseline], results['working tree']
+        print(f"\nCPU per update: {before['cpu_ms_per_update']:.1f} -> {after['cpu_ms_per_update']:.1f} ms")
+        for timing in ('status_filter', 'site_filter', 'live_tick'):
+            if before['timings'].get(timing) and after['timings'].get(timing):
+                print(f"{timing} p50: {before['timings'][timing]['p50_ms']:.1f} -> "
+                      f"{after['timings'][timing]['p50_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
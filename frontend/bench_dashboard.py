@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Benchmark - the Streamlit dashboard on synthetic fleets
+
+For each fleet size, times the building blocks (frame build, metrics,
+filter index, filtering, chart building, ticket/alert generation) and then
+renders every page headlessly with Streamlit's AppTest against the same
+synthetic fleet (SYNTHETIC_FLEET_CHARGERS). Each run is appended to a
+history file (bench_results/bench_history.jsonl next to this script, or
+--history / BENCH_HISTORY) so results can be compared across commits; the
+latest run is compared with the previous one for the same size and session
+setting.
+
+    python bench_dashboard.py --sizes 1000 100000 1000000
+    python bench_dashboard.py --sizes 100000 --session-days 7 --no-pages
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from bench_metrics import best_of
+from filter_index import FilterIndex
+from fleet_metrics import calculate_metrics, to_fleet_frame
+from synthetic_fleet import generate_alerts, generate_fleet, generate_tickets, write_sessions
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'streamlit_app.py')
+PAGES = ["Dashboard", "Locations", "Sessions", "Tickets", "Alerts"]
+DEFAULT_HISTORY = os.environ.get(
+    'BENCH_HISTORY',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_results', 'bench_history.jsonl'),
+)
+# Changes smaller than this share, or between timings both under the floor, are treated as noise
+NOISE = 0.25
+NOISE_FLOOR_MS = 5
+
+
+def time_components(n, repeat):
+    """Timings (ms) for the data path behind the pages, plus fleet counts"""
+    generate_ms, raw = best_of(lambda: generate_fleet(n), 1)
+    frame_ms, frame = best_of(lambda: to_fleet_frame(raw), 1)
+    del raw
+    metrics_ms, metrics = best_of(lambda: calculate_metrics(frame), repeat)
+    index_ms, index = best_of(lambda: FilterIndex(frame), 1)
+
+    # Filter on the busiest site and a minority status, like a user drilling in
+    site = metrics['site_summary']['chargers'].idxmax()
+    filter_site_ms, _ = best_of(lambda: index.select(frame, site=site), repeat)
+    filter_status_ms, faulted = best_of(lambda: index.select(frame, status='Faulted'), repeat)
+    filter_both_ms, _ = best_of(lambda: index.select(frame, site=site, status='Faulted'), repeat)
+    filtered_metrics_ms, _ = best_of(lambda: calculate_metrics(faulted), repeat)
+
+    import streamlit_app
+    charts_ms, _ = best_of(lambda: (
+        streamlit_app.create_status_chart(metrics['status_breakdown']),
+        streamlit_app.create_power_chart(metrics['site_summary']['power']),
+    ), repeat)
+
+    tickets_ms, tickets = best_of(lambda: generate_tickets(frame), 1)
+    alerts_ms, alerts = best_of(lambda: generate_alerts(frame), 1)
+
+    timings = {
+        'generate_ms': generate_ms,
+        'frame_ms': frame_ms,
+        'metrics_ms': metrics_ms,
+        'index_ms': index_ms,
+        'filter_site_ms': filter_site_ms,
+        'filter_status_ms': filter_status_ms,
+        'filter_site_status_ms': filter_both_ms,
+        'filtered_metrics_ms': filtered_metrics_ms,
+        'charts_ms': charts_ms,
+        'tickets_ms': tickets_ms,
+        'alerts_ms': alerts_ms,
+    }
+    counts = {
+        'sites': int(metrics['sites']),
+        'tickets': len(tickets),
+        'alerts': len(alerts),
+    }
+    return timings, counts, frame
+
+
+def time_pages(n, timeout):
+    """
+    Render every page with AppTest: a cold first run (fleet generated and
+    indexed), each page once warm, then filtered Dashboard and Locations runs
+    """
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    os.environ['SYNTHETIC_FLEET_CHARGERS'] = str(n)
+    st.cache_resource.clear()
+    st.cache_data.clear()
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    timings = {}
+    errors = {}
+
+    def render(name, action=None):
+        start = time.perf_counter()
+        (action() if action else at).run()
+        timings[name] = (time.perf_counter() - start) * 1000
+        if at.exception:
+            errors[name] = str(at.exception[0].message)
+
+    render('cold_start')
+    for page in PAGES:
+        render(page, lambda: at.sidebar.radio[0].set_value(page))
+    render('Dashboard_rerun')
+    render('Dashboard_filtered', lambda: at.sidebar.selectbox[1].set_value('Faulted'))
+    render('Locations_filtered', lambda: at.sidebar.radio[0].set_value('Locations'))
+    return timings, errors
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True, cwd=os.path.dirname(APP_PATH),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    import streamlit
+
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'streamlit': streamlit.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def compare(result, history):
+    """Timings that moved by more than NOISE since the last run with the same size and sessions"""
+    previous = [
+        r for r in history
+        if r['chargers'] == result['chargers'] and r.get('session_days') == result['session_days']
+    ]
+    if not previous:
+        return []
+    last = previous[-1]
+    changes = []
+    for group in ('components', 'pages'):
+        for name, ms in result.get(group, {}).items():
+            before = last.get(group, {}).get(name)
+            if before and abs(ms / before - 1) > NOISE and max(ms, before) >= NOISE_FLOOR_MS:
+                changes.append((name, before, ms, last.get('commit')))
+    return changes
+
+
+def print_result(result):
+    print(f"\n{result['chargers']:,} chargers, {result['sites']:,} sites, "
+          f"{result['tickets']:,} tickets, {result['alerts']:,} alerts")
+    for group in ('components', 'pages'):
+        for name, ms in result.get(group, {}).items():
+            print(f"  {name:<24} {ms:>10.1f} ms")
+    for page, error in result.get('page_errors', {}).items():
+        print(f"  {page}: ERROR {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Streamlit dashboard on synthetic fleets")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3, help="Best-of count for the fast steps")
+    parser.add_argument("--no-pages", action="store_true", help="Skip the AppTest page renders")
+    parser.add_argument("--page-timeout", type=float, default=300)
+    parser.add_argument("--session-days", type=int, default=0,
+                        help="Serve the Sessions page from this many days of generated Parquet partitions")
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="JSONL file the results are appended to")
+    parser.add_argument("--no-history", action="store_true")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    # AppTest and bare-mode imports log a warning per st call
+    logging.disable(logging.WARNING)
+
+    history = [] if args.no_history else load_history(args.history)
+    run = {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'environment': environment(),
+    }
+    results = []
+    for n in args.sizes:
+        components, counts, frame = time_components(n, args.repeat)
+        result = dict(run, chargers=n, session_days=args.session_days, **counts, components=components)
+
+        with tempfile.TemporaryDirectory() as sessions_root:
+            if args.session_days:
+                start = time.perf_counter()
+                result['sessions'] = write_sessions(frame, sessions_root, days=args.session_days)
+                components['write_sessions_ms'] = (time.perf_counter() - start) * 1000
+                os.environ['SESSIONS_PARQUET_ROOT'] = sessions_root
+            del frame
+            if not args.no_pages:
+                result['pages'], errors = time_pages(n, args.page_timeout)
+                if errors:
+                    result['page_errors'] = errors
+            os.environ.pop('SESSIONS_PARQUET_ROOT', None)
+
+        result['changes'] = [
+            {'timing': name, 'before_ms': before, 'after_ms': after, 'before_commit': commit}
+            for name, before, after, commit in compare(result, history)
+        ]
+        results.append(result)
+        if not args.json:
+            print_result(result)
+
+    if not args.no_history:
+        os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+        with open(args.history, 'a') as f:
+            for result in results:
+                f.write(json.dumps(result) + '\n')
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for result in results:
+        for change in result['changes']:
+            ratio = change['after_ms'] / change['before_ms']
+            print(f"{result['chargers']:>10,} {change['timing']:<24} {change['before_ms']:>9.1f} -> "
+                  f"{change['after_ms']:>9.1f} ms ({ratio:.2f}x vs {change['before_commit']})")
+    if not args.no_history:
+        print(f"\nAppended {len(results)} result(s) to {args.history}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark - dict-loop calculate_metrics vs the vectorized fleet_metrics
+
+    python bench_metrics.py --sizes 1000 100000 1000000
+"""
+import argparse
+import json
+import time
+
+from fleet_metrics import STATUS_CATEGORIES, calculate_metrics, to_fleet_frame
+
+
+def legacy_calculate_metrics(chargers):
+    """calculate_metrics as it was before fleet_metrics, plus the Locations page per-site totals"""
+    if not chargers:
+        return {}
+
+    total = len(chargers)
+    active = len([c for c in chargers if c.get('STATUS_LAST_SEEN') in ['Available', 'Charging']])
+    uptime = (active / total * 100) if total > 0 else 0
+    total_power = sum(c.get('MAX_POWER_KW', 0) for c in chargers)
+    sites = len(set(c.get('SITE_ID', '') for c in chargers))
+
+    status_counts = {}
+    for charger in chargers:
+        status = charger.get('STATUS_LAST_SEEN', 'Unknown')
+        status_counts[status] = status_counts.get(status, 0) + 1
+
+    site_map = {}
+    for charger in chargers:
+        site_map.setdefault(charger.get('SITE_ID', 'Unknown'), []).append(charger)
+    site_summary = {}
+    for site_id, site_chargers in site_map.items():
+        site_active = len([c for c in site_chargers if c.get('STATUS_LAST_SEEN') in ['Available', 'Charging']])
+        site_summary[site_id] = {
+            'chargers': len(site_chargers),
+            'active': site_active,
+            'power': sum(c.get('MAX_POWER_KW', 0) for c in site_chargers),
+        }
+
+    return {
+        'total_chargers': total,
+        'active_chargers': active,
+        'uptime_percentage': uptime,
+        'total_power': total_power,
+        'sites': sites,
+        'status_breakdown': status_counts,
+        'site_summary': site_summary,
+    }
+
+
+def make_chargers(n, chargers_per_site=20):
+    powers = [50, 150, 350]
+    return [
+        {
+            'CHARGER_ID': f'STN_{i // chargers_per_site:06d}_CHG_{i % chargers_per_site:02d}',
+            'SITE_ID': f'STN_{i // chargers_per_site:06d}',
+            'MAX_POWER_KW': powers[i % 3],
+            'STATUS_LAST_SEEN': STATUS_CATEGORIES[(i * 7) % len(STATUS_CATEGORIES)],
+        }
+        for i in range(n)
+    ]
+
+
+def best_of(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark calculate_metrics")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    results = []
+    for n in args.sizes:
+        chargers = make_chargers(n)
+        legacy_ms, legacy = best_of(lambda: legacy_calculate_metrics(chargers), args.repeat)
+        build_ms, frame = best_of(lambda: to_fleet_frame(chargers), 1)
+        new_ms, metrics = best_of(lambda: calculate_metrics(frame), args.repeat)
+
+        assert legacy['active_chargers'] == metrics['active_chargers']
+        assert legacy['total_power'] == metrics['total_power']
+        assert legacy['sites'] == metrics['sites']
+
+        results.append({
+            'chargers': n,
+            'legacy_ms': legacy_ms,
+            'frame_build_ms': build_ms,
+            'vectorized_ms': new_ms,
+            'speedup': legacy_ms / new_ms if new_ms else None,
+        })
+        del chargers, frame
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'chargers':>10} {'legacy ms':>10} {'build ms':>10} {'new ms':>10} {'speedup':>8}")
+    for r in results:
+        print(f"{r['chargers']:>10} {r['legacy_ms']:>10.1f} {r['frame_build_ms']:>10.1f} "
+              f"{r['vectorized_ms']:>10.2f} {r['speedup']:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Charger loader - pulls the CHARGERS table into a DataFrame and keeps it fresh
+with watermark-based incremental refreshes instead of full reloads.
+
+Any object with `placeholder` and `fetch_frame(sql, params)` can act as the
+source: SnowflakeChargerSource for production, SQLiteChargerSource as a
+local stand-in for development and testing.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from compact_fleet import align_categories, compact_frame
+
+CHARGER_COLUMNS = [
+    'CHARGER_ID',
+    'SITE_ID',
+    'MODEL',
+    'FIRMWARE_VERSION',
+    'VENDOR',
+    'INSTALL_DATE',
+    'NETWORK_TYPE',
+    'LOCATION_LAT',
+    'LOCATION_LON',
+    'NUM_CONNECTORS',
+    'MAX_POWER_KW',
+    'LAST_MAINTENANCE_DATE',
+    'STATUS_LAST_SEEN',
+]
+
+# Timestamp bumped whenever STATUS_LAST_SEEN (or any other column) changes
+WATERMARK_COLUMN = os.environ.get('CHARGERS_WATERMARK_COLUMN', 'STATUS_UPDATED_AT')
+
+
+def snowflake_params_from_env():
+    """Connection parameters from the SNOWFLAKE_* variables, or None if unset"""
+    if not os.environ.get('SNOWFLAKE_ACCOUNT'):
+        return None
+    return {
+        'account': os.environ['SNOWFLAKE_ACCOUNT'],
+        'user': os.environ.get('SNOWFLAKE_USERNAME'),
+        'password': os.environ.get('SNOWFLAKE_PASSWORD'),
+        'database': os.environ.get('SNOWFLAKE_DATABASE'),
+        'schema': os.environ.get('SNOWFLAKE_SCHEMA', 'PUBLIC'),
+        'warehouse': os.environ.get('SNOWFLAKE_WAREHOUSE'),
+        'role': os.environ.get('SNOWFLAKE_ROLE', 'ACCOUNTADMIN'),
+    }
+
+
+class SnowflakeChargerSource:
+    """Runs queries on a snowflake-connector-python connection"""
+
+    placeholder = '%s'
+    grouping_sets = True
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def fetch_frame(self, sql, params=()):
+        """Execute and build the DataFrame straight from the Arrow result batches"""
+        import pyarrow as pa
+
+        with self.connection.cursor() as cur:
+            cur.execute(sql, params)
+            batches = list(cur.fetch_arrow_batches())
+            if not batches:
+                return pd.DataFrame(columns=[c[0] for c in cur.description])
+        return pa.concat_tables(batches).to_pandas()
+
+
+class SQLiteChargerSource:
+    """Local stand-in for Snowflake with the same query interface"""
+
+    placeholder = '?'
+    # No GROUP BY GROUPING SETS - kpi_queries falls back to UNION ALL
+    grouping_sets = False
+
+    def __init__(self, database):
+        if isinstance(database, sqlite3.Connection):
+            self.connection = database
+        else:
+            self.connection = sqlite3.connect(database, check_same_thread=False)
+        # The connection is shared by Streamlit's script threads
+        self._lock = threading.Lock()
+
+    def fetch_frame(self, sql, params=()):
+        with self._lock:
+            return pd.read_sql_query(sql, self.connection, params=params)
+
+
+class ChargerStore:
+    """
+    Cached charger frame, indexed by CHARGER_ID.
+
+    `load()` pulls the whole table once. After that `refresh()` only fetches
+    rows at or past the newest watermark already seen, and upserts them.
+    Rows sharing that watermark are re-read, so ones written in the same
+    second as the last fetch are not lost; already-applied ones are
+    skipped. `version` increases whenever the frame changes, so derived
+    data can be memoized per version.
+    """
+
+    def __init__(self, source, table='CHARGERS', watermark_column=WATERMARK_COLUMN,
+                 refresh_interval=30):
+        self.source = source
+        self.table = table
+        self.watermark_column = watermark_column
+        self.refresh_interval = refresh_interval
+
+        self.frame = pd.DataFrame(columns=CHARGER_COLUMNS).set_index('CHARGER_ID', drop=False)
+        self.watermark = None
+        # CHARGER_IDs already applied at exactly `watermark`
+        self._watermark_ids = set()
+        self.version = 0
+        self.last_refresh = 0.0
+        self._lock = threading.Lock()
+
+    def _select(self):
+        columns = ', '.join(CHARGER_COLUMNS + [self.watermark_column])
+        return f'SELECT {columns} FROM {self.table}'
+
+    def load(self):
+        """Full load - used once at startup"""
+        frame = self.source.fetch_frame(self._select())
+        with self._lock:
+            # Held dictionary-encoded; see compact_fleet.py
+            self.frame = compact_frame(frame).set_index('CHARGER_ID', drop=False)
+            self._advance_watermark(frame)
+            self.version += 1
+            self.last_refresh = time.monotonic()
+        return self.frame
+
+    def _advance_watermark(self, frame):
+        if len(frame):
+            newest = frame[self.watermark_column].max()
+            at_newest = set(frame.loc[frame[self.watermark_column] == newest, 'CHARGER_ID'])
+            if self.watermark is None or newest > self.watermark:
+                self.watermark = newest
+                self._watermark_ids = at_newest
+            elif newest == self.watermark:
+                self._watermark_ids |= at_newest
+
+    def refresh(self, force=False):
+        """Fetch rows changed since the watermark; returns how many were applied"""
+        if not force and time.monotonic() - self.last_refresh < self.refresh_interval:
+            return 0
+        if self.watermark is None:
+            return len(self.load())
+
+        sql = f'{self._select()} WHERE {self.watermark_column} >= {self.source.placeholder}'
+        delta = self.source.fetch_frame(sql, (self.watermark,))
+        with self._lock:
+            self.last_refresh = time.monotonic()
+            delta = (delta.sort_values(self.watermark_column, kind='stable')
+                     .drop_duplicates('CHARGER_ID', keep='last'))
+            seen = ((delta[self.watermark_column] == self.watermark)
+                    & delta['CHARGER_ID'].isin(self._watermark_ids))
+            delta = delta[~seen]
+            if delta.empty:
+                return 0
+            delta = align_categories(self.frame, compact_frame(delta)).set_index('CHARGER_ID', drop=False)
+            existing = delta.index.intersection(self.frame.index)
+            if len(existing):
+                self.frame.loc[existing, delta.columns] = delta.loc[existing]
+            added = delta.index.difference(self.frame.index)
+            if len(added):
+                self.frame = pd.concat([self.frame, delta.loc[added]])
+            self._advance_watermark(delta)
+            self.version += 1
+            return len(delta)
+
+    def apply_status(self, charger_ids, statuses):
+        """
+        Write status deltas into the cached frame without bumping `version`,
+        so the next rebuild starts from the live statuses
+        """
+        with self._lock:
+            rows = self.frame.index.get_indexer(charger_ids)
+            known = rows >= 0
+            self.frame.iloc[rows[known], self.frame.columns.get_loc('STATUS_LAST_SEEN')] = np.asarray(statuses)[known]
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Compact fleet - dictionary-encoded charger records
+
+A charger record repeats the same handful of strings (model, vendor,
+firmware, network, site, status) and stores numbers and dates as Python
+objects. compact_frame() keeps one column per field with
+  - repeated strings dictionary-encoded as categoricals (small int codes),
+  - STATUS_LAST_SEEN as an int8-coded categorical,
+  - coordinates as float32 (~1 m at these latitudes); MAX_POWER_KW stays
+    float64 so summed ratings print as entered,
+  - NUM_CONNECTORS as int8 and dates as int32 days since 1970-01-01.
+ChargerRows is a read-only row view over such a frame, so code written
+against charger dicts (`charger.get('MODEL')`) keeps working without
+materializing them.
+
+    python compact_fleet.py --chargers 1000000
+"""
+import argparse
+import gc
+import tracemalloc
+from collections.abc import Mapping, Sequence
+
+import numpy as np
+import pandas as pd
+
+CATEGORICAL_COLUMNS = ['SITE_ID', 'MODEL', 'FIRMWARE_VERSION', 'VENDOR', 'NETWORK_TYPE']
+STATUS_CATEGORIES = ['Available', 'Charging', 'Faulted', 'Offline', 'Maintenance']
+DATE_COLUMNS = ['INSTALL_DATE', 'LAST_MAINTENANCE_DATE']
+FLOAT32_COLUMNS = ['LOCATION_LAT', 'LOCATION_LON']
+NO_DATE = np.iinfo(np.int32).min
+
+
+def encode_dates(values):
+    """Dates (strings, dates or timestamps) as int32 days since 1970-01-01; NO_DATE where missing"""
+    # Few distinct dates, so parse each once
+    codes, distinct = pd.factorize(pd.Series(values), use_na_sentinel=True)
+    parsed = pd.to_datetime(pd.Series(distinct, dtype=object), errors='coerce')
+    days = parsed.to_numpy(dtype='datetime64[D]').astype(np.int64)
+    days = np.where(parsed.isna().to_numpy(), NO_DATE, days).astype(np.int32)
+    return np.append(days, np.int32(NO_DATE))[codes]
+
+
+def decode_date(days):
+    """'YYYY-MM-DD' for an encoded day number, or None"""
+    if days == NO_DATE:
+        return None
+    return str(np.datetime64(int(days), 'D'))
+
+
+def status_categorical(values):
+    """STATUS_LAST_SEEN with the known statuses first; int8 codes for up to 127 statuses"""
+    status = pd.Series(values).fillna('Unknown').astype(str)
+    extra = sorted(set(status.unique()) - set(STATUS_CATEGORIES))
+    return pd.Categorical(status, categories=STATUS_CATEGORIES + extra)
+
+
+def _is_categorical(series):
+    return isinstance(series.dtype, pd.CategoricalDtype)
+
+
+def compact_frame(frame):
+    """
+    A charger frame with compact column types; other columns pass through.
+    Columns that are already compact are left as they are, so re-compacting
+    is cheap.
+    """
+    # Shallow copy - columns are replaced, never written into
+    frame = pd.DataFrame(frame).copy(deep=False)
+    for column in CATEGORICAL_COLUMNS:
+        if column in frame and not _is_categorical(frame[column]):
+            frame[column] = frame[column].fillna('').astype('category')
+    if 'STATUS_LAST_SEEN' in frame:
+        status = frame['STATUS_LAST_SEEN']
+        if not (_is_categorical(status) and list(status.cat.categories[:len(STATUS_CATEGORIES)]) == STATUS_CATEGORIES):
+            frame['STATUS_LAST_SEEN'] = status_categorical(status)
+    for column in FLOAT32_COLUMNS:
+        if column in frame and frame[column].dtype != np.float32:
+            frame[column] = pd.to_numeric(frame[column], errors='coerce').astype('float32')
+    if 'MAX_POWER_KW' in frame and (frame['MAX_POWER_KW'].dtype != np.float64 or frame['MAX_POWER_KW'].hasnans):
+        frame['MAX_POWER_KW'] = pd.to_numeric(frame['MAX_POWER_KW'], errors='coerce').fillna(0).astype('float64')
+    if 'NUM_CONNECTORS' in frame and frame['NUM_CONNECTORS'].dtype != np.int8:
+        frame['NUM_CONNECTORS'] = pd.to_numeric(frame['NUM_CONNECTORS'], errors='coerce').fillna(0).astype('int8')
+    for column in DATE_COLUMNS:
+        if column in frame and not pd.api.types.is_integer_dtype(frame[column]):
+            frame[column] = encode_dates(frame[column])
+    return frame
+
+
+def align_categories(frame, delta):
+    """
+    Give `delta`'s categorical columns the same categories as `frame`'s,
+    adding any new values to `frame` first, so rows can be assigned or
+    concatenated without falling back to object columns
+    """
+    for column in frame.columns:
+        if column in delta and isinstance(frame[column].dtype, pd.CategoricalDtype):
+            values = delta[column].astype(object)
+            new = pd.Index(values.dropna().unique()).difference(frame[column].cat.categories)
+            if len(new):
+                frame[column] = frame[column].cat.add_categories(new)
+            delta[column] = pd.Categorical(values, dtype=frame[column].dtype)
+    return delta
+
+
+class ChargerRow(Mapping):
+    """One charger as a read-only mapping, decoded on access"""
+
+    __slots__ = ('_rows', '_i')
+
+    def __init__(self, rows, i):
+        self._rows = rows
+        self._i = i
+
+    def __getitem__(self, column):
+        return self._rows.value(column, self._i)
+
+    def __iter__(self):
+        return iter(self._rows.columns)
+
+    def __len__(self):
+        return len(self._rows.columns)
+
+    def __repr__(self):
+        return f"ChargerRow({dict(self)!r})"
+
+
+class ChargerRows(Sequence):
+    """
+    Row view over a compact charger frame: rows[i] behaves like the charger
+    dict it replaces (`rows[i].get('MODEL')`, `dict(rows[i])`)
+    """
+
+    def __init__(self, frame):
+        self.columns = list(frame.columns)
+        self._columns = {}
+        for column in self.columns:
+            series = frame[column]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                self._columns[column] = ('category', series.cat.codes.to_numpy(), series.cat.categories.to_numpy(dtype=object))
+            elif column in DATE_COLUMNS and pd.api.types.is_integer_dtype(series):
+                self._columns[column] = ('date', series.to_numpy(), None)
+            else:
+                self._columns[column] = ('value', series.to_numpy(dtype=object if series.dtype == object else None), None)
+        self._length = len(frame)
+
+    def value(self, column, i):
+        kind, values, categories = self._columns[column]
+        if kind == 'category':
+            code = values[i]
+            return None if code < 0 else categories[code]
+        if kind == 'date':
+            return decode_date(values[i])
+        value = values[i]
+        return value.item() if isinstance(value, np.generic) else value
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [ChargerRow(self, j) for j in range(*i.indices(self._length))]
+        if i < 0:
+            i += self._length
+        if not 0 <= i < self._length:
+            raise IndexError(i)
+        return ChargerRow(self, i)
+
+
+def _allocated(build):
+    """
+    Bytes held by build()'s result: Python allocations (tracemalloc) plus
+    Arrow buffers, which pandas uses for strings and which tracemalloc misses
+    """
+    import pyarrow as pa
+
+    gc.collect()
+    arrow_before = pa.total_allocated_bytes()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size + pa.total_allocated_bytes() - arrow_before, result
+
+
+def memory_report(chargers):
+    """
+    Memory for the same fleet held as charger dicts, as a DataFrame, as a
+    categorical-only frame (the fleet frame before compaction) and as a
+    compact frame, scaled to 1M chargers. Each is built from scratch so
+    nothing is shared between them.
+    """
+    from synthetic_fleet import generate_fleet
+
+    fleet = generate_fleet(chargers)
+    columns = {column: fleet[column].tolist() for column in fleet.columns}
+    scale = 1_000_000 / chargers
+    report = {}
+
+    size, records = _allocated(lambda: fleet.to_dict('records'))
+    report['records'] = size
+    del records
+    size, frame = _allocated(lambda: pd.DataFrame(columns))
+    report['dataframe'] = size
+    del frame
+    size, frame = _allocated(lambda: pd.DataFrame(columns).astype(
+        {column: 'category' for column in CATEGORICAL_COLUMNS + ['STATUS_LAST_SEEN']}
+    ))
+    report['categorical'] = size
+    del frame
+    size, compact = _allocated(lambda: compact_frame(pd.DataFrame(columns)))
+    report['compact'] = size
+
+    # The row view must read back what went in
+    rows = ChargerRows(compact)
+    for i in range(0, chargers, max(chargers // 100, 1)):
+        original, row = fleet.iloc[i], rows[i]
+        assert row.get('CHARGER_ID') == original['CHARGER_ID']
+        assert row.get('MODEL') == original['MODEL']
+        assert row.get('STATUS_LAST_SEEN') == original['STATUS_LAST_SEEN']
+        assert row.get('INSTALL_DATE') == original['INSTALL_DATE']
+        assert abs(row.get('LOCATION_LAT') - original['LOCATION_LAT']) < 1e-4
+
+    return {name: size * scale for name, size in report.items()}, compact.memory_usage(deep=True, index=False) * scale
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory per 1M chargers, before and after compaction")
+    parser.add_argument("--chargers", type=int, default=1_000_000, help="Fleet size measured (scaled to 1M)")
+    args = parser.parse_args()
+
+    totals, columns = memory_report(args.chargers)
+    baseline = totals['records']
+    print(f"Memory per 1M chargers (measured on {args.chargers:,}):")
+    for name, size in totals.items():
+        comparison = f"{baseline / size:>5.1f}x smaller than records" if size != baseline else ""
+        print(f"  {name:<12} {size / 2**20:>8.1f} MiB  {comparison}")
+    print("\nCompact frame by column:")
+    for column, size in columns.items():
+        print(f"  {column:<22} {size / 2**20:>8.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Filter index - prebuilt row ids per site and status for the sidebar filters
+
+Built once per data version. A site/status filter then resolves to row
+positions without scanning the fleet: per-site row-id arrays come from one
+stable argsort of the site codes, and per-status bitmaps give O(1)
+membership, so "site AND status" is just the site's rows masked by the
+status bitmap.
+"""
+import numpy as np
+
+
+class FilterIndex:
+    def __init__(self, frame):
+        self.size = len(frame)
+
+        sites = frame['SITE_ID'].cat
+        site_codes = sites.codes.to_numpy()
+        order = np.argsort(site_codes, kind='stable')
+        bounds = np.concatenate(([0], np.cumsum(np.bincount(site_codes[site_codes >= 0], minlength=len(sites.categories)))))
+        skipped = int((site_codes < 0).sum())
+        self._site_rows = {
+            site: order[skipped + bounds[i]:skipped + bounds[i + 1]]
+            for i, site in enumerate(sites.categories)
+            if bounds[i + 1] > bounds[i]
+        }
+
+        statuses = frame['STATUS_LAST_SEEN'].cat
+        self._status_categories = statuses.categories
+        status_codes = statuses.codes.to_numpy()
+        self._status_bitmaps = {
+            status: status_codes == i
+            for i, status in enumerate(statuses.categories)
+        }
+        self._status_rows = {}
+
+    @property
+    def site_options(self):
+        """Sites that have at least one charger, in category order"""
+        return list(self._site_rows)
+
+    @property
+    def status_options(self):
+        """Statuses that have at least one charger, in category order"""
+        return [status for status in self._status_bitmaps if self.status_rows(status).size]
+
+    def status_rows(self, status):
+        rows = self._status_rows.get(status)
+        if rows is None:
+            bitmap = self._status_bitmaps.get(status)
+            rows = np.flatnonzero(bitmap) if bitmap is not None else np.empty(0, dtype=np.intp)
+            self._status_rows[status] = rows
+        return rows
+
+    def update_status(self, rows, old_codes, new_codes):
+        """Move `rows` from their old status codes to the new ones in place"""
+        for code in np.union1d(old_codes, new_codes):
+            status = self._status_categories[code]
+            bitmap = self._status_bitmaps[status]
+            bitmap[rows[old_codes == code]] = False
+            bitmap[rows[new_codes == code]] = True
+            self._status_rows.pop(status, None)
+
+    def rows(self, site=None, status=None):
+        """
+        Row positions matching the filters (None means "All"), in ascending
+        order, or None when nothing is filtered.
+        """
+        if site is None and status is None:
+            return None
+        if site is not None:
+            rows = self._site_rows.get(site, np.empty(0, dtype=np.intp))
+            if status is not None:
+                bitmap = self._status_bitmaps.get(status)
+                rows = rows[bitmap[rows]] if bitmap is not None else rows[:0]
+            return rows
+        return self.status_rows(status)
+
+    def select(self, frame, site=None, status=None):
+        """The filtered slice of `frame` (the frame the index was built from)"""
+        rows = self.rows(site, status)
+        return frame if rows is None else frame.iloc[rows]
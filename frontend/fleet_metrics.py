@@ -0,0 +1,120 @@
+"""
+Fleet metrics - typed charger frame and vectorized KPI computation
+
+All dashboard KPIs and per-site aggregates come out of a single pass over
+the categorical SITE_ID/STATUS_LAST_SEEN codes (one bincount over the
+combined site x status code), instead of looping over charger dicts.
+"""
+import numpy as np
+import pandas as pd
+
+from compact_fleet import CATEGORICAL_COLUMNS, STATUS_CATEGORIES, compact_frame
+
+ACTIVE_STATUSES = ['Available', 'Charging']
+
+
+def to_fleet_frame(chargers):
+    """
+    Build the typed fleet frame from a list of charger dicts or a DataFrame.
+
+    Column types are the compact ones from compact_fleet: SITE_ID and the
+    other repeated strings become categoricals, STATUS_LAST_SEEN becomes a
+    categorical with the known statuses first, coordinates are float32,
+    power float64 and dates are int32 day numbers. The index is a RangeIndex.
+    """
+    frame = pd.DataFrame(chargers).reset_index(drop=True)
+    if frame.empty:
+        frame = pd.DataFrame(columns=['CHARGER_ID', 'SITE_ID', 'MAX_POWER_KW', 'STATUS_LAST_SEEN'])
+    return compact_frame(frame)
+
+
+def _as_number(value):
+    """Plain int for whole numbers so '6,000 kW' doesn't render as '6,000.0 kW'"""
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def cell_totals(frame):
+    """
+    Charger counts and power per (site, status) cell, as two arrays shaped
+    (site categories, status categories)
+    """
+    sites = frame['SITE_ID'].cat
+    statuses = frame['STATUS_LAST_SEEN'].cat
+    n_sites = len(sites.categories)
+    n_statuses = len(statuses.categories)
+
+    cell = sites.codes.to_numpy(dtype=np.int64) * n_statuses + statuses.codes.to_numpy(dtype=np.int64)
+    counts = np.bincount(cell, minlength=n_sites * n_statuses).reshape(n_sites, n_statuses)
+    power = np.bincount(
+        cell, weights=frame['MAX_POWER_KW'].to_numpy(), minlength=n_sites * n_statuses
+    ).reshape(n_sites, n_statuses)
+    return counts, power
+
+
+def metrics_from_cells(counts, power, site_categories, status_categories):
+    """Dashboard metrics from per-(site, status) counts and power"""
+    total = int(counts.sum())
+    if total == 0:
+        return {
+            'total_chargers': 0,
+            'active_chargers': 0,
+            'uptime_percentage': 0,
+            'total_power': 0,
+            'sites': 0,
+            'status_breakdown': {},
+            'site_summary': pd.DataFrame(columns=['chargers', 'active', 'power', 'uptime']),
+        }
+
+    active_columns = [status_categories.get_loc(s) for s in ACTIVE_STATUSES if s in status_categories]
+    site_chargers = counts.sum(axis=1)
+    site_active = counts[:, active_columns].sum(axis=1)
+    site_power = power.sum(axis=1)
+    present = site_chargers > 0
+
+    site_summary = pd.DataFrame(
+        {
+            'chargers': site_chargers[present],
+            'active': site_active[present],
+            'power': site_power[present],
+            'uptime': site_active[present] / site_chargers[present] * 100,
+        },
+        index=pd.Index(site_categories[present], name='SITE_ID'),
+    )
+
+    status_totals = counts.sum(axis=0)
+    status_breakdown = {
+        status: int(count)
+        for status, count in zip(status_categories, status_totals)
+        if count
+    }
+
+    active = int(site_active.sum())
+    return {
+        'total_chargers': total,
+        'active_chargers': active,
+        'uptime_percentage': active / total * 100,
+        'total_power': _as_number(site_power.sum()),
+        'sites': int(present.sum()),
+        'status_breakdown': status_breakdown,
+        'site_summary': site_summary,
+    }
+
+
+def calculate_metrics(frame):
+    """
+    KPIs and per-site aggregates for a typed fleet frame.
+
+    Returns the same keys the dashboard has always used, plus `site_summary`:
+    a DataFrame indexed by SITE_ID with chargers, active, power and uptime
+    columns, covering only sites that have chargers in `frame`.
+    """
+    if len(frame) == 0:
+        return metrics_from_cells(np.zeros((0, 0), dtype=np.int64), np.zeros((0, 0)), pd.Index([]), pd.Index([]))
+    # One pass: counts and power per (site, status) cell
+    counts, power = cell_totals(frame)
+    return metrics_from_cells(
+        counts, power,
+        frame['SITE_ID'].cat.categories,
+        frame['STATUS_LAST_SEEN'].cat.categories,
+    )
@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+KPI queries - dashboard aggregates pushed down to the warehouse
+
+Instead of pulling every charger row to count statuses and sum power, the
+dashboard asks the source for what it shows:
+  - one GROUPING SETS query per filter selection for the fleet totals, the
+    status breakdown and the top sites by power (the chart),
+  - one GROUP BY SITE_ID page of sites for the Locations page,
+  - charger rows only for the site and page being viewed.
+Results are cached by a hash of the query text and parameters for `ttl`
+seconds, so reruns and other sessions reuse them. A row count and the
+newest watermark (STATUS_UPDATED_AT) fingerprint the table; `version`
+changes only when that fingerprint does, and cached results are dropped
+with it.
+
+FrameKpis answers the same calls from the in-memory LiveFleet, so the app
+renders either one the same way.
+
+    python kpi_queries.py --chargers 1000000
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from charger_loader import WATERMARK_COLUMN
+from compact_fleet import STATUS_CATEGORIES
+from fleet_metrics import ACTIVE_STATUSES, _as_number, calculate_metrics, metrics_from_cells
+
+# Sites returned with the summary, for the power chart
+TOP_SITES = 50
+
+
+def empty_metrics():
+    return metrics_from_cells(np.zeros((0, 0), dtype=np.int64), np.zeros((0, 0)), pd.Index([]), pd.Index([]))
+
+
+def _site_summary(frame):
+    """Per-site rows (SITE_ID, CHARGERS, ACTIVE, POWER) as a site_summary frame"""
+    chargers = frame['CHARGERS'].to_numpy(dtype=np.int64)
+    active = frame['ACTIVE'].to_numpy(dtype=np.int64)
+    return pd.DataFrame(
+        {
+            'chargers': chargers,
+            'active': active,
+            'power': frame['POWER'].to_numpy(dtype=float),
+            'uptime': active / np.maximum(chargers, 1) * 100,
+        },
+        index=pd.Index(frame['SITE_ID'].to_numpy(dtype=object), name='SITE_ID'),
+    )
+
+
+class KpiQueries:
+    """
+    Dashboard aggregates and detail pages as SQL against a charger source
+    (anything with `placeholder` and `fetch_frame(sql, params)`). Sources
+    without GROUPING SETS (`grouping_sets = False`, e.g. SQLite) get the
+    equivalent UNION ALL.
+    """
+
+    def __init__(self, source, table='CHARGERS', ttl=30, max_entries=256, watermark_column=WATERMARK_COLUMN):
+        self.source = source
+        self.table = table
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.watermark_column = watermark_column
+        self.data_version = f'pushdown-{table}'
+        self._cache = OrderedDict()
+        self._fingerprint = None
+        self._fingerprint_expires = 0.0
+        self._lock = threading.Lock()
+        self._stats = {'queries': 0, 'cache_hits': 0, 'rows': 0, 'bytes': 0, 'query_ms': 0.0}
+
+    @property
+    def version(self):
+        """Changes only when the table's fingerprint does, not on every query"""
+        return (self.data_version,) + self.fingerprint()
+
+    def fingerprint(self):
+        """
+        (row count, newest watermark) of the table, re-read at most every
+        `ttl` seconds; when it changes, every cached result is dropped, so no
+        result is older than the fingerprint it is served under. Tables
+        without the watermark column fall back to the TTL period (`ttl=0`
+        means always refresh).
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now < self._fingerprint_expires:
+                return self._fingerprint
+
+        fingerprint = None
+        if self.watermark_column:
+            start = time.perf_counter()
+            try:
+                frame = self.source.fetch_frame(
+                    f"SELECT COUNT(*) AS ROW_COUNT, MAX({self.watermark_column}) AS WATERMARK FROM {self.table}", []
+                )
+            except Exception as e:
+                print(f"No {self.watermark_column} on {self.table}, KPI version follows the cache TTL: {e}")
+                self.watermark_column = None
+            else:
+                fingerprint = tuple(str(value) for value in frame.iloc[0])
+                with self._lock:
+                    self._stats['queries'] += 1
+                    self._stats['rows'] += len(frame)
+                    self._stats['query_ms'] += (time.perf_counter() - start) * 1000
+        if fingerprint is None:
+            fingerprint = ('ttl', str(int(now // self.ttl)) if self.ttl > 0 else repr(now))
+
+        with self._lock:
+            if fingerprint != self._fingerprint:
+                self._cache.clear()
+                self._fingerprint = fingerprint
+            self._fingerprint_expires = now + self.ttl
+            return self._fingerprint
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, cached=len(self._cache))
+
+    def invalidate(self):
+        with self._lock:
+            self._cache.clear()
+
+    def query(self, sql, params=(), parse=None):
+        """
+        Run `sql` (or reuse a result less than `ttl` seconds old with the same
+        query text and parameters); `parse` turns the frame into what is cached
+        """
+        # Drops the cache first if the table changed
+        self.fingerprint()
+        key = hashlib.sha256(json.dumps([sql, list(params)], default=str).encode()).hexdigest()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] > now:
+                self._cache.move_to_end(key)
+                self._stats['cache_hits'] += 1
+                return entry[1]
+
+        start = time.perf_counter()
+        frame = self.source.fetch_frame(sql, list(params))
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        result = parse(frame) if parse else frame
+
+        with self._lock:
+            self._stats['queries'] += 1
+            self._stats['rows'] += len(frame)
+            self._stats['bytes'] += int(frame.memory_usage(deep=True, index=False).sum())
+            self._stats['query_ms'] += elapsed_ms
+            self._cache[key] = (now + self.ttl, result)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return result
+
+    def _where(self, site=None, status=None):
+        """WHERE clause and parameters for the filters; missing values match like to_fleet_frame's"""
+        where, params = [], []
+        if site is not None:
+            where.append(f"COALESCE(SITE_ID, '') = {self.source.placeholder}")
+            params.append(site)
+        if status is not None:
+            where.append(f"COALESCE(STATUS_LAST_SEEN, 'Unknown') = {self.source.placeholder}")
+            params.append(status)
+        return (f" WHERE {' AND '.join(where)}" if where else ''), params
+
+    def _filtered(self, site=None, status=None):
+        """Subquery over the chargers matching the filters, with missing values normalized"""
+        where, params = self._where(site, status)
+        sql = (
+            f"SELECT COALESCE(SITE_ID, '') AS SITE_ID, COALESCE(STATUS_LAST_SEEN, 'Unknown') AS STATUS, "
+            f"COALESCE(MAX_POWER_KW, 0) AS KW FROM {self.table}{where}"
+        )
+        return sql, params
+
+    _AGGREGATES = (
+        "COUNT(*) AS CHARGERS, "
+        "SUM(CASE WHEN STATUS IN ({active}) THEN 1 ELSE 0 END) AS ACTIVE, "
+        "SUM(KW) AS POWER"
+    ).format(active=', '.join(f"'{status}'" for status in ACTIVE_STATUSES))
+
+    def summary_sql(self, site=None, status=None):
+        """
+        One query for the totals (GROUPING_LEVEL 3), the status breakdown (2)
+        and the TOP_SITES sites by power (1)
+        """
+        filtered, params = self._filtered(site, status)
+        if getattr(self.source, 'grouping_sets', True):
+            sql = (
+                f"SELECT SITE_ID, STATUS, GROUPING(SITE_ID, STATUS) AS GROUPING_LEVEL, {self._AGGREGATES}, "
+                f"COUNT(DISTINCT SITE_ID) AS SITES "
+                f"FROM ({filtered}) "
+                f"GROUP BY GROUPING SETS ((), (STATUS), (SITE_ID)) "
+                f"QUALIFY GROUPING(SITE_ID, STATUS) <> 1 "
+                f"OR ROW_NUMBER() OVER (PARTITION BY GROUPING(SITE_ID, STATUS) ORDER BY SUM(KW) DESC, SITE_ID) <= {TOP_SITES}"
+            )
+            return sql, params
+        sql = (
+            f"SELECT NULL AS SITE_ID, NULL AS STATUS, 3 AS GROUPING_LEVEL, {self._AGGREGATES}, "
+            f"COUNT(DISTINCT SITE_ID) AS SITES FROM ({filtered}) "
+            f"UNION ALL SELECT NULL, STATUS, 2, {self._AGGREGATES}, COUNT(DISTINCT SITE_ID) "
+            f"FROM ({filtered}) GROUP BY STATUS "
+            f"UNION ALL SELECT * FROM (SELECT SITE_ID, NULL, 1, {self._AGGREGATES}, 1 "
+            f"FROM ({filtered}) GROUP BY SITE_ID ORDER BY POWER DESC, SITE_ID LIMIT {TOP_SITES})"
+        )
+        return sql, params * 3
+
+    @staticmethod
+    def _metrics(frame):
+        """Dashboard metrics from the summary rows; site_summary holds only the top sites"""
+        level = frame['GROUPING_LEVEL'].to_numpy(dtype=np.int64)
+        totals = frame[level == 3]
+        if totals.empty or not int(totals['CHARGERS'].iloc[0]):
+            return empty_metrics()
+        total = int(totals['CHARGERS'].iloc[0])
+        active = int(totals['ACTIVE'].iloc[0])
+
+        statuses = frame[level == 2].set_index('STATUS')['CHARGERS']
+        order = STATUS_CATEGORIES + sorted(set(statuses.index) - set(STATUS_CATEGORIES))
+        status_breakdown = {status: int(statuses[status]) for status in order if status in statuses.index}
+
+        sites = frame[level == 1].sort_values('SITE_ID')
+        return {
+            'total_chargers': total,
+            'active_chargers': active,
+            'uptime_percentage': active / total * 100,
+            'total_power': _as_number(totals['POWER'].iloc[0]),
+            'sites': int(totals['SITES'].iloc[0]),
+            'status_breakdown': status_breakdown,
+            'site_summary': _site_summary(sites),
+        }
+
+    def summary(self, site=None, status=None):
+        """Metrics in calculate_metrics' shape; `site_summary` is the TOP_SITES sites by power"""
+        sql, params = self.summary_sql(site, status)
+        return self.query(sql, params, parse=self._metrics)
+
+    @property
+    def site_options(self):
+        sql = f"SELECT DISTINCT COALESCE(SITE_ID, '') AS SITE_ID FROM {self.table} ORDER BY 1"
+        return self.query(sql, parse=lambda frame: frame['SITE_ID'].tolist())
+
+    @property
+    def status_options(self):
+        return list(self.summary()['status_breakdown'])
+
+    def site_page(self, site=None, status=None, offset=0, limit=10):
+        """One page of per-site aggregates, ordered by SITE_ID"""
+        filtered, params = self._filtered(site, status)
+        sql = (
+            f"SELECT SITE_ID, {self._AGGREGATES} FROM ({filtered}) "
+            f"GROUP BY SITE_ID ORDER BY SITE_ID LIMIT {int(limit)} OFFSET {int(offset)}"
+        )
+        return self.query(sql, params, parse=_site_summary)
+
+    def site_chargers(self, site_id, status=None, offset=0, limit=100, columns=None):
+        """One page of a site's charger rows"""
+        where, params = self._where(site_id, status)
+        select = ', '.join(
+            "COALESCE(STATUS_LAST_SEEN, 'Unknown') AS STATUS_LAST_SEEN" if column == 'STATUS_LAST_SEEN' else column
+            for column in columns or ['CHARGER_ID']
+        )
+        sql = f"SELECT {select} FROM {self.table}{where} ORDER BY CHARGER_ID LIMIT {int(limit)} OFFSET {int(offset)}"
+        return self.query(sql, params)
+
+    def charger_ids(self, site=None, status=None, limit=10):
+        where, params = self._where(site, status)
+        sql = f"SELECT CHARGER_ID FROM {self.table}{where} ORDER BY CHARGER_ID LIMIT {int(limit)}"
+        return self.query(sql, params, parse=lambda frame: frame['CHARGER_ID'].tolist())
+
+    def charger_sites(self):
+        """CHARGER_ID and SITE_ID of every charger (the synthetic session stand-in needs them)"""
+        return self.query(f"SELECT CHARGER_ID, COALESCE(SITE_ID, '') AS SITE_ID FROM {self.table}")
+
+    def charger_statuses(self, statuses):
+        """CHARGER_ID, SITE_ID and STATUS_LAST_SEEN of the chargers in `statuses` (the alert snapshot)"""
+        if not statuses:
+            return pd.DataFrame(columns=['CHARGER_ID', 'SITE_ID', 'STATUS_LAST_SEEN'])
+        placeholders = ', '.join([self.source.placeholder] * len(statuses))
+        sql = (
+            f"SELECT CHARGER_ID, COALESCE(SITE_ID, '') AS SITE_ID, STATUS_LAST_SEEN FROM {self.table} "
+            f"WHERE STATUS_LAST_SEEN IN ({placeholders}) ORDER BY CHARGER_ID"
+        )
+        return self.query(sql, list(statuses))
+
+
+class FrameKpis:
+    """The KpiQueries calls answered from an in-memory LiveFleet"""
+
+    def __init__(self, live, data_version, max_entries=64):
+        self.live = live
+        self.data_version = data_version
+        self.max_entries = max_entries
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        return (self.data_version, self.live.revision)
+
+    @property
+    def site_options(self):
+        return self.live.index.site_options
+
+    @property
+    def status_options(self):
+        return self.live.index.status_options
+
+    def summary(self, site=None, status=None):
+        if site is None and status is None:
+            return self.live.metrics
+        key = (self.live.revision, site, status)
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return self._memo[key]
+        metrics = calculate_metrics(self.live.index.select(self.live.frame, site=site, status=status))
+        with self._lock:
+            self._memo[key] = metrics
+            while len(self._memo) > self.max_entries:
+                self._memo.popitem(last=False)
+        return metrics
+
+    def site_page(self, site=None, status=None, offset=0, limit=10):
+        return self.summary(site, status)['site_summary'].iloc[offset:offset + limit]
+
+    def site_chargers(self, site_id, status=None, offset=0, limit=100, columns=None):
+        frame = self.live.frame
+        rows = self.live.index.rows(site=site_id, status=status)[offset:offset + limit]
+        return frame.iloc[rows, frame.columns.get_indexer(columns or ['CHARGER_ID'])]
+
+    def charger_ids(self, site=None, status=None, limit=10):
+        frame = self.live.index.select(self.live.frame, site=site, status=status)
+        return frame['CHARGER_ID'].head(limit).tolist()
+
+    def charger_sites(self):
+        return self.live.frame[['CHARGER_ID', 'SITE_ID']]
+
+    def charger_statuses(self, statuses):
+        if not statuses:
+            return self.live.frame.iloc[:0][['CHARGER_ID', 'SITE_ID', 'STATUS_LAST_SEEN']]
+        rows = np.sort(np.concatenate([self.live.index.rows(status=status) for status in statuses]))
+        return self.live.frame.iloc[rows][['CHARGER_ID', 'SITE_ID', 'STATUS_LAST_SEEN']]
+
+
+def dashboard_load(kpis, site=None, status=None):
+    """The calls one Dashboard + Locations render makes"""
+    kpis.summary()
+    kpis.site_options
+    metrics = kpis.summary(site, status)
+    for site_id in kpis.site_page(site, status, 0, 10).index:
+        kpis.site_chargers(site_id, status, 0, 100, ['CHARGER_ID', 'MODEL', 'MAX_POWER_KW', 'STATUS_LAST_SEEN'])
+    return metrics
+
+
+def compare(database, site=None, status=None):
+    """
+    Rows, result bytes and query time for one dashboard load: the full
+    CHARGERS pull (ChargerStore.load) against the pushed-down queries, cold
+    and again within the cache TTL
+    """
+    from charger_loader import ChargerStore, SQLiteChargerSource
+    from filter_index import FilterIndex
+    from fleet_metrics import to_fleet_frame
+    from status_feed import LiveFleet
+
+    source = SQLiteChargerSource(database)
+    report = {}
+
+    # What the full load transfers: every column of every charger row
+    store = ChargerStore(source)
+    start = time.perf_counter()
+    raw = source.fetch_frame(store._select())
+    load_ms = (time.perf_counter() - start) * 1000
+    report['full_load'] = {
+        'queries': 1,
+        'rows': len(raw),
+        'bytes': int(raw.memory_usage(deep=True, index=False).sum()),
+        'query_ms': load_ms,
+    }
+    frame = to_fleet_frame(raw)
+    full = dashboard_load(FrameKpis(LiveFleet(frame, FilterIndex(frame)), 'full'), site, status)
+
+    kpis = KpiQueries(source)
+    pushed = dashboard_load(kpis, site, status)
+    report['pushdown_cold'] = kpis.stats()
+    before = kpis.stats()
+    dashboard_load(kpis, site, status)
+    after = kpis.stats()
+    report['pushdown_warm'] = {name: after[name] - before[name] for name in ('queries', 'cache_hits', 'rows', 'bytes', 'query_ms')}
+
+    # Both paths must agree on what the dashboard shows
+    for name in ('total_chargers', 'active_chargers', 'sites', 'status_breakdown'):
+        assert full[name] == pushed[name], (name, full[name], pushed[name])
+    assert abs(float(full['total_power']) - float(pushed['total_power'])) < 1e-6 * max(float(full['total_power']), 1)
+    top = full['site_summary']['power'].nlargest(TOP_SITES)
+    assert np.allclose(np.sort(top.to_numpy()), np.sort(pushed['site_summary']['power'].to_numpy()))
+    return report
+
+
+def write_sqlite(fleet, path):
+    """The synthetic fleet as a CHARGERS table with a watermark column"""
+    frame = fleet.copy()
+    frame['STATUS_UPDATED_AT'] = '2024-01-01 00:00:00'
+    with sqlite3.connect(path) as connection:
+        frame.to_sql('CHARGERS', connection, index=False, if_exists='replace', chunksize=100_000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rows, bytes and query time per dashboard load: full pull vs pushdown")
+    parser.add_argument("--sqlite", help="Existing SQLite file with a CHARGERS table")
+    parser.add_argument("--chargers", type=int, default=1_000_000, help="Synthetic fleet size when no --sqlite is given")
+    parser.add_argument("--site", help="Site filter")
+    parser.add_argument("--status", help="Status filter")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = args.sqlite
+        if database is None:
+            from synthetic_fleet import generate_fleet
+
+            database = os.path.join(tmp, 'chargers.db')
+            write_sqlite(generate_fleet(args.chargers), database)
+        report = compare(database, args.site, args.status)
+
+    print(f"{'':<16} {'queries':>8} {'cached':>8} {'rows':>10} {'bytes':>14} {'query ms':>10}")
+    for name, stats in report.items():
+        print(f"{name:<16} {stats['queries']:>8} {stats.get('cache_hits', 0):>8} {stats['rows']:>10,} "
+              f"{stats['bytes']:>14,} {stats['query_ms']:>10.1f}")
+    full, cold = report['full_load'], report['pushdown_cold']
+    print(f"\nPushdown moves {full['bytes'] / max(cold['bytes'], 1):,.0f}x fewer bytes and "
+          f"{full['rows'] / max(cold['rows'], 1):,.0f}x fewer rows on a cold load")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Session store - charging session history read in daily partitions
+
+Sources expose sessions one day at a time, with the site filter pushed down
+to the source: daily Parquet partitions (sessions/date=YYYY-MM-DD/*.parquet),
+Snowflake day ranges on a table clustered by STARTED_AT, or a synthetic
+stand-in. SessionStore keeps a small aggregate per (day, filter) - hourly
+energy, sessions per charger, failures - so a window's rolling aggregates
+are sums of cached days and moving the window only reads the new days.
+Past days never change, so only today's aggregate expires.
+"""
+import glob
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+SESSION_COLUMNS = [
+    'SESSION_ID',
+    'CHARGER_ID',
+    'SITE_ID',
+    'VEHICLE_ID',
+    'STATUS',
+    'ENERGY_KWH',
+    'DURATION_MIN',
+    'STARTED_AT',
+    'ENDED_AT',
+]
+
+SESSION_STATUSES = ['Active', 'Completed', 'Failed', 'Pending']
+
+
+class ParquetSessionSource:
+    """Daily Parquet partitions under `root`: root/date=YYYY-MM-DD/*.parquet"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def _files(self, day):
+        return sorted(glob.glob(os.path.join(self.root, f'date={day.isoformat()}', '*.parquet')))
+
+    def read_day(self, day, site=None, columns=None, offset=0, limit=None):
+        import pyarrow.parquet as pq
+
+        files = self._files(day)
+        if not files:
+            return pd.DataFrame(columns=columns or SESSION_COLUMNS)
+        # Row groups whose SITE_ID statistics exclude the site are skipped
+        filters = [('SITE_ID', '=', site)] if site else None
+        table = pq.ParquetDataset(files, filters=filters).read(columns=columns)
+        if offset or limit is not None:
+            table = table.sort_by([('STARTED_AT', 'descending')]).slice(offset, limit)
+        return table.to_pandas()
+
+
+class SnowflakeSessionSource:
+    """
+    Day ranges from a Snowflake table clustered by STARTED_AT, so each day
+    prunes to a handful of micro-partitions
+    """
+
+    def __init__(self, connection, table='CHARGING_SESSIONS'):
+        self.connection = connection
+        self.table = table
+
+    def read_day(self, day, site=None, columns=None, offset=0, limit=None):
+        import pyarrow as pa
+
+        sql = (
+            f"SELECT {', '.join(columns or SESSION_COLUMNS)} FROM {self.table} "
+            "WHERE STARTED_AT >= %s AND STARTED_AT < %s"
+        )
+        params = [day, day + timedelta(days=1)]
+        if site:
+            sql += " AND SITE_ID = %s"
+            params.append(site)
+        if offset or limit is not None:
+            sql += " ORDER BY STARTED_AT DESC LIMIT %s OFFSET %s"
+            params += [limit if limit is not None else 2 ** 31, offset]
+        with self.connection.cursor() as cur:
+            cur.execute(sql, params)
+            batches = list(cur.fetch_arrow_batches())
+            if not batches:
+                return pd.DataFrame(columns=[c[0] for c in cur.description])
+        return pa.concat_tables(batches).to_pandas()
+
+
+class SampleSessionSource:
+    """
+    Deterministic synthetic sessions for the given chargers, generated one day
+    at a time - lets the Sessions page run without a session table
+    """
+
+    def __init__(self, charger_ids, site_ids, sessions_per_charger=4, max_sessions_per_day=2000):
+        self.charger_ids = np.asarray(charger_ids, dtype=object)
+        self.site_ids = np.asarray(site_ids, dtype=object)
+        self.sessions_per_day = min(len(self.charger_ids) * sessions_per_charger, max_sessions_per_day)
+
+    def _generate(self, day):
+        n = self.sessions_per_day if len(self.charger_ids) else 0
+        rng = np.random.default_rng(day.toordinal())
+        chargers = rng.integers(0, max(len(self.charger_ids), 1), n)
+        start = pd.Timestamp(day) + pd.to_timedelta(np.sort(rng.integers(0, 86400, n)), unit='s')
+        duration = rng.integers(10, 120, n)
+        status = np.array(SESSION_STATUSES)[rng.choice(4, n, p=[0.05, 0.85, 0.07, 0.03])]
+        end = start + pd.to_timedelta(duration, unit='m')
+        now = pd.Timestamp(datetime.now())
+        # Sessions can't have started in the future; ones still running are Active
+        started = start <= now
+        running = started & (end > now)
+        status = np.where(running, 'Active', np.where(status == 'Active', 'Completed', status))
+        frame = pd.DataFrame({
+            'SESSION_ID': [f"SES_{day:%Y%m%d}_{i:06d}" for i in range(n)],
+            'CHARGER_ID': self.charger_ids[chargers] if n else [],
+            'SITE_ID': self.site_ids[chargers] if n else [],
+            'VEHICLE_ID': [f"VEH_{v:05d}" for v in rng.integers(0, 50000, n)],
+            'STATUS': status,
+            'ENERGY_KWH': np.round(duration * rng.uniform(0.3, 1.5, n), 1),
+            'DURATION_MIN': duration,
+            'STARTED_AT': start,
+            'ENDED_AT': end.where(~running),
+        })
+        return frame[started]
+
+    def read_day(self, day, site=None, columns=None, offset=0, limit=None):
+        frame = self._generate(day)
+        if site:
+            frame = frame[frame['SITE_ID'] == site]
+        frame = frame.iloc[::-1]
+        if offset or limit is not None:
+            frame = frame.iloc[offset:None if limit is None else offset + limit]
+        return frame[columns] if columns else frame
+
+
+class DayAggregate:
+    """Per-day summary that windows are built from"""
+
+    __slots__ = ('sessions', 'failed', 'energy_by_hour', 'sessions_by_charger')
+
+    def __init__(self, frame):
+        self.sessions = len(frame)
+        self.failed = int((frame['STATUS'] == 'Failed').sum())
+        hours = pd.DatetimeIndex(frame['STARTED_AT']).hour.to_numpy()
+        self.energy_by_hour = np.bincount(
+            hours, weights=frame['ENERGY_KWH'].to_numpy(dtype=float), minlength=24
+        )
+        self.sessions_by_charger = frame['CHARGER_ID'].value_counts()
+
+
+class SessionStore:
+    """
+    Window queries over a day-partitioned session source.
+
+    Day aggregates are cached (LRU, `max_days` entries); past days are kept
+    until evicted, today's is recomputed after `today_ttl` seconds. Days
+    missing from the cache are read by up to `workers` threads at once.
+    """
+
+    AGGREGATE_COLUMNS = ['CHARGER_ID', 'STATUS', 'ENERGY_KWH', 'STARTED_AT']
+
+    def __init__(self, source, max_days=800, today_ttl=60, workers=8):
+        self.source = source
+        self.max_days = max_days
+        self.today_ttl = today_ttl
+        self.workers = workers
+        self._days = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, day, site):
+        with self._lock:
+            cached = self._days.get((day, site))
+            if cached is None:
+                return None
+            computed_at, aggregate = cached
+            if day >= date.today() and time.monotonic() - computed_at >= self.today_ttl:
+                return None
+            self._days.move_to_end((day, site))
+            return aggregate
+
+    def day_aggregate(self, day, site=None):
+        aggregate = self._cached(day, site)
+        if aggregate is not None:
+            return aggregate
+
+        aggregate = DayAggregate(self.source.read_day(day, site=site, columns=self.AGGREGATE_COLUMNS))
+        with self._lock:
+            self._days[(day, site)] = (time.monotonic(), aggregate)
+            self._days.move_to_end((day, site))
+            while len(self._days) > self.max_days:
+                self._days.popitem(last=False)
+        return aggregate
+
+    def window(self, start, end, site=None):
+        """
+        Rolling aggregates for the days start..end (inclusive): totals,
+        failure rate, energy per hour (indexed by hour) and sessions per
+        charger.
+        """
+        days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        missing = [day for day in days if self._cached(day, site) is None]
+        if len(missing) > 1 and self.workers > 1:
+            with ThreadPoolExecutor(min(self.workers, len(missing))) as executor:
+                list(executor.map(lambda day: self.day_aggregate(day, site), missing))
+        aggregates = [self.day_aggregate(day, site) for day in days]
+
+        energy = np.concatenate([a.energy_by_hour for a in aggregates]) if aggregates else np.zeros(0)
+        hours = pd.date_range(pd.Timestamp(start), periods=len(energy), freq='h')
+        per_charger = [a.sessions_by_charger for a in aggregates if a.sessions]
+        sessions_by_charger = (
+            pd.concat(per_charger).groupby(level=0).sum().sort_values(ascending=False)
+            if per_charger else pd.Series(dtype='int64')
+        )
+        sessions = sum(a.sessions for a in aggregates)
+        failed = sum(a.failed for a in aggregates)
+        return {
+            'days': days,
+            'day_counts': [a.sessions for a in aggregates],
+            'sessions': sessions,
+            'failed': failed,
+            'failure_rate': failed / sessions * 100 if sessions else 0.0,
+            'energy_kwh': float(energy.sum()),
+            'energy_by_hour': pd.Series(energy, index=hours, name='Energy (kWh)'),
+            'sessions_by_charger': sessions_by_charger,
+        }
+
+    def page(self, window, offset, limit, site=None):
+        """
+        Sessions offset..offset+limit in the window, newest first. Per-day
+        counts from the aggregates let whole days be skipped, so only the
+        partitions that overlap the page are read.
+        """
+        frames = []
+        for day, count in zip(reversed(window['days']), reversed(window['day_counts'])):
+            if offset >= count:
+                offset -= count
+                continue
+            take = min(limit, count - offset)
+            frames.append(self.source.read_day(day, site=site, offset=offset, limit=take))
+            limit -= take
+            offset = 0
+            if limit <= 0:
+                break
+        if not frames:
+            return pd.DataFrame(columns=SESSION_COLUMNS)
+        return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,155 @@
+"""
+Status feed - charger status deltas applied in place to the live fleet
+
+A feed returns the status changes since its last poll: TableStatusFeed
+reads an events table by watermark through any charger_loader source
+(Snowflake in production, SQLite locally), FileStatusFeed tails a JSONL
+file as a stand-in for a queue. LiveFleet applies a batch of deltas to the
+typed fleet frame, the per-(site, status) counts behind the metrics and the
+filter index, touching only the changed rows instead of rebuilding.
+"""
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from fleet_metrics import cell_totals, metrics_from_cells
+
+DELTA_COLUMNS = ['CHARGER_ID', 'STATUS', 'EVENT_TIME']
+
+
+def latest_per_charger(deltas):
+    """Keep only the newest event per charger"""
+    if deltas.empty:
+        return deltas
+    return deltas.sort_values('EVENT_TIME', kind='stable').drop_duplicates('CHARGER_ID', keep='last')
+
+
+class TableStatusFeed:
+    """
+    Polls a status events table (CHARGER_ID, STATUS, EVENT_TIME) for rows
+    past the newest EVENT_TIME already seen
+    """
+
+    def __init__(self, source, table='CHARGER_STATUS_EVENTS', watermark=None, batch_size=50000):
+        self.source = source
+        self.table = table
+        self.watermark = watermark
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+
+    def poll(self):
+        with self._lock:
+            return self._poll()
+
+    def _poll(self):
+        sql = f"SELECT {', '.join(DELTA_COLUMNS)} FROM {self.table}"
+        params = ()
+        if self.watermark is not None:
+            sql += f" WHERE EVENT_TIME > {self.source.placeholder}"
+            params = (self.watermark,)
+        sql += f" ORDER BY EVENT_TIME LIMIT {int(self.batch_size)}"
+        deltas = self.source.fetch_frame(sql, params)
+        if len(deltas):
+            self.watermark = deltas['EVENT_TIME'].iloc[-1]
+        return latest_per_charger(deltas)
+
+
+class FileStatusFeed:
+    """Tails a JSONL file of status events; the byte offset is the watermark"""
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self._lock = threading.Lock()
+
+    def poll(self):
+        with self._lock:
+            return self._poll()
+
+    def _poll(self):
+        if not os.path.exists(self.path):
+            return pd.DataFrame(columns=DELTA_COLUMNS)
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read()
+        # Leave a partially written last line for the next poll
+        end = data.rfind(b'\n') + 1
+        self.offset += end
+        events = [json.loads(line) for line in data[:end].splitlines() if line.strip()]
+        return latest_per_charger(pd.DataFrame(events, columns=DELTA_COLUMNS))
+
+
+class LiveFleet:
+    """
+    Typed fleet frame plus its metrics and filter index, kept current by
+    status deltas. `revision` increases whenever a delta changes something,
+    so derived data can be memoized per (data version, revision).
+    """
+
+    def __init__(self, frame, index, on_apply=None):
+        self.frame = frame
+        self.index = index
+        self.on_apply = on_apply
+        self.revision = 0
+        self.applied = 0
+        self.ignored = 0
+
+        self._positions = pd.Index(frame['CHARGER_ID'])
+        self._status_categories = frame['STATUS_LAST_SEEN'].cat.categories
+        self._site_categories = frame['SITE_ID'].cat.categories
+        self._site_codes = frame['SITE_ID'].cat.codes.to_numpy()
+        self._status_codes = frame['STATUS_LAST_SEEN'].cat.codes.to_numpy().copy()
+        self._power = frame['MAX_POWER_KW'].to_numpy()
+        if len(frame):
+            self._counts, self._cell_power = cell_totals(frame)
+        else:
+            self._counts = np.zeros((0, len(self._status_categories)), dtype=np.int64)
+            self._cell_power = np.zeros(self._counts.shape)
+        self.metrics = self._metrics()
+        self._lock = threading.Lock()
+
+    def _metrics(self):
+        return metrics_from_cells(self._counts, self._cell_power, self._site_categories, self._status_categories)
+
+    def site_ids(self, charger_ids):
+        """SITE_ID of each charger (all must be in the fleet)"""
+        return self._site_categories[self._site_codes[self._positions.get_indexer(charger_ids)]]
+
+    def apply(self, deltas):
+        """Apply a frame of (CHARGER_ID, STATUS) deltas; returns how many rows changed"""
+        if deltas is None or deltas.empty:
+            return 0
+        rows = self._positions.get_indexer(deltas['CHARGER_ID'])
+        new_codes = self._status_categories.get_indexer(deltas['STATUS'])
+        # Unknown chargers arrive with the next full refresh; unknown statuses are dropped
+        known = (rows >= 0) & (new_codes >= 0)
+        rows, new_codes = rows[known], new_codes[known]
+
+        with self._lock:
+            old_codes = self._status_codes[rows]
+            changed = old_codes != new_codes
+            rows, old_codes, new_codes = rows[changed], old_codes[changed], new_codes[changed]
+            self.ignored += int((~known).sum())
+            if not len(rows):
+                return 0
+
+            sites = self._site_codes[rows]
+            power = self._power[rows]
+            np.subtract.at(self._counts, (sites, old_codes), 1)
+            np.add.at(self._counts, (sites, new_codes), 1)
+            np.subtract.at(self._cell_power, (sites, old_codes), power)
+            np.add.at(self._cell_power, (sites, new_codes), power)
+
+            self._status_codes[rows] = new_codes
+            self.frame.iloc[rows, self.frame.columns.get_loc('STATUS_LAST_SEEN')] = self._status_categories[new_codes]
+            self.index.update_status(rows, old_codes, new_codes)
+            self.metrics = self._metrics()
+            self.applied += len(rows)
+            self.revision += 1
+
+        if self.on_apply is not None:
+            self.on_apply(self.frame['CHARGER_ID'].to_numpy()[rows], self._status_categories[new_codes])
+        return len(rows)
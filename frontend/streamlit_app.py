@@ -1,11 +1,31 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import os
 import time
 
+from alert_engine import AlertEngine
+from charger_loader import (
+    ChargerStore,
+    SnowflakeChargerSource,
+    SQLiteChargerSource,
+    snowflake_params_from_env,
+)
+from compact_fleet import compact_frame
+from filter_index import FilterIndex
+from fleet_metrics import to_fleet_frame
+from kpi_queries import FrameKpis, KpiQueries
+from status_feed import FileStatusFeed, LiveFleet, TableStatusFeed
+from synthetic_fleet import generate_fleet
+from session_store import (
+    ParquetSessionSource,
+    SampleSessionSource,
+    SessionStore,
+    SnowflakeSessionSource,
+)
+
 # Page configuration
 st.set_page_config(
     page_title="Pigeon - EV Charging Platform",
@@ -201,59 +221,238 @@ def generate_sample_chargers():
         chargers.append(charger)
     return chargers
 
-@st.cache_data(ttl=300)
+@st.cache_resource
+def get_snowflake_connection():
+    # Shared by every session and rerun; None when Snowflake isn't configured
+    params = snowflake_params_from_env()
+    if params is None:
+        return None
+    import snowflake.connector
+    return snowflake.connector.connect(**params)
+
+# Seconds between incremental charger refreshes, and how long pushed-down KPI results are reused
+CHARGERS_REFRESH_SECONDS = int(os.environ.get('CHARGERS_REFRESH_SECONDS', '30'))
+
+@st.cache_resource
+def get_charger_source():
+    # CHARGERS_SQLITE_PATH points at a local stand-in with the same CHARGERS table
+    sqlite_path = os.environ.get('CHARGERS_SQLITE_PATH')
+    if sqlite_path:
+        return SQLiteChargerSource(sqlite_path)
+    connection = get_snowflake_connection()
+    if connection is None:
+        return None
+    return SnowflakeChargerSource(connection)
+
+@st.cache_resource
+def get_kpi_queries():
+    # KPI_PUSHDOWN=1 asks the database for aggregates and the rows on screen
+    # instead of loading every charger
+    if os.environ.get('KPI_PUSHDOWN') != '1':
+        return None
+    source = get_charger_source()
+    if source is None:
+        return None
+    return KpiQueries(source, ttl=CHARGERS_REFRESH_SECONDS)
+
+@st.cache_resource
+def get_charger_store():
+    source = get_charger_source()
+    if source is None:
+        return None
+    store = ChargerStore(
+        source,
+        refresh_interval=CHARGERS_REFRESH_SECONDS,
+    )
+    store.load()
+    return store
+
+@st.cache_resource(max_entries=2)
+def get_synthetic_fleet(chargers):
+    # SYNTHETIC_FLEET_CHARGERS swaps the sample chargers for a generated fleet of that size
+    return compact_frame(generate_fleet(chargers))
+
 def fetch_charger_data():
-    # For now, return sample data
-    # In production, this would connect to Snowflake
-    return generate_sample_chargers()
-
-def calculate_metrics(chargers):
-    if not chargers:
-        return {
-            'total_chargers': 0,
-            'active_chargers': 0,
-            'uptime_percentage': 0,
-            'total_power': 0,
-            'sites': 0,
-            'status_breakdown': {}
-        }
-    
-    total = len(chargers)
-    active = len([c for c in chargers if c.get('STATUS_LAST_SEEN') in ['Available', 'Charging']])
-    uptime = (active / total * 100) if total > 0 else 0
-    total_power = sum(c.get('MAX_POWER_KW', 0) for c in chargers)
-    sites = len(set(c.get('SITE_ID', '') for c in chargers))
-    
-    status_counts = {}
-    for charger in chargers:
-        status = charger.get('STATUS_LAST_SEEN', 'Unknown')
-        status_counts[status] = status_counts.get(status, 0) + 1
-    
-    return {
-        'total_chargers': total,
-        'active_chargers': active,
-        'uptime_percentage': uptime,
-        'total_power': total_power,
-        'sites': sites,
-        'status_breakdown': status_counts
-    }
+    """Returns (data version, raw chargers)"""
+    store = get_charger_store()
+    if store is None:
+        synthetic = int(os.environ.get('SYNTHETIC_FLEET_CHARGERS', '0'))
+        if synthetic:
+            return f'synthetic-{synthetic}', get_synthetic_fleet(synthetic)
+        # No database configured - fall back to sample data
+        return 'sample', generate_sample_chargers()
+    # Only rows whose watermark moved since the last refresh are fetched
+    store.refresh()
+    return store.version, store.frame
+
+@st.cache_resource
+def get_alert_engine():
+    # Outlives data versions, so open alerts survive a reload
+    return AlertEngine(cooldown=int(os.environ.get('ALERT_COOLDOWN_SECONDS', '300')))
+
+@st.cache_resource(max_entries=4)
+def load_fleet(version, _chargers):
+    # Typed frame, fleet-wide metrics and filter index, built once per data version
+    # and then kept current by status deltas
+    fleet = to_fleet_frame(_chargers)
+    store = get_charger_store()
+    engine = get_alert_engine()
+    live = LiveFleet(fleet, FilterIndex(fleet))
+    
+    def on_apply(charger_ids, statuses):
+        if store is not None:
+            store.apply_status(charger_ids, statuses)
+        engine.process(charger_ids, statuses, sites=live.site_ids(charger_ids))
+    
+    live.on_apply = on_apply
+    return FrameKpis(live, version)
+
+@st.cache_resource(ttl=CHARGERS_REFRESH_SECONDS, max_entries=4)
+def sync_alerts(data_version, _kpis):
+    # Reconcile the alert engine with the chargers currently alerting - the status
+    # feed only carries changes, and pushdown has no feed at all
+    engine = get_alert_engine()
+    chargers = _kpis.charger_statuses(engine.alert_statuses)
+    engine.snapshot(
+        chargers['CHARGER_ID'].tolist(),
+        chargers['STATUS_LAST_SEEN'].astype(str).tolist(),
+        chargers['SITE_ID'].astype(str).tolist(),
+    )
+    return time.time()
+
+@st.cache_resource
+def get_status_feed():
+    # CHARGER_STATUS_FEED_PATH is a JSONL stand-in for the events table
+    feed_path = os.environ.get('CHARGER_STATUS_FEED_PATH')
+    if feed_path:
+        return FileStatusFeed(feed_path)
+    table = os.environ.get('CHARGER_STATUS_TABLE')
+    store = get_charger_store()
+    if not table or store is None:
+        return None
+    # Events older than the loaded snapshot are already reflected in it
+    return TableStatusFeed(store.source, table, watermark=store.watermark)
+
+def poll_status_feed(live):
+    """Apply pending status deltas to the live fleet; returns how many rows changed"""
+    feed = get_status_feed()
+    if feed is None:
+        return 0
+    return live.apply(feed.poll())
+
+# Seconds between status feed polls while live updates are on
+LIVE_REFRESH_SECONDS = int(os.environ.get('LIVE_REFRESH_SECONDS', '5'))
+
+def get_kpis():
+    """
+    KPI source for this run: pushed-down queries, or the in-memory fleet with
+    pending status deltas applied. Fragments call it too, so a fragment rerun
+    sees the same data a full rerun would.
+    """
+    kpis = get_kpi_queries()
+    if kpis is None:
+        version, raw_chargers = fetch_charger_data()
+        kpis = load_fleet(version, raw_chargers)
+        poll_status_feed(kpis.live)
+    sync_alerts(kpis.data_version, kpis)
+    return kpis
+
+@st.cache_resource
+def get_session_store():
+    # SESSIONS_PARQUET_ROOT holds daily partitions: <root>/date=YYYY-MM-DD/*.parquet
+    parquet_root = os.environ.get('SESSIONS_PARQUET_ROOT')
+    if parquet_root:
+        return SessionStore(ParquetSessionSource(parquet_root))
+    connection = get_snowflake_connection()
+    if connection is None:
+        return None
+    return SessionStore(SnowflakeSessionSource(
+        connection, table=os.environ.get('SESSIONS_TABLE', 'CHARGING_SESSIONS')
+    ))
+
+@st.cache_resource(max_entries=2)
+def get_sample_session_store(version, _kpis):
+    # Synthetic sessions over the current fleet when no session source is configured
+    chargers = _kpis.charger_sites()
+    return SessionStore(SampleSessionSource(chargers['CHARGER_ID'], chargers['SITE_ID']))
+
+# Columns shown in the per-site charger tables, and their display names
+CHARGER_TABLE_COLUMNS = {
+    'CHARGER_ID': 'Charger ID',
+    'MODEL': 'Model',
+    'MAX_POWER_KW': 'Power (kW)',
+    'STATUS_LAST_SEEN': 'Status',
+    'FIRMWARE_VERSION': 'Firmware',
+}
+
+# Locations page sizes - keeps widget count and materialized rows flat as the fleet grows
+SITES_PER_PAGE = 10
+CHARGERS_PER_PAGE = 100
+
+def page_offset(total, page_size, key, label):
+    """Show a page picker when needed and return the offset of the current page"""
+    pages = max((total + page_size - 1) // page_size, 1)
+    if pages == 1:
+        return 0
+    # Filters can shrink the page count under a previously selected page
+    if st.session_state.get(key, 1) > pages:
+        st.session_state[key] = pages
+    page = st.number_input(f"{label} (of {pages})", min_value=1, max_value=pages, key=key)
+    start = (page - 1) * page_size
+    st.caption(f"Showing {start + 1}-{min(start + page_size, total)} of {total}")
+    return start
+
+# Sessions page - default window, longest window and table page size
+SESSION_WINDOW_DAYS = 7
+MAX_SESSION_WINDOW_DAYS = 366
+SESSIONS_PER_PAGE = 50
+
+SESSION_TABLE_COLUMNS = {
+    'SESSION_ID': 'Session ID',
+    'CHARGER_ID': 'Charger ID',
+    'VEHICLE_ID': 'Vehicle ID',
+    'STATUS': 'Status',
+    'ENERGY_KWH': 'Energy (kWh)',
+    'DURATION_MIN': 'Duration (min)',
+    'STARTED_AT': 'Start Time',
+    'ENDED_AT': 'End Time',
+}
+
+# Sites beyond this many are folded into one "Other" bar in the power chart
+MAX_CHART_SITES = 50
+
+STATUS_COLORS = {
+    'Available': '#10b981',
+    'Charging': '#3b82f6', 
+    'Faulted': '#ef4444',
+    'Offline': '#6b7280',
+    'Maintenance': '#f59e0b'
+}
+
+def power_chart_data(site_power, max_sites=MAX_CHART_SITES, sites=None, total_power=None):
+    """
+    Small (labels, values) arrays for the power chart: the top sites by
+    power, plus one aggregated "Other" bar for the rest on large fleets.
+    `site_power` may hold only the top sites; `sites` and `total_power`
+    are then the fleet-wide figures the "Other" bar is taken from.
+    """
+    sites = len(site_power) if sites is None else sites
+    total_power = site_power.sum() if total_power is None else total_power
+    if sites <= max_sites:
+        return site_power.index.astype(str).to_numpy(), site_power.to_numpy()
+    top = site_power.nlargest(max_sites)
+    other = total_power - top.sum()
+    labels = np.append(top.index.astype(str).to_numpy(), f"Other ({sites - max_sites} sites)")
+    return labels, np.append(top.to_numpy(), other)
 
 def create_status_chart(status_breakdown):
     if not status_breakdown:
         return None
     
-    colors = {
-        'Available': '#10b981',
-        'Charging': '#3b82f6', 
-        'Faulted': '#ef4444',
-        'Offline': '#6b7280',
-        'Maintenance': '#f59e0b'
-    }
-    
     fig = go.Figure(data=[go.Pie(
         labels=list(status_breakdown.keys()),
         values=list(status_breakdown.values()),
-        marker=dict(colors=[colors.get(label, '#94a3b8') for label in status_breakdown.keys()]),
+        marker=dict(colors=[STATUS_COLORS.get(label, '#94a3b8') for label in status_breakdown.keys()]),
         textinfo='label+percent+value',
         textfont_size=12
     )])
@@ -267,266 +466,333 @@ def create_status_chart(status_breakdown):
     
     return fig
 
-def create_power_chart(chargers):
-    if not chargers:
+def create_power_chart(site_power, sites=None, total_power=None):
+    # site_power: total MAX_POWER_KW per SITE_ID, from metrics['site_summary']
+    if site_power.empty:
         return None
     
-    site_power = {}
-    for charger in chargers:
-        site = charger.get('SITE_ID', 'Unknown')
-        power = charger.get('MAX_POWER_KW', 0)
-        site_power[site] = site_power.get(site, 0) + power
+    labels, values = power_chart_data(site_power, sites=sites, total_power=total_power)
+    fig = go.Figure(data=[go.Bar(
+        x=labels,
+        y=values,
+        marker=dict(color=values, colorscale='Blues')
+    )])
     
-    fig = px.bar(
-        x=list(site_power.keys()),
-        y=list(site_power.values()),
+    fig.update_layout(
         title="Total Power Capacity by Site",
-        labels={'x': 'Site', 'y': 'Power (kW)'},
-        color=list(site_power.values()),
-        color_continuous_scale='Blues'
+        xaxis_title="Site",
+        yaxis_title="Power (kW)",
+        height=400,
+        showlegend=False
     )
-    
-    fig.update_layout(height=400, showlegend=False)
     return fig
 
+@st.cache_resource(max_entries=64)
+def get_dashboard_charts(data_version, site_filter, status_filter, _metrics):
+    # Figures are only rebuilt when the data version or the filters change
+    return (
+        create_status_chart(_metrics['status_breakdown']),
+        create_power_chart(_metrics['site_summary']['power'], _metrics['sites'], _metrics['total_power']),
+    )
+
+def sidebar_filters(container, kpis):
+    """
+    Site and status filters (None for "All"), drawn into the sidebar by each
+    page fragment so that changing one reruns only that page's body
+    """
+    with container:
+        site_filter = st.selectbox("Site", ["All"] + kpis.site_options, key="site_filter")
+        status_filter = st.selectbox("Status", ["All"] + kpis.status_options, key="status_filter")
+    return (
+        None if site_filter == "All" else site_filter,
+        None if status_filter == "All" else status_filter,
+    )
+
+def fleet_overview():
+    # Fleet-wide KPIs - with live status on, this fragment polls and redraws on its own timer
+    metrics = get_kpis().summary()
+    col1, col2, col3, col4, col5 = st.columns(5)
+    
+    with col1:
+        st.metric(
+            label="Total Chargers",
+            value=metrics['total_chargers'],
+            delta=f"{metrics['sites']} sites"
+        )
+    
+    with col2:
+        st.metric(
+            label="Active Chargers", 
+            value=metrics['active_chargers'],
+            delta=f"{metrics['uptime_percentage']:.1f}% uptime"
+        )
+    
+    with col3:
+        st.metric(
+            label="Total Power",
+            value=f"{metrics['total_power']:,} kW",
+            delta=f"{metrics['total_power']/1000:.1f} MW"
+        )
+    
+    with col4:
+        st.metric(
+            label="Active Sites",
+            value=metrics['sites'],
+            delta="2 locations"
+        )
+    
+    with col5:
+        st.metric(
+            label="System Health",
+            value=f"{metrics['uptime_percentage']:.1f}%",
+            delta="Excellent" if metrics['uptime_percentage'] > 90 else "Good" if metrics['uptime_percentage'] > 75 else "Needs Attention"
+        )
+
+def dashboard_charts(filters):
+    kpis = get_kpis()
+    site, status = sidebar_filters(filters, kpis)
+    # Read before the metrics, so they are never older than the version they're cached under
+    version = kpis.version
+    filtered_metrics = kpis.summary(site, status)
+    if site is not None or status is not None:
+        st.caption(f"{filtered_metrics['total_chargers']:,} of {kpis.summary()['total_chargers']:,} chargers match the filters")
+    
+    col1, col2 = st.columns(2)
+    
+    # Figures are memoized per data version (status revision or table fingerprint) and filters
+    status_chart, power_chart = get_dashboard_charts(version, site, status, filtered_metrics)
+    
+    with col1:
+        if status_chart:
+            st.plotly_chart(status_chart, use_container_width=True)
+    
+    with col2:
+        if power_chart:
+            st.plotly_chart(power_chart, use_container_width=True)
+
+def locations_page(filters):
+    kpis = get_kpis()
+    site, status = sidebar_filters(filters, kpis)
+    filtered_metrics = kpis.summary(site, status)
+    
+    if not filtered_metrics['total_chargers']:
+        st.warning("No chargers match the selected filters.")
+        return
+    
+    # Show site overview
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Total Sites", filtered_metrics['sites'])
+    with col2:
+        st.metric("Total Chargers", filtered_metrics['total_chargers'])
+    with col3:
+        st.metric("Active Chargers", filtered_metrics['active_chargers'])
+    with col4:
+        st.metric("Total Power", f"{filtered_metrics['total_power']} kW")
+    
+    st.markdown("---")
+    
+    # Site details - only the current page of sites is fetched and rendered
+    site_offset = page_offset(filtered_metrics['sites'], SITES_PER_PAGE, 'locations_page', "Site page")
+    site_page = kpis.site_page(site, status, site_offset, SITES_PER_PAGE)
+    for site_id, site_row in site_page.iterrows():
+        st.markdown(f"### {site_id.replace('_', ' ').title()}")
+        
+        # Site metrics
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Chargers", int(site_row['chargers']))
+        with col2:
+            st.metric("Active", int(site_row['active']))
+        with col3:
+            st.metric("Uptime", f"{site_row['uptime']:.1f}%")
+        with col4:
+            st.metric("Power", f"{site_row['power']:.0f} kW")
+        
+        # Charger details - only the current page of the site's chargers
+        offset = page_offset(int(site_row['chargers']), CHARGERS_PER_PAGE, f'chargers_page_{site_id}', "Charger page")
+        st.dataframe(
+            kpis.site_chargers(site_id, status, offset, CHARGERS_PER_PAGE, list(CHARGER_TABLE_COLUMNS)),
+            use_container_width=True,
+            hide_index=True,
+            column_config=CHARGER_TABLE_COLUMNS,
+        )
+        
+        st.markdown("---")
+
+def sessions_page(filters):
+    kpis = get_kpis()
+    # Only the site filter is pushed down - sessions don't carry charger status
+    site, _ = sidebar_filters(filters, kpis)
+    session_store = get_session_store() or get_sample_session_store(kpis.data_version, kpis)
+    
+    today = datetime.now().date()
+    window = st.date_input(
+        "Window",
+        value=(today - timedelta(days=SESSION_WINDOW_DAYS - 1), today),
+        min_value=today - timedelta(days=MAX_SESSION_WINDOW_DAYS - 1),
+        max_value=today,
+    )
+    if not isinstance(window, tuple) or len(window) != 2:
+        st.info("Select a start and end date.")
+        return
+    with st.spinner('Loading sessions...'):
+        summary = session_store.window(window[0], window[1], site=site)
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Sessions", f"{summary['sessions']:,}")
+    with col2:
+        st.metric("Energy Delivered", f"{summary['energy_kwh']:,.0f} kWh")
+    with col3:
+        st.metric("Failure Rate", f"{summary['failure_rate']:.1f}%")
+    with col4:
+        st.metric("Chargers Used", f"{len(summary['sessions_by_charger']):,}")
+    
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        st.markdown("**Energy per Hour**")
+        st.line_chart(summary['energy_by_hour'], height=250)
+    with col2:
+        st.markdown("**Sessions per Charger**")
+        st.dataframe(
+            summary['sessions_by_charger'].head(20).rename('Sessions').rename_axis('Charger ID'),
+            height=250,
+        )
+    
+    if summary['sessions']:
+        offset = page_offset(summary['sessions'], SESSIONS_PER_PAGE, "sessions_page", "Page")
+        # Reads only the daily partitions that overlap this page
+        sessions = session_store.page(summary, offset, SESSIONS_PER_PAGE, site=site)
+        st.dataframe(
+            sessions[list(SESSION_TABLE_COLUMNS)],
+            hide_index=True,
+            column_config=SESSION_TABLE_COLUMNS,
+        )
+    else:
+        st.warning("No sessions available.")
+
+def tickets_page(filters):
+    kpis = get_kpis()
+    site, status = sidebar_filters(filters, kpis)
+    
+    # Create sample ticket data
+    sample_tickets = []
+    for i, charger_id in enumerate(kpis.charger_ids(site, status, limit=8)):
+        sample_tickets.append({
+            'Ticket ID': f"TKT-{i:06d}",
+            'Charger ID': charger_id,
+            'Title': ['Firmware Update Required', 'Maintenance Scheduled', 'Performance Check'][i % 3],
+            'Priority': ['P1-Critical', 'P2-High', 'P3-Medium', 'P4-Low'][i % 4],
+            'Status': ['Open', 'In Progress', 'Resolved', 'Escalated'][i % 4],
+            'Assigned To': ['John Smith', 'Jane Doe'][i % 2],
+            'Created': (datetime.now() - timedelta(days=i*3)).strftime('%Y-%m-%d'),
+            'SLA': '2 days' if i % 4 == 0 else '5 days'
+        })
+    
+    if sample_tickets:
+        df = pd.DataFrame(sample_tickets)
+        st.dataframe(df, use_container_width=True)
+    else:
+        st.warning("No tickets available.")
+
+ALERTS_PER_PAGE = 50
+
+def alert_action(action, alert_ids):
+    # Button callback - runs before the page redraws, so the table shows the result
+    action(alert_ids)
+    st.session_state["alert_actions"] += 1
+
+def alerts_page(filters):
+    kpis = get_kpis()
+    site, status = sidebar_filters(filters, kpis)
+    engine = get_alert_engine()
+    
+    counts = engine.counts()
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Active Alerts", f"{counts['active']:,}")
+    with col2:
+        st.metric("Unacknowledged", f"{counts['unacknowledged']:,}")
+    with col3:
+        st.metric("Errors", f"{counts['by_severity'].get('ERROR', 0):,}")
+    with col4:
+        st.metric("Warnings", f"{counts['by_severity'].get('WARNING', 0):,}")
+    
+    total = engine.count(site, status)
+    if not total:
+        st.success("No active alerts.")
+        return
+    offset = page_offset(total, ALERTS_PER_PAGE, "alerts_page", "Page")
+    alerts = engine.page(site, status, offset, ALERTS_PER_PAGE)
+    # A new table key after each action clears the row selection
+    actions = st.session_state.setdefault("alert_actions", 0)
+    selection = st.dataframe(
+        alerts,
+        use_container_width=True,
+        hide_index=True,
+        on_select="rerun",
+        selection_mode="multi-row",
+        key=f"alerts_table_{actions}",
+    )
+    rows = [row for row in selection.selection.rows if row < len(alerts)]
+    selected = alerts['Alert ID'].iloc[rows].tolist()
+    
+    col1, col2, _ = st.columns([1, 1, 4])
+    with col1:
+        st.button("Acknowledge", disabled=not selected, on_click=alert_action, args=(engine.acknowledge, selected))
+    with col2:
+        st.button("Resolve", disabled=not selected, on_click=alert_action, args=(engine.resolve, selected))
+
+# Page title and body fragment for each page
+PAGES = {
+    "Dashboard": ("Dashboard Overview", dashboard_charts),
+    "Locations": ("Charging Locations", locations_page),
+    "Sessions": ("Charging Sessions", sessions_page),
+    "Tickets": ("Maintenance Tickets", tickets_page),
+    "Alerts": ("System Alerts", alerts_page),
+}
+
 def main():
     # Fetch data
     with st.spinner('Loading charger data...'):
-        chargers = fetch_charger_data()
+        kpis = get_kpis()
+        metrics = kpis.summary()
     
-    if not chargers:
+    if metrics['total_chargers'] == 0:
         st.error("No charger data available.")
         return
     
-    # Calculate metrics
-    metrics = calculate_metrics(chargers)
-    
     # Sidebar Navigation
     st.sidebar.markdown("## 🐦 Pigeon")
     st.sidebar.markdown("EV Charging Platform")
     st.sidebar.markdown("---")
     
-    # Navigation buttons
-    pages = ["Dashboard", "Locations", "Sessions", "Tickets", "Alerts"]
-    page = st.sidebar.radio("", pages, index=0)
+    # Navigation buttons - switching pages is the only full rerun
+    page = st.sidebar.radio("", list(PAGES), index=0)
     
-    # Filter options
+    # Filter widgets are drawn here by the page fragment
     st.sidebar.markdown("### Filters")
-    site_filter = st.sidebar.selectbox(
-        "Site",
-        ["All"] + list(set(c.get('SITE_ID', '') for c in chargers))
-    )
+    filters = st.sidebar.container()
     
-    status_filter = st.sidebar.selectbox(
-        "Status", 
-        ["All"] + list(set(c.get('STATUS_LAST_SEEN', '') for c in chargers))
+    # Poll the status feed every few seconds and redraw the live parts only
+    live = (
+        isinstance(kpis, FrameKpis)
+        and get_status_feed() is not None
+        and st.sidebar.toggle("Live status", value=True)
     )
+    run_every = LIVE_REFRESH_SECONDS if live else None
     
-    # Apply filters
-    filtered_chargers = chargers.copy()
-    if site_filter != "All":
-        filtered_chargers = [c for c in filtered_chargers if c.get('SITE_ID') == site_filter]
-    if status_filter != "All":
-        filtered_chargers = [c for c in filtered_chargers if c.get('STATUS_LAST_SEEN') == status_filter]
-    
-    # Page Content
+    # Page Content - each body is a fragment, so its filter and paging widgets
+    # rerun only that body
+    title, body = PAGES[page]
+    st.markdown(f'<h2 class="section-header">{title}</h2>', unsafe_allow_html=True)
     if page == "Dashboard":
-        # Main dashboard
-        st.markdown('<h2 class="section-header">Dashboard Overview</h2>', unsafe_allow_html=True)
-        
-        # Key metrics
-        col1, col2, col3, col4, col5 = st.columns(5)
-        
-        with col1:
-            st.metric(
-                label="Total Chargers",
-                value=metrics['total_chargers'],
-                delta=f"{len(filtered_chargers)} filtered"
-            )
-        
-        with col2:
-            st.metric(
-                label="Active Chargers", 
-                value=metrics['active_chargers'],
-                delta=f"{metrics['uptime_percentage']:.1f}% uptime"
-            )
-        
-        with col3:
-            st.metric(
-                label="Total Power",
-                value=f"{metrics['total_power']:,} kW",
-                delta=f"{metrics['total_power']/1000:.1f} MW"
-            )
-        
-        with col4:
-            st.metric(
-                label="Active Sites",
-                value=metrics['sites'],
-                delta="2 locations"
-            )
-        
-        with col5:
-            st.metric(
-                label="System Health",
-                value=f"{metrics['uptime_percentage']:.1f}%",
-                delta="Excellent" if metrics['uptime_percentage'] > 90 else "Good" if metrics['uptime_percentage'] > 75 else "Needs Attention"
-            )
-        
+        st.fragment(fleet_overview, run_every=run_every)()
         st.markdown("---")
-        
-        # Charts section
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            status_chart = create_status_chart(metrics['status_breakdown'])
-            if status_chart:
-                st.plotly_chart(status_chart, use_container_width=True)
-        
-        with col2:
-            power_chart = create_power_chart(chargers)
-            if power_chart:
-                st.plotly_chart(power_chart, use_container_width=True)
-    
-    elif page == "Locations":
-        st.markdown('<h2 class="section-header">Charging Locations</h2>', unsafe_allow_html=True)
-        
-        if filtered_chargers:
-            # Group chargers by site
-            site_map = {}
-            for charger in filtered_chargers:
-                site_id = charger.get('SITE_ID', 'Unknown')
-                if site_id not in site_map:
-                    site_map[site_id] = {
-                        'id': site_id,
-                        'name': site_id.replace('_', ' ').title(),
-                        'chargers': []
-                    }
-                site_map[site_id]['chargers'].append(charger)
-            
-            # Show site overview
-            col1, col2, col3, col4 = st.columns(4)
-            with col1:
-                st.metric("Total Sites", len(site_map))
-            with col2:
-                total_chargers = sum(len(site['chargers']) for site in site_map.values())
-                st.metric("Total Chargers", total_chargers)
-            with col3:
-                active_chargers = sum(len([c for c in site['chargers'] if c.get('STATUS_LAST_SEEN') in ['Available', 'Charging']]) for site in site_map.values())
-                st.metric("Active Chargers", active_chargers)
-            with col4:
-                total_power = sum(sum(c.get('MAX_POWER_KW', 0) for c in site['chargers']) for site in site_map.values())
-                st.metric("Total Power", f"{total_power} kW")
-            
-            st.markdown("---")
-            
-            # Site details
-            for site_id, site_data in site_map.items():
-                st.markdown(f"### {site_data['name']}")
-                
-                # Site metrics
-                site_chargers = site_data['chargers']
-                active = len([c for c in site_chargers if c.get('STATUS_LAST_SEEN') in ['Available', 'Charging']])
-                total_power = sum(c.get('MAX_POWER_KW', 0) for c in site_chargers)
-                uptime = (active / len(site_chargers) * 100) if site_chargers else 0
-                
-                col1, col2, col3, col4 = st.columns(4)
-                with col1:
-                    st.metric("Chargers", len(site_chargers))
-                with col2:
-                    st.metric("Active", active)
-                with col3:
-                    st.metric("Uptime", f"{uptime:.1f}%")
-                with col4:
-                    st.metric("Power", f"{total_power} kW")
-                
-                # Charger details
-                df_data = []
-                for charger in site_chargers:
-                    status = charger.get('STATUS_LAST_SEEN', '')
-                    status_class = f"status-{status.lower()}" if status else ""
-                    df_data.append({
-                        'Charger ID': charger.get('CHARGER_ID', ''),
-                        'Model': charger.get('MODEL', ''),
-                        'Power (kW)': charger.get('MAX_POWER_KW', 0),
-                        'Status': status,
-                        'Firmware': charger.get('FIRMWARE_VERSION', ''),
-                    })
-                
-                if df_data:
-                    df = pd.DataFrame(df_data)
-                    st.dataframe(df, use_container_width=True)
-                
-                st.markdown("---")
-        else:
-            st.warning("No chargers match the selected filters.")
-    
-    elif page == "Sessions":
-        st.markdown('<h2 class="section-header">Charging Sessions</h2>', unsafe_allow_html=True)
-        
-        # Create sample session data
-        sample_sessions = []
-        for i, charger in enumerate(filtered_chargers[:10]):
-            sample_sessions.append({
-                'Session ID': f"SES_{i:06d}",
-                'Charger ID': charger.get('CHARGER_ID', ''),
-                'Vehicle ID': f"VEH_{i:04d}",
-                'Status': ['Active', 'Completed', 'Failed', 'Pending'][i % 4],
-                'Energy (kWh)': round(10 + (i * 5.5), 1),
-                'Duration (min)': 30 + (i * 15),
-                'Start Time': (datetime.now() - timedelta(hours=i*2)).strftime('%Y-%m-%d %H:%M'),
-                'End Time': (datetime.now() - timedelta(hours=i*2-1)).strftime('%Y-%m-%d %H:%M') if i % 4 != 0 else 'Ongoing'
-            })
-        
-        if sample_sessions:
-            df = pd.DataFrame(sample_sessions)
-            st.dataframe(df, use_container_width=True)
-        else:
-            st.warning("No sessions available.")
-    
-    elif page == "Tickets":
-        st.markdown('<h2 class="section-header">Maintenance Tickets</h2>', unsafe_allow_html=True)
-        
-        # Create sample ticket data
-        sample_tickets = []
-        for i, charger in enumerate(filtered_chargers[:8]):
-            sample_tickets.append({
-                'Ticket ID': f"TKT-{i:06d}",
-                'Charger ID': charger.get('CHARGER_ID', ''),
-                'Title': ['Firmware Update Required', 'Maintenance Scheduled', 'Performance Check'][i % 3],
-                'Priority': ['P1-Critical', 'P2-High', 'P3-Medium', 'P4-Low'][i % 4],
-                'Status': ['Open', 'In Progress', 'Resolved', 'Escalated'][i % 4],
-                'Assigned To': ['John Smith', 'Jane Doe'][i % 2],
-                'Created': (datetime.now() - timedelta(days=i*3)).strftime('%Y-%m-%d'),
-                'SLA': '2 days' if i % 4 == 0 else '5 days'
-            })
-        
-        if sample_tickets:
-            df = pd.DataFrame(sample_tickets)
-            st.dataframe(df, use_container_width=True)
-        else:
-            st.warning("No tickets available.")
-    
-    elif page == "Alerts":
-        st.markdown('<h2 class="section-header">System Alerts</h2>', unsafe_allow_html=True)
-        
-        # Create sample alert data
-        sample_alerts = []
-        for i, charger in enumerate(filtered_chargers[:5]):
-            sample_alerts.append({
-                'Alert ID': f"ALERT_{i:03d}",
-                'Charger ID': charger.get('CHARGER_ID', ''),
-                'Severity': ['WARNING', 'INFO', 'ERROR'][i % 3],
-                'Message': ['Firmware update available', 'Charger operating normally', 'Maintenance required'][i % 3],
-                'Status': 'Unacknowledged' if i % 2 == 0 else 'Acknowledged',
-                'Created': (datetime.now() - timedelta(hours=i)).strftime('%Y-%m-%d %H:%M'),
-                'Actions': 'Acknowledge' if i % 2 == 0 else 'Resolved'
-            })
-        
-        if sample_alerts:
-            df = pd.DataFrame(sample_alerts)
-            st.dataframe(df, use_container_width=True)
-        else:
-            st.warning("No alerts available.")
+        st.fragment(body, run_every=run_every)(filters)
+    else:
+        st.fragment(body)(filters)
     
     # Footer
     st.markdown("---")
@@ -540,4 +806,4 @@ def main():
     )
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
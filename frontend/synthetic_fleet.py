@@ -0,0 +1,259 @@
+"""
+Synthetic fleet - generated chargers, sessions, tickets and alerts at scale
+
+Everything is vectorized with numpy and seeded, so a given size always
+produces the same fleet. Sites are spread around a set of metro areas with
+skewed sizes (a few large hubs, many small sites), each site runs one
+charger model, and statuses follow a production-like mix - including whole
+sites that are offline together, the way a network outage looks. Tickets
+and alerts are concentrated on the chargers that are Faulted, Offline or
+in Maintenance.
+
+    python synthetic_fleet.py --chargers 100000 --out fleet.parquet
+"""
+import argparse
+import os
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from session_store import SampleSessionSource
+
+# (code, latitude, longitude)
+METROS = [
+    ('SF', 37.7749, -122.4194),
+    ('LA', 34.0522, -118.2437),
+    ('SEA', 47.6062, -122.3321),
+    ('PDX', 45.5152, -122.6784),
+    ('DEN', 39.7392, -104.9903),
+    ('PHX', 33.4484, -112.0740),
+    ('DAL', 32.7767, -96.7970),
+    ('CHI', 41.8781, -87.6298),
+    ('ATL', 33.7490, -84.3880),
+    ('MIA', 25.7617, -80.1918),
+    ('NYC', 40.7128, -74.0060),
+    ('BOS', 42.3601, -71.0589),
+]
+
+# (vendor, model, max power kW, connectors, firmware versions)
+MODELS = [
+    ('ABB', 'Terra184', 150, 2, ['v1.0.4', 'v1.1.0', 'v1.2.1']),
+    ('ABB', 'Terra54', 50, 2, ['v2.3.0', 'v2.4.2']),
+    ('Tritium', 'RTM75', 75, 1, ['4.1.2', '4.2.0']),
+    ('ChargePoint', 'CPE250', 62.5, 2, ['5.7.1', '5.8.0']),
+    ('Kempower', 'S-Series', 350, 2, ['1.26', '1.28', '1.31']),
+    ('BTC Power', 'Gen4 HPC', 350, 2, ['3.2.5']),
+]
+MODEL_WEIGHTS = [0.30, 0.20, 0.10, 0.20, 0.10, 0.10]
+
+# Per-charger status mix; OFFLINE_SITE_SHARE of sites are additionally offline as a whole
+STATUS_MIX = {
+    'Available': 0.58,
+    'Charging': 0.27,
+    'Offline': 0.06,
+    'Faulted': 0.05,
+    'Maintenance': 0.04,
+}
+OFFLINE_SITE_SHARE = 0.01
+
+NETWORK_TYPES = ['LTE', 'Ethernet', 'WiFi']
+NETWORK_WEIGHTS = [0.6, 0.3, 0.1]
+
+TICKET_TITLES = {
+    'Faulted': ['Connector Fault', 'Power Module Failure', 'Ground Fault Trip'],
+    'Offline': ['Communication Lost', 'Modem Replacement', 'Site Network Outage'],
+    'Maintenance': ['Maintenance Scheduled', 'Firmware Update Required', 'Cable Replacement'],
+    'Available': ['Performance Check', 'Screen Damage', 'Payment Terminal Issue'],
+    'Charging': ['Performance Check', 'Slow Charging Reported', 'Payment Terminal Issue'],
+}
+TICKET_PRIORITIES = ['P1-Critical', 'P2-High', 'P3-Medium', 'P4-Low']
+TICKET_STATUSES = ['Open', 'In Progress', 'Resolved', 'Escalated']
+TECHNICIANS = ['John Smith', 'Jane Doe', 'Alex Kim', 'Maria Garcia', 'Sam Patel', 'Chris Lee']
+
+ALERT_MESSAGES = {
+    'Faulted': ('ERROR', 'Charger reported a fault'),
+    'Offline': ('ERROR', 'Charger stopped sending heartbeats'),
+    'Maintenance': ('WARNING', 'Maintenance required'),
+    'Available': ('INFO', 'Firmware update available'),
+    'Charging': ('INFO', 'Charger operating normally'),
+}
+
+
+def _before(base, offsets, unit='D', fmt='%Y-%m-%d'):
+    """`base` minus each offset, formatted - only the distinct offsets go through strftime"""
+    distinct, inverse = np.unique(offsets, return_inverse=True)
+    labels = (pd.Timestamp(base) - pd.to_timedelta(distinct, unit=unit)).strftime(fmt)
+    return np.asarray(labels, dtype=object)[inverse]
+
+
+def generate_fleet(chargers, chargers_per_site=12, seed=0, today=None):
+    """
+    A DataFrame of `chargers` chargers with the CHARGERS table columns,
+    grouped into roughly chargers / chargers_per_site sites
+    """
+    rng = np.random.default_rng(seed)
+    today = today or date.today()
+    n_sites = min(max(chargers // chargers_per_site, 1), chargers)
+
+    # Skewed site sizes: one charger per site, the rest spread by lognormal weights
+    weights = rng.lognormal(0, 0.9, n_sites)
+    sizes = 1 + rng.multinomial(chargers - n_sites, weights / weights.sum()) if n_sites else np.zeros(0, dtype=np.int64)
+    site_of = np.repeat(np.arange(n_sites), sizes)
+    number_in_site = np.arange(chargers) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+
+    metro = rng.integers(0, len(METROS), n_sites)
+    metro_codes = np.array([m[0] for m in METROS])[metro]
+    site_ids = np.char.add(np.char.add('STN_', metro_codes), np.char.mod('_%05d', np.arange(n_sites)))
+    site_lat = np.array([m[1] for m in METROS])[metro] + rng.normal(0, 0.15, n_sites)
+    site_lon = np.array([m[2] for m in METROS])[metro] + rng.normal(0, 0.15, n_sites)
+
+    site_model = rng.choice(len(MODELS), n_sites, p=MODEL_WEIGHTS)
+    model = site_model[site_of]
+    firmware = np.empty(chargers, dtype=object)
+    for m, (_, _, _, _, versions) in enumerate(MODELS):
+        rows = np.flatnonzero(model == m)
+        firmware[rows] = np.array(versions, dtype=object)[rng.integers(0, len(versions), len(rows))]
+
+    statuses = np.array(list(STATUS_MIX), dtype=object)
+    status = statuses[rng.choice(len(statuses), chargers, p=list(STATUS_MIX.values()))]
+    offline_sites = rng.random(n_sites) < OFFLINE_SITE_SHARE
+    status[offline_sites[site_of]] = 'Offline'
+
+    install_days = rng.integers(30, 6 * 365, n_sites)[site_of]
+    since_maintenance = (rng.random(chargers) * install_days).astype(np.int64)
+
+    return pd.DataFrame({
+        'CHARGER_ID': np.char.add(site_ids[site_of], np.char.mod('_CHG_%02d', number_in_site + 1)).astype(object),
+        'SITE_ID': site_ids[site_of].astype(object),
+        'MODEL': np.array([m[1] for m in MODELS], dtype=object)[model],
+        'FIRMWARE_VERSION': firmware,
+        'VENDOR': np.array([m[0] for m in MODELS], dtype=object)[model],
+        'INSTALL_DATE': _before(today, install_days),
+        'NETWORK_TYPE': np.array(NETWORK_TYPES, dtype=object)[rng.choice(3, n_sites, p=NETWORK_WEIGHTS)][site_of],
+        'LOCATION_LAT': site_lat[site_of],
+        'LOCATION_LON': site_lon[site_of],
+        'NUM_CONNECTORS': np.array([m[3] for m in MODELS])[model],
+        'MAX_POWER_KW': np.array([m[2] for m in MODELS])[model],
+        'LAST_MAINTENANCE_DATE': _before(today, since_maintenance),
+        'STATUS_LAST_SEEN': status,
+    })
+
+
+def generate_tickets(fleet, per_charger=0.05, seed=0, today=None):
+    """
+    Maintenance tickets for `fleet`: chargers that are Faulted, Offline or in
+    Maintenance are ten times as likely to have one, and get higher priorities
+    """
+    rng = np.random.default_rng(seed + 1)
+    today = today or date.today()
+    status = fleet['STATUS_LAST_SEEN'].astype(str).to_numpy()
+    troubled = np.isin(status, ['Faulted', 'Offline', 'Maintenance'])
+    weights = np.where(troubled, 10.0, 1.0)
+    n = int(len(fleet) * per_charger)
+    if not n:
+        return pd.DataFrame(columns=['Ticket ID', 'Charger ID', 'Title', 'Priority', 'Status',
+                                     'Assigned To', 'Created', 'SLA'])
+    rows = rng.choice(len(fleet), n, p=weights / weights.sum())
+    ticket_status = status[rows]
+
+    titles = np.empty(n, dtype=object)
+    for charger_status, options in TICKET_TITLES.items():
+        match = np.flatnonzero(ticket_status == charger_status)
+        titles[match] = np.array(options, dtype=object)[rng.integers(0, len(options), len(match))]
+    priority = np.where(troubled[rows], rng.choice(2, n, p=[0.4, 0.6]), rng.choice([1, 2, 3], n, p=[0.2, 0.5, 0.3]))
+
+    return pd.DataFrame({
+        'Ticket ID': np.char.mod('TKT-%07d', np.arange(n)).astype(object),
+        'Charger ID': fleet['CHARGER_ID'].to_numpy()[rows],
+        'Title': titles,
+        'Priority': np.array(TICKET_PRIORITIES, dtype=object)[priority],
+        'Status': np.array(TICKET_STATUSES, dtype=object)[rng.choice(4, n, p=[0.35, 0.30, 0.30, 0.05])],
+        'Assigned To': np.array(TECHNICIANS, dtype=object)[rng.integers(0, len(TECHNICIANS), n)],
+        'Created': _before(today, rng.integers(0, 60, n)),
+        'SLA': np.where(priority < 2, '2 days', '5 days').astype(object),
+    })
+
+
+def generate_alerts(fleet, info_per_charger=0.01, seed=0, now=None):
+    """
+    One alert per charger that is Faulted, Offline or in Maintenance, plus
+    informational alerts on a sample of healthy chargers, from the last 48 hours
+    """
+    rng = np.random.default_rng(seed + 2)
+    now = pd.Timestamp(now or pd.Timestamp.now()).floor('min')
+    status = fleet['STATUS_LAST_SEEN'].astype(str).to_numpy()
+    troubled = np.flatnonzero(np.isin(status, ['Faulted', 'Offline', 'Maintenance']))
+    healthy = np.flatnonzero(~np.isin(status, ['Faulted', 'Offline', 'Maintenance']))
+    info = rng.choice(healthy, min(int(len(fleet) * info_per_charger), len(healthy)), replace=False)
+    rows = np.sort(np.concatenate([troubled, info]))
+    n = len(rows)
+
+    severity = np.empty(n, dtype=object)
+    message = np.empty(n, dtype=object)
+    for charger_status, (level, text) in ALERT_MESSAGES.items():
+        match = status[rows] == charger_status
+        severity[match] = level
+        message[match] = text
+    acknowledged = rng.random(n) < np.where(severity == 'INFO', 0.7, 0.4)
+
+    return pd.DataFrame({
+        'Alert ID': np.char.mod('ALERT_%07d', np.arange(n)).astype(object),
+        'Charger ID': fleet['CHARGER_ID'].to_numpy()[rows],
+        'Severity': severity,
+        'Message': message,
+        'Status': np.where(acknowledged, 'Acknowledged', 'Unacknowledged').astype(object),
+        'Created': _before(now, rng.integers(0, 48 * 60, n), unit='m', fmt='%Y-%m-%d %H:%M'),
+    })
+
+
+def write_sessions(fleet, root, days=7, sessions_per_charger=3, max_sessions_per_day=500_000, today=None):
+    """
+    Write `days` days of sessions (ending today) as daily Parquet partitions
+    under `root`, the layout ParquetSessionSource reads; returns the row count
+    """
+    today = today or date.today()
+    source = SampleSessionSource(
+        fleet['CHARGER_ID'], fleet['SITE_ID'].astype(str),
+        sessions_per_charger=sessions_per_charger, max_sessions_per_day=max_sessions_per_day,
+    )
+    total = 0
+    for offset in range(days):
+        day = today - timedelta(days=offset)
+        sessions = source.read_day(day)
+        partition = os.path.join(root, f'date={day.isoformat()}')
+        os.makedirs(partition, exist_ok=True)
+        # Sorted by site so row-group statistics can skip sites on filtered reads
+        sessions.sort_values(['SITE_ID', 'STARTED_AT']).to_parquet(
+            os.path.join(partition, 'part-0.parquet'), index=False, row_group_size=50_000,
+        )
+        total += len(sessions)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic charger fleet")
+    parser.add_argument("--chargers", type=int, default=10_000)
+    parser.add_argument("--chargers-per-site", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Write the fleet here (.parquet or .csv)")
+    parser.add_argument("--sessions-root", help="Also write daily session partitions under this directory")
+    parser.add_argument("--session-days", type=int, default=7)
+    args = parser.parse_args()
+
+    fleet = generate_fleet(args.chargers, args.chargers_per_site, args.seed)
+    print(f"{len(fleet):,} chargers across {fleet['SITE_ID'].nunique():,} sites")
+    print(fleet['STATUS_LAST_SEEN'].value_counts(normalize=True).round(3).to_string())
+    if args.out:
+        if args.out.endswith('.csv'):
+            fleet.to_csv(args.out, index=False)
+        else:
+            fleet.to_parquet(args.out, index=False)
+        print(f"Wrote {args.out}")
+    if args.sessions_root:
+        count = write_sessions(fleet, args.sessions_root, days=args.session_days)
+        print(f"Wrote {count:,} sessions under {args.sessions_root}")
+
+
+if __name__ == "__main__":
+    main()
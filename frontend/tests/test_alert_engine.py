@@ -0,0 +1,80 @@
+from alert_engine import AlertEngine
+
+
+def test_refault_within_cooldown_opens_once_cooldown_lapses():
+    engine = AlertEngine(cooldown=300)
+    engine.observe('C1', 'Faulted', 0)
+    engine.observe('C1', 'Available', 10)
+    engine.observe('C1', 'Faulted', 20)
+    assert engine.counts()['active'] == 0
+
+    # The feed only sends changes, so nothing else arrives while it stays Faulted
+    engine.snapshot(['C1'], ['Faulted'], at=400)
+    assert engine.counts()['active'] == 1
+    assert engine.store.find('C1', 'faulted') is not None
+
+
+def test_deferred_alert_dropped_if_charger_recovers():
+    engine = AlertEngine(cooldown=300)
+    engine.observe('C1', 'Faulted', 0)
+    engine.observe('C1', 'Available', 10)
+    engine.observe('C1', 'Faulted', 20)
+    engine.observe('C1', 'Available', 30)
+    engine.expire(at=400)
+    assert engine.store.find('C1', 'faulted') is None
+
+
+def test_fault_opens_and_recovery_resolves():
+    engine = AlertEngine()
+    engine.observe('C1', 'Faulted', 0, site='S1')
+    alert = engine.store.find('C1', 'faulted')
+    assert alert is not None and alert.site == 'S1'
+    engine.observe('C1', 'Available', 60)
+    assert engine.store.find('C1', 'faulted') is None
+    assert engine.store.resolved[-1] is alert and alert.resolved == 60
+
+
+def test_repeated_status_bumps_the_open_alert():
+    engine = AlertEngine()
+    engine.process(['C1'], ['Offline'], at=0)
+    engine.process(['C1'], ['Offline'], at=30)
+    assert len(engine.store) == 1
+    assert engine.store.find('C1', 'offline').count == 2
+    assert engine.stats['deduplicated'] == 1
+
+
+def test_flapping_fires_within_window_and_expires_when_quiet():
+    engine = AlertEngine(cooldown=0)
+    for at, status in enumerate(['Charging', 'Available', 'Charging', 'Available']):
+        engine.observe('C1', status, at * 10)
+    alert = engine.store.find('C1', 'flapping')
+    assert alert is not None
+    engine.expire(at=30 + 601)
+    assert engine.store.find('C1', 'flapping') is None
+
+
+def test_acknowledge_and_resolve_by_id():
+    engine = AlertEngine()
+    engine.process(['C1', 'C2'], ['Faulted', 'Maintenance'], at=0)
+    alert_id = engine.store.find('C1', 'faulted').alert_id
+    assert engine.acknowledge([alert_id, 'ALERT_missing'], at=5) == 1
+    assert engine.counts()['unacknowledged'] == 1
+    assert engine.resolve([alert_id], at=6) == 1
+    assert engine.counts()['active'] == 1
+
+
+def test_snapshot_resolves_chargers_no_longer_alerting():
+    engine = AlertEngine()
+    engine.snapshot(['C1', 'C2'], ['Faulted', 'Offline'], at=0)
+    assert engine.counts()['active'] == 2
+    engine.snapshot(['C2'], ['Offline'], at=100)
+    assert engine.store.find('C1', 'faulted') is None
+    assert engine.store.find('C2', 'offline') is not None
+
+
+def test_page_filters_by_site_newest_first():
+    engine = AlertEngine()
+    engine.process(['C1', 'C2', 'C3'], ['Faulted', 'Faulted', 'Offline'], at=0, sites=['S1', 'S2', 'S1'])
+    page = engine.page(site='S1')
+    assert page['Charger ID'].tolist() == ['C3', 'C1']
+    assert engine.count(site='S1', status='Faulted') == 1
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from compact_fleet import ChargerRows, align_categories, compact_frame
+from synthetic_fleet import generate_fleet
+
+
+def test_power_ratings_sum_as_entered():
+    frame = compact_frame(pd.DataFrame({
+        'CHARGER_ID': ['a', 'b', 'c', 'd'],
+        'MAX_POWER_KW': [7.2, 7.2, 19.2, 11.5],
+    }))
+    assert frame['MAX_POWER_KW'].sum() == 45.1
+    assert ChargerRows(frame)[2].get('MAX_POWER_KW') == 19.2
+
+
+def test_rows_read_back_the_original_records():
+    fleet = generate_fleet(500)
+    rows = ChargerRows(compact_frame(fleet))
+    assert len(rows) == len(fleet)
+    for i in (0, 137, 499):
+        original, row = fleet.iloc[i].to_dict(), dict(rows[i])
+        assert set(row) == set(original)
+        for column in ('CHARGER_ID', 'SITE_ID', 'MODEL', 'FIRMWARE_VERSION', 'VENDOR', 'NETWORK_TYPE',
+                       'STATUS_LAST_SEEN', 'INSTALL_DATE', 'LAST_MAINTENANCE_DATE', 'NUM_CONNECTORS',
+                       'MAX_POWER_KW'):
+            assert row[column] == original[column], column
+        assert abs(row['LOCATION_LAT'] - original['LOCATION_LAT']) < 1e-4
+        assert abs(row['LOCATION_LON'] - original['LOCATION_LON']) < 1e-4
+
+
+def test_compact_types_and_missing_values():
+    frame = compact_frame(pd.DataFrame({
+        'CHARGER_ID': ['a', 'b'],
+        'MODEL': ['Terra54', None],
+        'STATUS_LAST_SEEN': ['Charging', None],
+        'INSTALL_DATE': ['2024-03-01', None],
+        'LOCATION_LAT': [37.7749, None],
+        'MAX_POWER_KW': [50, None],
+    }))
+    assert frame['STATUS_LAST_SEEN'].cat.codes.dtype == np.int8
+    assert frame['LOCATION_LAT'].dtype == np.float32
+    assert frame['MAX_POWER_KW'].dtype == np.float64
+    row = ChargerRows(frame)[1]
+    assert row.get('MODEL') == ''
+    assert row.get('STATUS_LAST_SEEN') == 'Unknown'
+    assert row.get('INSTALL_DATE') is None
+    assert row.get('MAX_POWER_KW') == 0
+    assert ChargerRows(frame)[0].get('INSTALL_DATE') == '2024-03-01'
+
+
+def test_recompacting_is_a_no_op():
+    frame = compact_frame(generate_fleet(50))
+    again = compact_frame(frame)
+    assert (again.dtypes == frame.dtypes).all()
+    assert again['SITE_ID'].cat.categories.equals(frame['SITE_ID'].cat.categories)
+
+
+def test_align_categories_adds_new_values():
+    frame = compact_frame(pd.DataFrame({'CHARGER_ID': ['a'], 'MODEL': ['Terra54']}))
+    delta = align_categories(frame, compact_frame(pd.DataFrame({'CHARGER_ID': ['b'], 'MODEL': ['RTM75']})))
+    assert delta['MODEL'].dtype == frame['MODEL'].dtype
+    assert list(pd.concat([frame, delta])['MODEL']) == ['Terra54', 'RTM75']
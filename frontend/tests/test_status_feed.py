@@ -0,0 +1,39 @@
+import json
+
+import pandas as pd
+
+from filter_index import FilterIndex
+from fleet_metrics import to_fleet_frame
+from status_feed import FileStatusFeed, LiveFleet
+
+
+def event(charger_id, status, at):
+    return json.dumps({'CHARGER_ID': charger_id, 'STATUS': status, 'EVENT_TIME': at}) + '\n'
+
+
+def test_file_feed_keeps_latest_and_leaves_partial_line(tmp_path):
+    path = tmp_path / 'feed.jsonl'
+    path.write_text(event('C1', 'Charging', 2) + event('C1', 'Faulted', 1) + event('C2', 'Offline', 1)[:-5])
+    feed = FileStatusFeed(str(path))
+    deltas = feed.poll()
+    assert deltas.set_index('CHARGER_ID')['STATUS'].to_dict() == {'C1': 'Charging'}
+
+    with open(path, 'a') as f:
+        f.write(event('C2', 'Offline', 1)[-5:])
+    assert feed.poll()['CHARGER_ID'].tolist() == ['C2']
+    assert feed.poll().empty
+
+
+def test_live_fleet_applies_only_changes():
+    fleet = to_fleet_frame([
+        {'CHARGER_ID': 'C1', 'SITE_ID': 'S1', 'MAX_POWER_KW': 50, 'STATUS_LAST_SEEN': 'Available'},
+        {'CHARGER_ID': 'C2', 'SITE_ID': 'S1', 'MAX_POWER_KW': 150, 'STATUS_LAST_SEEN': 'Charging'},
+    ])
+    applied = []
+    live = LiveFleet(fleet, FilterIndex(fleet), on_apply=lambda ids, statuses: applied.extend(ids))
+    deltas = pd.DataFrame({'CHARGER_ID': ['C1', 'C2', 'C9'], 'STATUS': ['Faulted', 'Charging', 'Faulted']})
+    assert live.apply(deltas) == 1
+    assert applied == ['C1']
+    assert live.ignored == 1
+    assert live.frame['STATUS_LAST_SEEN'].tolist() == ['Faulted', 'Charging']
+    assert live.revision == 1
@@ -0,0 +1,238 @@
+"""
+Audio capture - streams microphone (or WAV file) audio into a realtime session
+
+Frames are captured into a fixed set of preallocated pcm16 buffers, so the
+steady state does no per-frame allocation: the sounddevice callback converts
+into a free buffer, the event loop sends it and hands it back to the pool.
+"""
+import asyncio
+import time
+import wave
+from collections import deque
+
+import numpy as np
+import sounddevice as sd
+
+# The realtime session is configured for pcm16 mono at 24 kHz
+SAMPLE_RATE = 24000
+FRAME_MS = 20
+
+
+def float_to_pcm16(samples, scratch, out):
+    """Convert float32 samples in [-1, 1] into `out` (int16) using `scratch` - no allocation"""
+    np.multiply(samples, 32767.0, out=scratch)
+    np.clip(scratch, -32768.0, 32767.0, out=scratch)
+    np.copyto(out, scratch, casting="unsafe")
+
+
+class FramePool:
+    """Fixed set of reusable pcm16 frame buffers"""
+
+    def __init__(self, frame_samples, count):
+        self.frame_samples = frame_samples
+        self._free = deque(np.zeros(frame_samples, dtype=np.int16) for _ in range(count))
+
+    def acquire(self):
+        """Take a free buffer, or None when every buffer is in flight"""
+        try:
+            return self._free.popleft()
+        except IndexError:
+            return None
+
+    def release(self, frame):
+        self._free.append(frame)
+
+
+class MicrophoneSource:
+    """Captures the default (or given) input device in fixed-size frames"""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, frame_ms=FRAME_MS, pool_frames=64, device=None):
+        self.sample_rate = sample_rate
+        self.frame_samples = int(sample_rate * frame_ms / 1000)
+        self.pool = FramePool(self.frame_samples, pool_frames)
+        self.device = device
+        self.overflows = 0
+
+        self._scratch = np.zeros(self.frame_samples, dtype=np.float32)
+        self._queue = None
+        self._loop = None
+        self._stream = None
+
+    def _callback(self, indata, frames, time_info, status):
+        if status:
+            self.overflows += 1
+        frame = self.pool.acquire()
+        if frame is None:
+            # The sender has fallen behind; drop rather than allocate
+            self.overflows += 1
+            return
+        float_to_pcm16(indata[:, 0], self._scratch, frame)
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, frame)
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._stream = sd.InputStream(
+            samplerate=self.sample_rate,
+            channels=1,
+            dtype="float32",
+            blocksize=self.frame_samples,
+            latency="low",
+            device=self.device,
+            callback=self._callback,
+        )
+        self._stream.start()
+
+    async def read(self):
+        """Next captured frame, or None when the source is exhausted"""
+        return await self._queue.get()
+
+    def stop(self):
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+
+class WavFileSource:
+    """
+    Plays a pcm16 mono WAV file as if it were the microphone - for measuring
+    end-to-end latency without audio hardware. Frames are paced in real time
+    unless `realtime=False`, and `trailing_silence_ms` of silence follows the
+    file so server-side VAD sees the end of speech.
+    """
+
+    def __init__(self, path, sample_rate=SAMPLE_RATE, frame_ms=FRAME_MS,
+                 realtime=True, trailing_silence_ms=1500):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.frame_samples = int(sample_rate * frame_ms / 1000)
+        self.frame_seconds = frame_ms / 1000
+        self.realtime = realtime
+        self.pool = FramePool(self.frame_samples, 2)
+        self.overflows = 0
+        # time.perf_counter() when the last frame of the file itself was read
+        self.speech_ended_at = None
+
+        self._silence_frames = int(trailing_silence_ms / frame_ms)
+        self._wav = None
+        self._next_deadline = None
+
+    async def start(self):
+        self._wav = wave.open(self.path, "rb")
+        if (self._wav.getnchannels(), self._wav.getsampwidth(), self._wav.getframerate()) != (1, 2, self.sample_rate):
+            self._wav.close()
+            raise ValueError(f"{self.path} must be 16-bit mono PCM at {self.sample_rate} Hz")
+        self._next_deadline = time.monotonic()
+
+    async def read(self):
+        if self.realtime:
+            self._next_deadline += self.frame_seconds
+            delay = self._next_deadline - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        frame = self.pool.acquire()
+        data = self._wav.readframes(self.frame_samples) if self.speech_ended_at is None else b""
+        if data:
+            samples = np.frombuffer(data, dtype=np.int16)
+            frame[:len(samples)] = samples
+            frame[len(samples):] = 0
+            return frame
+
+        if self.speech_ended_at is None:
+            self.speech_ended_at = time.perf_counter()
+        if self._silence_frames <= 0:
+            self.pool.release(frame)
+            return None
+        self._silence_frames -= 1
+        frame[:] = 0
+        return frame
+
+    def stop(self):
+        if self._wav is not None:
+            self._wav.close()
+            self._wav = None
+
+
+class EnergyVAD:
+    """
+    Local energy gate so silence isn't uploaded.
+
+    A frame opens the gate when its level is above `threshold_dbfs`. The gate
+    stays open for `hangover_ms` after speech so the server's turn detection
+    still hears the pause that ends the turn, and the `preroll_ms` of audio
+    before speech is sent first so word onsets aren't clipped.
+    """
+
+    def __init__(self, frame_samples, frame_ms=FRAME_MS, threshold_dbfs=-45.0,
+                 hangover_ms=600, preroll_ms=100):
+        self.threshold = (10 ** (threshold_dbfs / 20) * 32768) ** 2 * frame_samples
+        self.hangover_frames = int(hangover_ms / frame_ms)
+        self._scratch = np.zeros(frame_samples, dtype=np.float32)
+        self._preroll = deque(
+            np.zeros(frame_samples, dtype=np.int16) for _ in range(int(preroll_ms / frame_ms))
+        )
+        self._preroll_filled = 0
+        self._open_for = 0
+
+    def is_speech(self, frame):
+        np.copyto(self._scratch, frame)
+        return float(np.dot(self._scratch, self._scratch)) >= self.threshold
+
+    def process(self, frame):
+        """
+        Returns the frames to send for this input frame: the preroll plus the
+        frame when speech starts, the frame while the gate is open, or
+        nothing while it is closed.
+        """
+        if self.is_speech(frame):
+            opening = self._open_for == 0
+            self._open_for = self.hangover_frames
+            if opening and self._preroll_filled:
+                preroll = list(self._preroll)[-self._preroll_filled:]
+                self._preroll_filled = 0
+                return preroll + [frame]
+            return [frame]
+
+        if self._open_for > 0:
+            self._open_for -= 1
+            return [frame]
+
+        if self._preroll:
+            oldest = self._preroll.popleft()
+            np.copyto(oldest, frame)
+            self._preroll.append(oldest)
+            self._preroll_filled = min(self._preroll_filled + 1, len(self._preroll))
+        return []
+
+
+async def stream_audio(session, source, vad=None, stats=None):
+    """
+    Send frames from `source` into the realtime session until the source is
+    exhausted or the task is cancelled.
+    """
+    stats = stats if stats is not None else {}
+    stats.update({"frames_captured": 0, "frames_sent": 0, "frames_gated": 0})
+    await source.start()
+    try:
+        while True:
+            frame = await source.read()
+            if frame is None:
+                break
+            stats["frames_captured"] += 1
+            try:
+                outgoing = vad.process(frame) if vad is not None else [frame]
+                if not outgoing:
+                    stats["frames_gated"] += 1
+                for chunk in outgoing:
+                    # send_audio base64-encodes before its first await, so the
+                    # buffer can go back to the pool as soon as this returns
+                    await session.send_audio(memoryview(chunk).cast("B"))
+                    stats["frames_sent"] += 1
+            finally:
+                source.pool.release(frame)
+    finally:
+        source.stop()
+        stats["overflows"] = source.overflows
+    return stats
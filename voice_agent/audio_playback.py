@@ -0,0 +1,165 @@
+"""
+Audio playback - low-latency pcm16 playback for the realtime agent
+
+Audio chunks from the session are written into a preallocated numpy ring
+buffer on the event loop and drained by the sounddevice output callback.
+"""
+import threading
+
+import numpy as np
+import sounddevice as sd
+
+# The realtime API streams pcm16 mono at 24 kHz
+SAMPLE_RATE = 24000
+PCM16_SCALE = np.float32(1.0 / 32768.0)
+
+
+class AudioPlayer:
+    """
+    Jitter-buffered audio output.
+
+    `buffer_ms` bounds how much audio can be queued - when a burst overflows
+    it, the oldest samples are dropped so latency never grows past the
+    buffer depth. Playback starts (and restarts after an underrun) once
+    `prebuffer_ms` of audio is queued. `interrupt()` fades the current audio
+    out over `fade_ms` and flushes the buffer, so barge-in doesn't click.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, buffer_ms=400, prebuffer_ms=60,
+                 blocksize_ms=20, fade_ms=10, device=None):
+        self.sample_rate = sample_rate
+        self.capacity = int(sample_rate * buffer_ms / 1000)
+        self.prebuffer = min(int(sample_rate * prebuffer_ms / 1000), self.capacity)
+        self.blocksize = int(sample_rate * blocksize_ms / 1000)
+        self.fade_samples = max(int(sample_rate * fade_ms / 1000), 1)
+        self.device = device
+
+        self._ring = np.zeros(self.capacity, dtype=np.float32)
+        self._fade = np.linspace(1.0, 0.0, self.fade_samples, dtype=np.float32)
+        self._read = 0
+        self._count = 0
+        self._playing = False
+        self._draining = False
+        self._flush_requested = False
+        self._lock = threading.Lock()
+        self._stream = None
+        self._stats = {
+            "chunks_written": 0,
+            "samples_written": 0,
+            "underruns": 0,
+            "overruns": 0,
+            "dropped_samples": 0,
+            "flushes": 0,
+            "status_flags": 0,
+        }
+
+    def start(self):
+        self._stream = sd.OutputStream(
+            samplerate=self.sample_rate,
+            channels=1,
+            dtype="float32",
+            blocksize=self.blocksize,
+            latency="low",
+            device=self.device,
+            callback=self._callback,
+        )
+        self._stream.start()
+
+    def stop(self):
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+    def write(self, pcm16):
+        """Queue a chunk of pcm16 bytes; safe to call from the event loop"""
+        samples = np.frombuffer(pcm16, dtype=np.int16)
+        if len(samples) > self.capacity:
+            dropped = len(samples) - self.capacity
+            samples = samples[dropped:]
+        else:
+            dropped = 0
+
+        with self._lock:
+            overflow = self._count + len(samples) - self.capacity
+            if overflow > 0:
+                # Drop the oldest audio rather than letting latency grow
+                self._read = (self._read + overflow) % self.capacity
+                self._count -= overflow
+                dropped += overflow
+            if dropped:
+                self._stats["overruns"] += 1
+                self._stats["dropped_samples"] += dropped
+
+            write = (self._read + self._count) % self.capacity
+            first = min(len(samples), self.capacity - write)
+            np.multiply(samples[:first], PCM16_SCALE, out=self._ring[write:write + first])
+            if first < len(samples):
+                np.multiply(samples[first:], PCM16_SCALE, out=self._ring[:len(samples) - first])
+            self._count += len(samples)
+            self._draining = False
+            self._stats["chunks_written"] += 1
+            self._stats["samples_written"] += len(samples)
+
+    def end_of_response(self):
+        """The current response has no more audio - play out the tail, don't count it as an underrun"""
+        with self._lock:
+            self._draining = True
+
+    def interrupt(self):
+        """Fade out whatever is playing and drop the rest of the queued audio"""
+        with self._lock:
+            self._flush_requested = True
+
+    def _take(self, out, n):
+        """Copy n samples from the ring into out (caller holds the lock)"""
+        first = min(n, self.capacity - self._read)
+        out[:first] = self._ring[self._read:self._read + first]
+        if first < n:
+            out[first:n] = self._ring[:n - first]
+        self._read = (self._read + n) % self.capacity
+        self._count -= n
+
+    def _callback(self, outdata, frames, time_info, status):
+        if status:
+            self._stats["status_flags"] += 1
+        out = outdata[:, 0]
+        with self._lock:
+            if self._flush_requested:
+                self._flush_requested = False
+                faded = min(self.fade_samples, frames, self._count) if self._playing else 0
+                if faded:
+                    self._take(out, faded)
+                    ramp = self._fade if faded == self.fade_samples else np.linspace(
+                        1.0, 0.0, faded, dtype=np.float32)
+                    out[:faded] *= ramp
+                out[faded:] = 0.0
+                self._read = 0
+                self._count = 0
+                self._playing = False
+                self._stats["flushes"] += 1
+                return
+
+            if not self._playing:
+                if self._count == 0 or (self._count < self.prebuffer and not self._draining):
+                    out[:] = 0.0
+                    return
+                self._playing = True
+
+            n = min(frames, self._count)
+            self._take(out, n)
+            if n < frames:
+                out[n:] = 0.0
+                if not self._draining:
+                    self._stats["underruns"] += 1
+                self._playing = False
+
+    def buffered_ms(self):
+        with self._lock:
+            return self._count * 1000 / self.sample_rate
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["buffered_ms"] = self._count * 1000 / self.sample_rate
+        return stats
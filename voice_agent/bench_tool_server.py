@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for the Vapi tool server
+
+Replays recorded tool calls (JSONL: {"method", "path", "body"} per line, as
+written with TOOL_CALL_RECORD_PATH) against an in-process tool server whose
+Cortex Search backend is faked with tunable latency, and reports throughput,
+latency percentiles and error rate per endpoint as JSON. Limits on p99 and
+error rate turn it into a pre-deploy regression gate (exit status 1).
+
+    python bench_tool_server.py --concurrency 20 --requests 2000 --backend-ms 150
+    python bench_tool_server.py --server asgi --rate 200 --duration 10 --max-p99-ms 500
+    python bench_tool_server.py --url http://staging:3000   # real server, real backend
+"""
+import argparse
+import http.client
+import json
+import random
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+from load_test import summarize
+
+DEFAULT_PAYLOADS = "bench_payloads.jsonl"
+
+
+class FakeCortexBackend:
+    """
+    Stands in for Cortex Search: sleeps for a normally distributed latency,
+    fails a fraction of calls, and returns a body shaped like the real one
+    """
+
+    def __init__(self, latency_ms=150, jitter_ms=50, error_rate=0.0, doc_chars=2000, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.doc_chars = doc_chars
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def search_raw(self, service, query, columns, limit=10, filter=None):
+        with self._lock:
+            self.calls += 1
+            delay = max(self._random.gauss(self.latency_ms, self.jitter_ms), 0) / 1000
+            fail = self._random.random() < self.error_rate
+        time.sleep(delay)
+        if fail:
+            raise RuntimeError("fake Cortex Search error")
+        filler = ("Check the connector latch and retry the session. " * (self.doc_chars // 50 + 1))[:self.doc_chars]
+        rows = [{"DOCUMENT_CONTENTS": f"{query}: {filler}", "LIKES": i} for i in range(limit)]
+        return json.dumps({"results": rows, "request_id": "fake"}).encode()
+
+
+class FakePooledSession:
+    """PooledSession without Snowflake; health checks always pass"""
+
+    def __init__(self):
+        self.session = self
+        self.created_at = time.monotonic()
+        self.last_checked = self.created_at
+
+    def sql(self, query):
+        return self
+
+    def collect(self):
+        return []
+
+    def search_service(self, database, schema, service):
+        return None
+
+    def close(self):
+        pass
+
+
+def install_fakes(server, backend, cache):
+    """Point the tool server module at the fake backend and an in-memory pool"""
+    from search_cache import SearchCache
+    from semantic_cache import SemanticCache
+    from snowflake_pool import SnowflakeSessionPool
+
+    class FakeSessionPool(SnowflakeSessionPool):
+        def _connect(self):
+            with self._lock:
+                self._stats["connects"] += 1
+            return FakePooledSession()
+
+    pool = server.session_pool
+    server.session_pool = FakeSessionPool({}, size=pool.size, max_age=pool.max_age)
+    server.search_raw = backend.search_raw
+    if not cache:
+        # Every lookup misses, so each get_ev_info call reaches the backend
+        server.search_cache = SemanticCache(SearchCache(max_entries=0))
+
+
+def start_server(kind, port):
+    """Serve the tool server on a background thread; returns its base URL"""
+    if kind == "asgi":
+        import uvicorn
+        import vapi_tool_server_asgi
+
+        config = uvicorn.Config(vapi_tool_server_asgi.app, host="127.0.0.1", port=port, log_level="warning")
+        server = uvicorn.Server(config)
+        threading.Thread(target=server.run, daemon=True).start()
+        while not server.started:
+            time.sleep(0.05)
+    else:
+        from werkzeug.serving import make_server
+        import vapi_tool_server
+
+        server = make_server("127.0.0.1", port, vapi_tool_server.app, threaded=True)
+        port = server.server_port
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{port}"
+
+
+def load_calls(path):
+    with open(path) as f:
+        calls = [json.loads(line) for line in f if line.strip()]
+    if not calls:
+        sys.exit(f"No tool calls in {path}")
+    return calls
+
+
+def replay(base_url, calls, concurrency, requests, rate=None):
+    """
+    Send `requests` calls (cycling through `calls`) from `concurrency`
+    callers. With `rate`, call i is scheduled at i / rate seconds and its
+    latency is measured from that time, so a slow server can't hide queueing
+    by slowing the senders down.
+    """
+    parsed = urlparse(base_url)
+    conn_cls = http.client.HTTPSConnection if parsed.scheme == "https" else http.client.HTTPConnection
+    lock = threading.Lock()
+    next_call = [0]
+    samples = {}
+
+    def worker():
+        conn = conn_cls(parsed.hostname, parsed.port, timeout=60)
+        while True:
+            with lock:
+                index = next_call[0]
+                if index >= requests:
+                    break
+                next_call[0] += 1
+            call = calls[index % len(calls)]
+            if rate:
+                scheduled = start + index / rate
+                time.sleep(max(scheduled - time.perf_counter(), 0))
+            else:
+                scheduled = time.perf_counter()
+            method = call.get("method", "POST")
+            body = json.dumps(call["body"]) if "body" in call else None
+            try:
+                conn.request(method, call["path"], body=body, headers={"Content-Type": "application/json"})
+                resp = conn.getresponse()
+                payload = resp.read()
+                # The streamed get_ev_info reports failures inside a 200 body
+                ok = resp.status < 400 and b'"error"' not in payload
+            except Exception:
+                ok = False
+                conn.close()
+                conn = conn_cls(parsed.hostname, parsed.port, timeout=60)
+            elapsed_ms = (time.perf_counter() - scheduled) * 1000
+            with lock:
+                latencies, errors = samples.setdefault(call["path"], ([], [0]))
+                if ok:
+                    latencies.append(elapsed_ms)
+                else:
+                    errors[0] += 1
+        conn.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    endpoints = {}
+    for path, (latencies, errors) in sorted(samples.items()):
+        endpoints[path] = summarize(latencies, errors[0], elapsed)
+        endpoints[path]["error_rate"] = errors[0] / endpoints[path]["requests"]
+    all_latencies = [ms for latencies, _ in samples.values() for ms in latencies]
+    all_errors = sum(errors[0] for _, errors in samples.values())
+    overall = summarize(all_latencies, all_errors, elapsed)
+    overall["error_rate"] = all_errors / overall["requests"] if overall["requests"] else 0.0
+    return {"elapsed_s": elapsed, "overall": overall, "endpoints": endpoints}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Vapi tool server endpoints")
+    parser.add_argument("--payloads", default=DEFAULT_PAYLOADS, help="Recorded tool calls (JSONL)")
+    parser.add_argument("--server", choices=["flask", "asgi"], default="flask",
+                        help="In-process server to benchmark (ignored with --url)")
+    parser.add_argument("--url", help="Benchmark a running server instead (no fake backend)")
+    parser.add_argument("--port", type=int, help="Port for the in-process server (default: any free port, 3900 for asgi)")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--rate", type=float, help="Target requests/s (open loop); default is as fast as possible")
+    parser.add_argument("--duration", type=float, help="With --rate, run for this many seconds instead of --requests")
+    parser.add_argument("--backend-ms", type=float, default=150, help="Fake Cortex Search mean latency")
+    parser.add_argument("--backend-jitter-ms", type=float, default=50)
+    parser.add_argument("--backend-error-rate", type=float, default=0.0)
+    parser.add_argument("--cache", action="store_true", help="Keep the search cache on (off by default)")
+    parser.add_argument("--max-p99-ms", type=float, help="Fail if overall p99 exceeds this")
+    parser.add_argument("--max-error-rate", type=float, help="Fail if the overall error rate exceeds this")
+    parser.add_argument("--out", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    calls = load_calls(args.payloads)
+    requests = int(args.rate * args.duration) if args.rate and args.duration else args.requests
+
+    backend = None
+    if args.url:
+        base_url = args.url
+    else:
+        import vapi_tool_server
+
+        backend = FakeCortexBackend(args.backend_ms, args.backend_jitter_ms, args.backend_error_rate)
+        install_fakes(vapi_tool_server, backend, args.cache)
+        # uvicorn doesn't report an ephemeral port back, so ASGI gets a fixed default
+        base_url = start_server(args.server, args.port or (3900 if args.server == "asgi" else 0))
+
+    report = {
+        "config": {
+            "server": args.url or args.server,
+            "payloads": args.payloads,
+            "concurrency": args.concurrency,
+            "requests": requests,
+            "rate": args.rate,
+            "backend_ms": None if args.url else args.backend_ms,
+            "backend_jitter_ms": None if args.url else args.backend_jitter_ms,
+            "backend_error_rate": None if args.url else args.backend_error_rate,
+            "cache": args.cache,
+        },
+    }
+    report.update(replay(base_url, calls, args.concurrency, requests, args.rate))
+    if backend is not None:
+        import vapi_tool_server
+
+        report["backend_calls"] = backend.calls
+        report["server"] = vapi_tool_server.health_result()
+
+    failures = []
+    if args.max_p99_ms is not None and report["overall"]["p99_ms"] > args.max_p99_ms:
+        failures.append(f"p99 {report['overall']['p99_ms']:.1f} ms > {args.max_p99_ms} ms")
+    if args.max_error_rate is not None and report["overall"]["error_rate"] > args.max_error_rate:
+        failures.append(f"error rate {report['overall']['error_rate']:.3f} > {args.max_error_rate}")
+    report["failures"] = failures
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
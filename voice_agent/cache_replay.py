@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Cache replay - Cortex Search calls saved by the semantic cache, per threshold
+
+Replays a list of transcribed queries (one per line) through a fresh cache
+for each similarity threshold and reports hits and Cortex calls. A line may
+end with a tab and a group label; queries in one group are paraphrases, and
+a hit served from another group is counted as wrong. Without a file, a
+built-in labelled set of troubleshooting questions is used.
+
+    python cache_replay.py transcripts.txt --thresholds 0.6 0.7 0.8 0.9
+"""
+import argparse
+import json
+
+from search_cache import SearchCache, make_key
+from semantic_cache import SemanticCache
+
+# Paraphrases of one question share a group; a near hit across groups is a wrong answer
+SAMPLE_GROUPS = [
+    ["car won't plug in", "my car won't plug into the charger", "the car wont plug in"],
+    ["charger shows error E42", "what does error code e-42 mean", "error E 42 on the screen"],
+    ["the CCS connector is stuck in my car", "CCS plug stuck"],
+    ["CCS2 cable won't unlock"],
+    ["chademo connector stuck"],
+    ["charging stopped suddenly", "charging keeps stopping", "my charging session keeps cutting out"],
+    ["payment failed at the station", "my card payment didn't go through", "card declined at the charger"],
+    ["screen is blank", "charger screen blank"],
+    ["the charger screen is frozen"],
+    ["cable won't release from the car", "connector won't release"],
+    ["how do I start a charge with the app", "start charging with the app"],
+    ["error code 503", "charger says code 503"],
+    ["car won't charge", "my vehicle won't charge"],
+    ["charging stops at 80 percent", "charging stuck at 80%"],
+    ["charging stops at 20 percent"],
+]
+SAMPLE_QUERIES = [query for group in SAMPLE_GROUPS for query in group]
+SAMPLE_LABELS = {query: i for i, group in enumerate(SAMPLE_GROUPS) for query in group}
+
+COLUMNS = ["chunk"]
+LIMIT = 3
+
+
+def replay(queries, threshold, labels=None):
+    """Run `queries` through a fresh cache; returns counters for one threshold"""
+    cache = SemanticCache(SearchCache(max_entries=10_000, ttl=3600), threshold=threshold)
+    calls = []
+    wrong = 0
+    for query in queries:
+        served = cache.get_or_load(make_key(query, COLUMNS, limit=LIMIT), lambda: calls.append(query) or [query])
+        if labels and labels.get(served[0]) != labels.get(query):
+            wrong += 1
+    stats = cache.stats()
+    return {
+        "threshold": threshold,
+        "lookups": len(queries),
+        "exact_hits": stats["exact_hits"],
+        "near_hits": stats["near_hits"],
+        "wrong_hits": wrong,
+        "cortex_calls": len(calls),
+        "hit_rate": stats["hit_rate"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay queries through the semantic cache")
+    parser.add_argument("queries", nargs="?", help="File with one query per line, optionally <tab>group")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.5, 0.6, 0.7, 0.8, 0.9, 1.0])
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    if args.queries:
+        queries, labels = [], {}
+        with open(args.queries) as f:
+            for line in f:
+                query, _, label = line.rstrip("\n").partition("\t")
+                if query.strip():
+                    queries.append(query.strip())
+                    if label.strip():
+                        labels[query.strip()] = label.strip()
+    else:
+        queries, labels = SAMPLE_QUERIES, SAMPLE_LABELS
+
+    exact_only = len({make_key(query, COLUMNS, limit=LIMIT) for query in queries})
+    results = [replay(queries, threshold, labels) for threshold in args.thresholds]
+
+    if args.json:
+        print(json.dumps({"queries": len(queries), "exact_key_calls": exact_only, "results": results}, indent=2))
+        return
+
+    print(f"{len(queries)} queries, {exact_only} Cortex calls with an exact-key cache")
+    print(f"{'threshold':>9} {'exact':>6} {'near':>6} {'wrong':>6} {'calls':>6} {'hit rate':>9}")
+    for r in results:
+        print(f"{r['threshold']:>9.2f} {r['exact_hits']:>6} {r['near_hits']:>6} {r['wrong_hits']:>6} "
+              f"{r['cortex_calls']:>6} {r['hit_rate']:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Cortex response - lean handling of Cortex Search response bodies
+
+Fetches the raw JSON body of a search instead of the QueryResponse model,
+then decodes result rows one at a time as they're consumed, so a caller
+that needs two rows never decodes the rest. Text is truncated as each row
+is read, so only short snippets are kept and cached.
+
+The raw body comes from generated snowflake.core internals, so the
+version is pinned in requirements.txt; if those internals move, searches
+fall back to the public service.search().
+"""
+import json
+import re
+
+try:
+    from snowflake.core.cortex.search_service._generated.models import QueryRequest
+except ImportError:
+    QueryRequest = None
+
+_RESULTS_START = re.compile(r'"results"\s*:\s*\[')
+_WHITESPACE = re.compile(r"\s*")
+_decoder = json.JSONDecoder()
+
+
+class CortexResponseError(ValueError):
+    """A search response body that can't be read as a list of results"""
+
+
+def search_raw(service, query, columns, limit=10, filter=None):
+    """Run a search on a CortexSearchServiceResource and return the undecoded body"""
+    if QueryRequest is not None:
+        try:
+            collection = service.collection
+            api_call = collection._api.query_cortex_search_service
+        except AttributeError:
+            pass
+        else:
+            try:
+                response = api_call(
+                    collection.database.name,
+                    collection.schema.name,
+                    service.name,
+                    QueryRequest.from_dict({"query": query, "columns": columns, "filter": filter, "limit": limit}),
+                    async_req=False,
+                    _preload_content=False,
+                )
+                return response.data
+            except (AttributeError, TypeError):
+                # Generated internals changed shape - use the public API below
+                pass
+    response = service.search(query, columns, filter=filter, limit=limit)
+    return json.dumps({"results": response.results}).encode("utf-8")
+
+
+def iter_results(body):
+    """
+    Yield the rows of a search response body, decoding each only when
+    reached; raises CortexResponseError on a malformed or truncated body
+    """
+    try:
+        text = body.decode("utf-8") if isinstance(body, (bytes, bytearray)) else body
+    except UnicodeDecodeError as e:
+        raise CortexResponseError(f"Search response is not UTF-8: {e}") from e
+    match = _RESULTS_START.search(text)
+    if match is None:
+        # Not the layout we expect - decode the whole body instead
+        try:
+            results = json.loads(text).get("results", [])
+        except (ValueError, AttributeError) as e:
+            raise CortexResponseError(f"Unreadable search response: {e}") from e
+        yield from results
+        return
+
+    pos = _WHITESPACE.match(text, match.end()).end()
+    while pos < len(text) and text[pos] != "]":
+        try:
+            row, pos = _decoder.raw_decode(text, pos)
+        except ValueError as e:
+            raise CortexResponseError(f"Unreadable search result at offset {pos}: {e}") from e
+        yield row
+        pos = _WHITESPACE.match(text, pos).end()
+        if pos < len(text) and text[pos] == ",":
+            pos = _WHITESPACE.match(text, pos + 1).end()
+    if pos >= len(text):
+        raise CortexResponseError("Search response ended before the end of its results")
+
+
+def json_fragment(text):
+    """`text` escaped for use inside a JSON string literal"""
+    return json.dumps(text)[1:-1]
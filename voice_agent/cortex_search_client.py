@@ -0,0 +1,163 @@
+"""
+Cortex Search client - one lazily created, process-lifetime client for a
+Cortex Search service, backed by the session pool and the result cache
+"""
+import asyncio
+import threading
+
+from search_cache import SearchCache, make_key, normalize_query
+from search_race import SearchRace
+from snowflake_pool import SnowflakeSessionPool
+
+# Reciprocal rank fusion damping constant - the usual value from the literature
+RRF_K = 60
+
+
+def build_filter(**attributes):
+    """
+    Cortex Search filter matching every non-empty attribute, e.g.
+    build_filter(STATION_ID="SF_FERRY", CONNECTOR_TYPE=None) -> {"@eq": {...}}
+    """
+    clauses = [{"@eq": {column: value}} for column, value in attributes.items() if value]
+    if not clauses:
+        return None
+    if len(clauses) == 1:
+        return clauses[0]
+    return {"@and": clauses}
+
+
+def merge_results(result_lists, column, limit=None):
+    """
+    Merge several ranked result lists into one.
+
+    Rows are deduplicated on the normalized text of `column` and ranked with
+    reciprocal rank fusion, so a chunk that several queries agree on comes
+    first. Each merged row gets a `matched_queries` list of the indexes of
+    the queries that returned it.
+    """
+    merged = {}
+    for query_index, rows in enumerate(result_lists):
+        for rank, row in enumerate(rows):
+            key = normalize_query(str(row.get(column, "")))
+            if not key:
+                continue
+            entry = merged.get(key)
+            if entry is None:
+                entry = merged[key] = {"row": dict(row), "score": 0.0, "matched_queries": []}
+            entry["score"] += 1.0 / (RRF_K + rank + 1)
+            if query_index not in entry["matched_queries"]:
+                entry["matched_queries"].append(query_index)
+
+    ranked = sorted(merged.values(), key=lambda entry: entry["score"], reverse=True)
+    if limit is not None:
+        ranked = ranked[:limit]
+    return [dict(entry["row"], matched_queries=entry["matched_queries"]) for entry in ranked]
+
+
+class CortexSearchClient:
+    """
+    Reusable client for one Cortex Search service.
+
+    Nothing connects until the first search (or `connect_in_background()`).
+    After that the Snowflake session stays open for the life of the process,
+    and a keepalive thread re-authenticates it before it expires so a tool
+    call never has to wait for a login.
+
+    With a `local_index` (see local_index.py), a search that Cortex doesn't
+    answer within `latency_budget_ms` is answered from the local index, and
+    every returned row carries a "source" of "cortex" or "local".
+    """
+
+    def __init__(self, connection_parameters, database, schema, service,
+                 pool_size=1, cache=None, keepalive_interval=60,
+                 local_index=None, latency_budget_ms=800):
+        self.connection_parameters = connection_parameters
+        self.database = database
+        self.schema = schema
+        self.service = service
+        self.pool_size = pool_size
+        self.cache = cache if cache is not None else SearchCache()
+        self.keepalive_interval = keepalive_interval
+        self.local_index = local_index
+        self.race = SearchRace(budget_ms=latency_budget_ms, workers=pool_size) if local_index is not None else None
+
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self):
+        """The session pool, created on first use"""
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    pool = SnowflakeSessionPool(self.connection_parameters, size=self.pool_size)
+                    pool.start_keepalive(self.keepalive_interval)
+                    self._pool = pool
+        return self._pool
+
+    def connect_in_background(self):
+        """Log in on a daemon thread so the first tool call finds a warm session"""
+        def run():
+            try:
+                self.pool.warm()
+            except Exception as e:
+                print(f"Cortex Search warm-up failed, will connect on first search: {e}")
+
+        thread = threading.Thread(target=run, name="cortex-search-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def _search_uncached(self, query, columns, filter, limit):
+        with self.pool.checkout() as pooled:
+            service = pooled.search_service(self.database, self.schema, self.service)
+            resp = service.search(query=query, columns=columns, filter=filter, limit=limit)
+        return resp.results
+
+    def search(self, query, columns, filter=None, limit=10):
+        """Search the service and return the list of result rows (dicts)"""
+        key = make_key(query, columns, filter, limit)
+        if self.race is None:
+            return self.cache.get_or_load(
+                key, lambda: self._search_uncached(query, columns, filter, limit)
+            )
+
+        rows = self.cache.get(key)
+        if rows is not None:
+            return rows
+
+        def tagged(rows, source):
+            return [dict(row, source=source) for row in rows]
+
+        rows, source = self.race.run(
+            lambda: tagged(self._search_uncached(query, columns, filter, limit), self.race.primary),
+            lambda: tagged(self.local_index.search(query, columns, filter, limit), self.race.fallback),
+            on_late=lambda late: self.cache.put(key, late),
+        )
+        if source == self.race.primary:
+            self.cache.put(key, rows)
+        return rows
+
+    async def asearch(self, query, columns, filter=None, limit=10):
+        """`search()` on a worker thread so the event loop keeps running"""
+        return await asyncio.to_thread(self.search, query, columns, filter, limit)
+
+    async def asearch_many(self, requests, columns, limit=10):
+        """
+        Run several searches concurrently. `requests` is a list of
+        (query, filter) pairs; returns one result list per request, with an
+        empty list for any search that failed.
+        """
+        results = await asyncio.gather(
+            *(self.asearch(query, columns, filter, limit) for query, filter in requests),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"Cortex Search failed: {result}")
+        return [[] if isinstance(result, Exception) else result for result in results]
+
+    def close(self):
+        if self.race is not None:
+            self.race.close()
+        if self._pool is not None:
+            self._pool.close()
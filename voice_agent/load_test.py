@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Load test for the Vapi tool server - fires concurrent get_ev_info calls and
+reports p50/p99 latency per concurrency level
+
+    python load_test.py --url http://localhost:3000 --concurrency 1 10 100
+"""
+import argparse
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlparse
+
+DEFAULT_QUERIES = [
+    "My car won't plug into the charger",
+    "Handshake failed on a CCS stall",
+    "Connector stuck after charging",
+    "Charging is very slow",
+]
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of an unsorted list"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(int(round(pct / 100 * len(ordered))) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def summarize(latencies_ms, errors, elapsed):
+    total = len(latencies_ms) + errors
+    return {
+        "requests": total,
+        "errors": errors,
+        "throughput_rps": total / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies_ms, 50),
+        "p90_ms": percentile(latencies_ms, 90),
+        "p99_ms": percentile(latencies_ms, 99),
+        "max_ms": max(latencies_ms) if latencies_ms else 0.0,
+    }
+
+
+def _worker(base_url, path, payloads, counter, lock, latencies_ms, errors):
+    parsed = urlparse(base_url)
+    conn_cls = http.client.HTTPSConnection if parsed.scheme == "https" else http.client.HTTPConnection
+    conn = conn_cls(parsed.hostname, parsed.port, timeout=60)
+    while True:
+        with lock:
+            if counter[0] <= 0:
+                break
+            counter[0] -= 1
+            index = counter[0]
+        body = json.dumps(payloads[index % len(payloads)])
+        start = time.perf_counter()
+        try:
+            conn.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+            resp = conn.getresponse()
+            resp.read()
+            ok = resp.status < 400
+        except Exception:
+            ok = False
+            conn.close()
+            conn = conn_cls(parsed.hostname, parsed.port, timeout=60)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with lock:
+            if ok:
+                latencies_ms.append(elapsed_ms)
+            else:
+                errors[0] += 1
+    conn.close()
+
+
+def run_level(base_url, path, payloads, concurrency, requests):
+    """Send `requests` calls from `concurrency` concurrent callers"""
+    counter = [requests]
+    errors = [0]
+    latencies_ms = []
+    lock = threading.Lock()
+    threads = [
+        threading.Thread(target=_worker, args=(base_url, path, payloads, counter, lock, latencies_ms, errors))
+        for _ in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return summarize(latencies_ms, errors[0], time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Vapi tool server")
+    parser.add_argument("--url", default="http://localhost:3000")
+    parser.add_argument("--path", default="/tools/get_ev_info")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    payloads = [{"parameters": {"query": q}} for q in DEFAULT_QUERIES]
+    results = {}
+    for concurrency in args.concurrency:
+        requests = max(args.requests, concurrency)
+        results[concurrency] = run_level(args.url, args.path, payloads, concurrency, requests)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'callers':>8} {'reqs':>6} {'errors':>6} {'rps':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for concurrency, r in results.items():
+        print(f"{concurrency:>8} {r['requests']:>6} {r['errors']:>6} {r['throughput_rps']:>8.1f} "
+              f"{r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
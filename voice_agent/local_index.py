@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Local index - offline BM25 copy of the troubleshooting chunks
+
+The chunks behind the Cortex Search service are exported to a JSONL file
+(one row per chunk, text plus attribute columns) on a schedule, and loaded
+into an in-memory BM25 index that answers the same search(query, columns,
+filter, limit) calls when Cortex Search is slow or down.
+
+    python local_index.py export --table CHUNKS --columns text STATION_ID --out chunks.jsonl --interval 3600
+    python local_index.py search chunks.jsonl "connector stuck" --text-column text
+"""
+import argparse
+import heapq
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+from query_normalizer import STOP_WORDS
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+# "E-42" and "e 42" index the same as "e42"
+_SPLIT_CODE = re.compile(r"\b([a-z]{1,3})[-\s](\d{1,4})\b")
+
+
+def tokenize(text):
+    text = _SPLIT_CODE.sub(r"\1\2", (text or "").lower())
+    return [token for token in _TOKEN.findall(text) if token not in STOP_WORDS]
+
+
+def matches_filter(row, filter):
+    """Evaluate a Cortex Search filter (@eq, @contains, @gte, @lte, @and, @or, @not) on a row"""
+    if not filter:
+        return True
+    (operator, operand), = filter.items()
+    if operator == "@and":
+        return all(matches_filter(row, clause) for clause in operand)
+    if operator == "@or":
+        return any(matches_filter(row, clause) for clause in operand)
+    if operator == "@not":
+        return not matches_filter(row, operand)
+    (column, value), = operand.items()
+    actual = row.get(column)
+    if operator == "@eq":
+        return actual == value
+    if operator == "@contains":
+        return isinstance(actual, list) and value in actual
+    if actual is None:
+        return False
+    if operator == "@gte":
+        return actual >= value
+    if operator == "@lte":
+        return actual <= value
+    raise ValueError(f"Unsupported filter operator: {operator}")
+
+
+class BM25Index:
+    """In-memory BM25 over a list of row dicts, searched on `text_column`"""
+
+    def __init__(self, rows, text_column, k1=1.5, b=0.75):
+        self.rows = rows
+        self.text_column = text_column
+        self.k1 = k1
+        self.b = b
+
+        self._postings = {}
+        self._lengths = []
+        for doc_id, row in enumerate(rows):
+            counts = Counter(tokenize(str(row.get(text_column, ""))))
+            self._lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self._postings.setdefault(term, []).append((doc_id, tf))
+        self._avg_length = sum(self._lengths) / len(self._lengths) if self._lengths else 0.0
+        n = len(rows)
+        self._idf = {
+            term: math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+
+    @classmethod
+    def load(cls, path, text_column, **kwargs):
+        with open(path) as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        return cls(rows, text_column, **kwargs)
+
+    def search(self, query, columns=None, filter=None, limit=10):
+        """Best `limit` rows for `query`, in the same shape as Cortex Search results"""
+        scores = {}
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, tf in self._postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / self._avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        # A filter can reject top hits, so only cut to `limit` up front without one
+        ranked = heapq.nlargest(limit if not filter else len(scores), scores.items(), key=lambda item: item[1])
+        results = []
+        for doc_id, _ in ranked:
+            row = self.rows[doc_id]
+            if not matches_filter(row, filter):
+                continue
+            results.append({column: row.get(column) for column in columns} if columns else dict(row))
+            if len(results) >= limit:
+                break
+        return results
+
+    def __len__(self):
+        return len(self.rows)
+
+
+class ReloadingIndex:
+    """
+    A BM25Index over an exported JSONL file that is rebuilt when the file
+    changes (checked at most every `check_interval` seconds). Searches keep
+    using the previous index while a new one is built.
+    """
+
+    def __init__(self, path, text_column, check_interval=60):
+        self.path = path
+        self.text_column = text_column
+        self.check_interval = check_interval
+        self._index = None
+        self._mtime = None
+        self._checked_at = 0.0
+        self._reloading = False
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self):
+        """Rebuild from the file if it changed; returns True when a new index was loaded"""
+        with self._lock:
+            self._checked_at = time.monotonic()
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+        index = BM25Index.load(self.path, self.text_column)
+        with self._lock:
+            self._index, self._mtime = index, mtime
+        print(f"Loaded local index: {len(index)} chunks from {self.path}")
+        return True
+
+    def _reload_in_background(self):
+        try:
+            self.reload()
+        except Exception as e:
+            print(f"Local index reload failed: {e}")
+        finally:
+            with self._lock:
+                self._reloading = False
+
+    def search(self, query, columns=None, filter=None, limit=10):
+        with self._lock:
+            # The rebuild runs on its own thread, so this search (often one
+            # that Cortex already ran over budget on) never waits for it
+            due = not self._reloading and time.monotonic() - self._checked_at > self.check_interval
+            if due:
+                self._reloading = True
+            index = self._index
+        if due:
+            threading.Thread(target=self._reload_in_background, name="local-index-reload", daemon=True).start()
+        if index is None:
+            raise LookupError(f"No local index at {self.path}")
+        return index.search(query, columns, filter, limit)
+
+
+def export_chunks(session, table, columns, path):
+    """Write `columns` of every row in `table` to `path` as JSONL, replacing it atomically"""
+    tmp_path = f"{path}.tmp"
+    count = 0
+    with open(tmp_path, "w") as f:
+        for row in session.table(table).select(columns).to_local_iterator():
+            f.write(json.dumps(row.as_dict(), default=str) + "\n")
+            count += 1
+    os.replace(tmp_path, path)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or query the local troubleshooting index")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="Export the chunks table from Snowflake")
+    export.add_argument("--table", required=True)
+    export.add_argument("--columns", nargs="+", required=True)
+    export.add_argument("--out", required=True)
+    export.add_argument("--interval", type=int, default=0, help="Re-export every N seconds (0 = once)")
+
+    search = commands.add_parser("search", help="Query an exported file")
+    search.add_argument("path")
+    search.add_argument("query")
+    search.add_argument("--text-column", default="text")
+    search.add_argument("--limit", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.command == "search":
+        start = time.perf_counter()
+        index = BM25Index.load(args.path, args.text_column)
+        loaded = time.perf_counter()
+        results = index.search(args.query, limit=args.limit)
+        print(f"{len(index)} chunks, load {(loaded - start) * 1000:.0f} ms, "
+              f"search {(time.perf_counter() - loaded) * 1000:.1f} ms")
+        print(json.dumps(results, indent=2))
+        return
+
+    from snowflake.snowpark import Session
+    from snowflake_config import CONNECTION_PARAMETERS
+
+    session = Session.builder.configs(CONNECTION_PARAMETERS).create()
+    try:
+        while True:
+            count = export_chunks(session, args.table, args.columns, args.out)
+            print(f"Exported {count} chunks to {args.out}")
+            if not args.interval:
+                break
+            time.sleep(args.interval)
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
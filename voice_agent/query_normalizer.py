@@ -0,0 +1,163 @@
+"""
+Query normalizer - canonical form of transcribed troubleshooting questions
+
+Speech-to-text gives many spellings of one question ("car won't plug in",
+"my car won't plug into the charger"). canonicalize() reduces a query to
+its content words plus the error codes, connector types and numbers it
+mentions; similarity() scores two canonical queries so near-duplicates can
+share a cache entry. Error codes, connectors, numbers ("stuck at 80
+percent") and negation are hard constraints: queries that disagree on them
+never match.
+"""
+import math
+import re
+from collections import Counter, namedtuple
+
+CanonicalQuery = namedtuple("CanonicalQuery", "key tokens error_codes connectors negated numbers")
+
+# The charger and the car are the subject of nearly every question, so they are
+# stop words; what is happening to them (charge, session, plug) is content
+STOP_WORDS = frozenset("""
+    a an the my your our their his her its this that these those i me we you it
+    is are was were be been being am do does did have has had
+    to into onto in at of for from with by about as
+    and or but so if then just also still again really very
+    can could would should will shall may might must
+    please hi hello hey okay ok um uh like
+    what whats how why when where which who there here
+    get got getting some any
+    car vehicle ev charger station stall
+    show shows showing mean means meaning say says saying display displays displaying
+    keep keeps kept suddenly randomly always sometimes
+""".split())
+
+# Words folded onto one form (compared after stemming)
+SYNONYMS = {
+    "plug": "connector",
+    "cable": "connector",
+    "handle": "connector",
+    "nozzle": "connector",
+    "halt": "stop",
+    "quit": "stop",
+    "cut": "stop",
+    "pay": "payment",
+    "declined": "fail",
+    "rejected": "fail",
+    "error": "fail",
+    "card": "payment",
+    "unlock": "release",
+    "latch": "lock",
+    "%": "percent",
+}
+
+# Spoken and written variants of negation collapse to one token
+NEGATIONS = re.compile(
+    r"\b(?:won'?t|wont|can'?t|cant|cannot|don'?t|dont|doesn'?t|doesnt|didn'?t|didnt|"
+    r"isn'?t|isnt|aren'?t|arent|wasn'?t|wasnt|not|no|never)\b"
+)
+
+# Canonical connector name -> spoken/written forms
+CONNECTOR_TYPES = {
+    "CCS": ("ccs", "ccs1", "ccs2", "ccs 1", "ccs 2", "combo"),
+    "CHADEMO": ("chademo", "cha de mo", "chad mo"),
+    "NACS": ("nacs", "tesla plug", "tesla connector"),
+    "J1772": ("j1772", "j 1772", "j-1772", "type 1"),
+    "TYPE2": ("type 2", "type two", "mennekes"),
+}
+_CONNECTOR_PATTERNS = [
+    (name, re.compile(r"\b(?:" + "|".join(re.escape(form) for form in forms) + r")\b"))
+    for name, forms in CONNECTOR_TYPES.items()
+]
+
+# "E42", "err 0x1F", "error code f-12", "code 503" -> E42, 0X1F, F12, 503. Without
+# a leading "error"/"code", only E-codes count, so "F150" stays a plain word.
+_ERROR_CODE = re.compile(
+    r"\b(?:(?:error|err|fault|code)\s*(?:code\s*)?(?:number\s*)?#?\s*([a-z]{0,3}[-\s]?\d{1,4}|0x[0-9a-f]+)"
+    r"|(e-?\d{2,4}))\b"
+)
+_WORD = re.compile(r"[a-z0-9]+|%")
+
+
+def _stem(word):
+    """Crude suffix stripping so plug/plugged/plugging compare equal"""
+    for suffix in ("ing", "ed", "es", "s", "e"):
+        if len(word) > len(suffix) + 2 and word.endswith(suffix):
+            word = word[:-len(suffix)]
+            break
+    if len(word) > 3 and word[-1] == word[-2]:
+        word = word[:-1]
+    return word
+
+
+_STEMMED_SYNONYMS = {_stem(word): _stem(canonical) for word, canonical in SYNONYMS.items()}
+
+
+def canonicalize(query):
+    """Reduce `query` to a CanonicalQuery; `key` is a stable string for exact lookups"""
+    text = (query or "").lower().replace("’", "'")
+
+    connectors = []
+    for name, pattern in _CONNECTOR_PATTERNS:
+        if pattern.search(text):
+            connectors.append(name)
+            text = pattern.sub(" ", text)
+
+    error_codes = []
+    for match in _ERROR_CODE.finditer(text):
+        code = re.sub(r"[-\s]", "", match.group(1) or match.group(2)).upper()
+        if code not in error_codes:
+            error_codes.append(code)
+    text = _ERROR_CODE.sub(" ", text)
+
+    text = NEGATIONS.sub(" not ", text)
+    stems = (word if word.isdigit() else _stem(word) for word in _WORD.findall(text) if word not in STOP_WORDS)
+    tokens = sorted({_STEMMED_SYNONYMS.get(stem, stem) for stem in stems})
+    error_codes = tuple(sorted(error_codes))
+    connectors = tuple(connectors)
+    key = " ".join(tokens + [code.lower() for code in error_codes] + [c.lower() for c in connectors])
+    numbers = tuple(token for token in tokens if token.isdigit())
+    # "screen is blank" and "screen not blank" differ by one token but ask opposite things
+    return CanonicalQuery(key, frozenset(tokens), error_codes, connectors, "not" in tokens, numbers)
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return Counter(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def similarity(a, b, vectors=None):
+    """
+    0..1 similarity of two CanonicalQuery values: the mean of token Jaccard
+    and character-trigram cosine, or the cosine of `vectors` (a pair of
+    embeddings) when given. 0 if their error codes, connectors, numbers or
+    negation differ; a shared error code alone counts for half, since it names the
+    problem.
+    """
+    if (a.error_codes != b.error_codes or a.connectors != b.connectors or a.negated != b.negated
+            or a.numbers != b.numbers):
+        return 0.0
+    if a.key == b.key:
+        return 1.0
+    if vectors is not None:
+        score = _cosine(*vectors)
+    elif not a.tokens or not b.tokens:
+        score = 0.0
+    else:
+        # Negation already matches, so "not" would only inflate the overlap
+        a_tokens, b_tokens = a.tokens - {"not"}, b.tokens - {"not"}
+        if not a_tokens or not b_tokens:
+            return 0.0
+        jaccard = len(a_tokens & b_tokens) / len(a_tokens | b_tokens)
+        trigram = _cosine(_trigrams(" ".join(sorted(a_tokens))), _trigrams(" ".join(sorted(b_tokens))))
+        score = (jaccard + trigram) / 2
+    return (1 + score) / 2 if a.error_codes else score
+
+
+def _cosine(u, v):
+    if isinstance(u, Counter):
+        dot = sum(count * v[gram] for gram, count in u.items())
+        norm = math.sqrt(sum(c * c for c in u.values())) * math.sqrt(sum(c * c for c in v.values()))
+    else:
+        dot = sum(x * y for x, y in zip(u, v))
+        norm = math.sqrt(sum(x * x for x in u)) * math.sqrt(sum(y * y for y in v))
+    return dot / norm if norm else 0.0
@@ -0,0 +1,116 @@
+"""
+Search result cache - TTL + LRU cache in front of Cortex Search so repeated
+troubleshooting questions skip the Snowflake round-trip
+"""
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+_WHITESPACE = re.compile(r"\s+")
+# A trailing "%" is part of the question ("stuck at 80%"), not punctuation
+_EDGE_PUNCTUATION = re.compile(r"^[^\w]+|[^\w%]+$")
+
+
+def normalize_query(query):
+    """Lowercase, collapse whitespace and drop leading/trailing punctuation"""
+    query = _WHITESPACE.sub(" ", (query or "").strip().lower())
+    return _EDGE_PUNCTUATION.sub("", query)
+
+
+def make_key(query, columns=None, filter=None, limit=None):
+    """Cache key for one search request"""
+    return (
+        normalize_query(query),
+        tuple(sorted(columns or ())),
+        json.dumps(filter, sort_keys=True) if filter else "",
+        limit,
+    )
+
+
+class SearchCache:
+    """
+    Thread-safe LRU cache with a per-entry TTL.
+
+    `max_entries` bounds the size; the least recently used entry is evicted
+    first. Each entry expires `ttl` seconds after it was stored unless a
+    different ttl is passed to `put()`.
+    """
+
+    def __init__(self, max_entries=512, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+        }
+
+    def get(self, key):
+        """Return the cached value or None on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return value
+
+    def put(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def get_or_load(self, key, loader, ttl=None):
+        """Return the cached value, calling `loader()` and storing its result on a miss"""
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            self.put(key, value, ttl=ttl)
+        return value
+
+    def invalidate(self, query=None):
+        """
+        Drop entries for one query (any columns/filter/limit), or everything
+        when no query is given. Returns the number of entries removed.
+        """
+        with self._lock:
+            if query is None:
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                normalized = normalize_query(query)
+                stale = [key for key in self._entries if key[0] == normalized]
+                for key in stale:
+                    del self._entries[key]
+                removed = len(stale)
+            self._stats["invalidations"] += removed
+            return removed
+
+    def stats(self):
+        """Hit/miss counters plus current size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["max_entries"] = self.max_entries
+        stats["ttl"] = self.ttl
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
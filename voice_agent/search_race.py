@@ -0,0 +1,87 @@
+"""
+Search race - Cortex Search with a latency budget and a local fallback
+
+The primary search (Cortex) runs on a worker thread. If it answers within
+the budget its result is used; if it fails or runs over, the fallback
+(the local index) answers instead and the primary is left to finish in
+the background, where `on_late` can still cache its result. Every answer
+is counted by source so the fallback rate can be tracked.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+
+class SearchRace:
+    def __init__(self, budget_ms=800, workers=4, primary="cortex", fallback="local"):
+        self.budget_ms = budget_ms
+        self.primary = primary
+        self.fallback = fallback
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="search-race")
+        self._lock = threading.Lock()
+        self._stats = {
+            "answered": {primary: 0, fallback: 0},
+            "timeouts": 0,
+            "primary_errors": 0,
+            "fallback_errors": 0,
+            "late_completions": 0,
+        }
+
+    def _count(self, name, source=None):
+        with self._lock:
+            if source is not None:
+                self._stats["answered"][source] += 1
+            if name is not None:
+                self._stats[name] += 1
+
+    def run(self, primary, fallback=None, on_late=None):
+        """
+        Return (result, source). `primary` and `fallback` are zero-argument
+        callables; without a fallback this just waits for the primary.
+        """
+        future = self._executor.submit(primary)
+        if fallback is None:
+            result = future.result()
+            self._count(None, self.primary)
+            return result, self.primary
+
+        reason = None
+        try:
+            result = future.result(timeout=self.budget_ms / 1000)
+            self._count(None, self.primary)
+            return result, self.primary
+        except TimeoutError:
+            reason = "timeouts"
+            if on_late is not None:
+                future.add_done_callback(lambda f: self._late(f, on_late))
+        except Exception as e:
+            reason = "primary_errors"
+            print(f"{self.primary} search failed, answering from {self.fallback}: {e}")
+
+        try:
+            result = fallback()
+        except Exception:
+            self._count("fallback_errors")
+            if reason == "timeouts":
+                # Nothing else to answer with - keep waiting on the primary
+                result = future.result()
+                self._count(reason, self.primary)
+                return result, self.primary
+            raise
+        self._count(reason, self.fallback)
+        return result, self.fallback
+
+    def _late(self, future, on_late):
+        if future.exception() is None:
+            self._count("late_completions")
+            on_late(future.result())
+
+    def stats(self):
+        with self._lock:
+            stats = {key: dict(value) if isinstance(value, dict) else value for key, value in self._stats.items()}
+        answered = sum(stats["answered"].values())
+        stats["budget_ms"] = self.budget_ms
+        stats["fallback_rate"] = stats["answered"][self.fallback] / answered if answered else 0.0
+        return stats
+
+    def close(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,155 @@
+"""
+Semantic cache - near-duplicate lookups in front of the search result cache
+
+Drop-in for SearchCache (same make_key keys, get/put/get_or_load/
+invalidate/stats). The query part of each key is replaced by its canonical
+form, so rephrasings that canonicalize identically share one entry; on a
+miss, earlier queries with the same columns/filter/limit, error codes,
+connectors, negation and numbers are scored with similarity() and the best one at
+or above `threshold` is served instead of calling Cortex Search. At most
+`cache.max_entries` earlier queries are kept as candidates across all
+groups, least recently used first out.
+
+stats() also reports, for each of `report_thresholds`, the share of lookups
+whose best match would have cleared that threshold - a guide for tuning.
+"""
+import threading
+from collections import OrderedDict
+
+from query_normalizer import canonicalize, similarity
+from search_cache import SearchCache
+
+# Highest threshold at which cache_replay.py's labelled sample still gets near
+# hits; from 0.6 down it serves answers to different questions
+DEFAULT_THRESHOLD = 0.7
+DEFAULT_REPORT_THRESHOLDS = (0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+
+
+class SemanticCache:
+    """
+    `embed`, if given, maps a canonical query string to a vector and is used
+    for scoring instead of the token/trigram similarity, e.g. a local
+    sentence-embedding model.
+    """
+
+    def __init__(self, cache=None, threshold=DEFAULT_THRESHOLD, embed=None,
+                 report_thresholds=DEFAULT_REPORT_THRESHOLDS):
+        self.cache = cache if cache is not None else SearchCache()
+        self.threshold = threshold
+        self.embed = embed
+        self.report_thresholds = tuple(report_thresholds)
+
+        # (columns, filter, limit, error codes, connectors, negated, numbers) -> {canonical key: (query, vector)}
+        self._groups = {}
+        # Every candidate's canonical key -> its group, least recently used first
+        self._candidates = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"exact_hits": 0, "near_hits": 0, "misses": 0}
+        self._would_hit = dict.fromkeys(self.report_thresholds, 0)
+
+    def _canonical(self, key):
+        canonical = canonicalize(key[0])
+        group = tuple(key[1:]) + (canonical.error_codes, canonical.connectors, canonical.negated, canonical.numbers)
+        return (canonical.key,) + tuple(key[1:]), canonical, group
+
+    def _nearest(self, canonical, group):
+        """Best (score, cache key) among earlier queries in the group"""
+        vector = self.embed(canonical.key) if self.embed else None
+        best_score, best_key = 0.0, None
+        with self._lock:
+            candidates = list(self._groups.get(group, {}).items())
+        for cache_key, (other, other_vector) in candidates:
+            vectors = (vector, other_vector) if vector is not None else None
+            score = similarity(canonical, other, vectors)
+            if score > best_score:
+                best_score, best_key = score, cache_key
+        return best_score, best_key
+
+    def _drop(self, cache_key):
+        """Forget one candidate (caller holds the lock)"""
+        group = self._candidates.pop(cache_key, None)
+        entries = self._groups.get(group)
+        if entries is not None:
+            entries.pop(cache_key, None)
+            if not entries:
+                del self._groups[group]
+
+    def _record(self, score):
+        for threshold in self.report_thresholds:
+            if score >= threshold:
+                self._would_hit[threshold] += 1
+
+    def get(self, key):
+        """Return the cached value for `key` or a near-duplicate of it, or None"""
+        cache_key, canonical, group = self._canonical(key)
+        value = self.cache.get(cache_key)
+        if value is not None:
+            with self._lock:
+                self._stats["exact_hits"] += 1
+                self._record(1.0)
+            return value
+
+        score, near_key = self._nearest(canonical, group)
+        with self._lock:
+            self._record(score)
+        if near_key is not None and score >= self.threshold:
+            value = self.cache.get(near_key)
+            if value is not None:
+                with self._lock:
+                    self._stats["near_hits"] += 1
+                    if near_key in self._candidates:
+                        self._candidates.move_to_end(near_key)
+                return value
+            # Expired or evicted underneath us
+            with self._lock:
+                self._drop(near_key)
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def put(self, key, value, ttl=None):
+        cache_key, canonical, group = self._canonical(key)
+        self.cache.put(cache_key, value, ttl=ttl)
+        vector = self.embed(canonical.key) if self.embed else None
+        with self._lock:
+            self._groups.setdefault(group, {})[cache_key] = (canonical, vector)
+            self._candidates[cache_key] = group
+            self._candidates.move_to_end(cache_key)
+            # Bounded like the inner cache, so caller text can't grow groups without limit
+            while len(self._candidates) > self.cache.max_entries:
+                self._drop(next(iter(self._candidates)))
+
+    def get_or_load(self, key, loader, ttl=None):
+        """Return the cached (or near-duplicate) value, calling `loader()` on a miss"""
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            self.put(key, value, ttl=ttl)
+        return value
+
+    def invalidate(self, query=None):
+        """Drop entries for one query's canonical form, or everything"""
+        with self._lock:
+            if query is None:
+                self._groups.clear()
+                self._candidates.clear()
+                return self.cache.invalidate()
+            canonical_key = canonicalize(query).key
+            for cache_key in [k for k in self._candidates if k[0] == canonical_key]:
+                self._drop(cache_key)
+        return self.cache.invalidate(canonical_key)
+
+    def stats(self):
+        """Exact/near hit counters, per-threshold would-be hit rates and the underlying cache stats"""
+        with self._lock:
+            stats = dict(self._stats)
+            would_hit = dict(self._would_hit)
+        lookups = stats["exact_hits"] + stats["near_hits"] + stats["misses"]
+        stats["threshold"] = self.threshold
+        stats["hit_rate"] = (stats["exact_hits"] + stats["near_hits"]) / lookups if lookups else 0.0
+        stats["hit_rate_by_threshold"] = {
+            str(threshold): count / lookups if lookups else 0.0
+            for threshold, count in would_hit.items()
+        }
+        stats["cache"] = self.cache.stats()
+        return stats
@@ -0,0 +1,15 @@
+"""
+Snowflake config - connection parameters shared by the tool server and the
+command-line tools, so importing them doesn't start a server
+"""
+import os
+
+CONNECTION_PARAMETERS = {
+    "account": "TFLNRNC-FXB95084",
+    "user": "ATKSINGH",
+    "password": os.environ.get("SNOWFLAKE_PASSWORD"),
+    "role": "ACCOUNTADMIN",
+    "database": "cortext_search_db",
+    "warehouse": "CORTEXT_SEARCH_WH",
+    "schema": "PUBLIC",
+}
@@ -0,0 +1,267 @@
+"""
+Snowflake session pool - keeps warm Snowpark sessions around so tool calls
+don't pay a full login on every request
+"""
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from snowflake.core import Root
+from snowflake.snowpark import Session
+
+
+class PoolTimeout(Exception):
+    """Raised when no session becomes free within the checkout timeout"""
+
+
+class PooledSession:
+    """A Snowpark session plus the Root and service handles built on top of it"""
+
+    def __init__(self, session):
+        self.session = session
+        self.root = Root(session)
+        self.created_at = time.monotonic()
+        self.last_checked = self.created_at
+        self._services = {}
+
+    def search_service(self, database, schema, service):
+        """Return the Cortex Search service handle, resolving it only once"""
+        key = (database, schema, service)
+        if key not in self._services:
+            self._services[key] = (
+                self.root.databases[database]
+                    .schemas[schema]
+                    .cortex_search_services[service]
+            )
+        return self._services[key]
+
+    def close(self):
+        try:
+            self.session.close()
+        except Exception:
+            pass
+
+
+class SnowflakeSessionPool:
+    """
+    Bounded pool of Snowpark sessions.
+
+    Sessions are created up to `size`, handed out with `checkout()`, and
+    health-checked with `SELECT 1` when they have been idle longer than
+    `health_check_interval`. Sessions older than `max_age` are closed and
+    re-created so the login token never expires mid-request.
+    """
+
+    def __init__(self, connection_parameters, size=4, max_age=3600,
+                 health_check_interval=60, checkout_timeout=10):
+        self.connection_parameters = connection_parameters
+        self.size = size
+        self.max_age = max_age
+        self.health_check_interval = health_check_interval
+        self.checkout_timeout = checkout_timeout
+
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._closed = False
+        self._stats = {
+            "checkouts": 0,
+            "wait_time_total_ms": 0.0,
+            "wait_time_max_ms": 0.0,
+            "timeouts": 0,
+            "connects": 0,
+            "reconnects": 0,
+            "health_check_failures": 0,
+            "errors": 0,
+        }
+
+    def _connect(self):
+        session = Session.builder.configs(self.connection_parameters).create()
+        with self._lock:
+            self._stats["connects"] += 1
+        return PooledSession(session)
+
+    def warm(self, count=None):
+        """Open sessions up front so the first tool calls don't pay for login"""
+        count = self.size if count is None else min(count, self.size)
+        opened = 0
+        while opened < count:
+            with self._lock:
+                if self._created >= self.size:
+                    break
+                self._created += 1
+            try:
+                self._idle.put(self._connect())
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+            opened += 1
+        return opened
+
+    def _is_expired(self, pooled):
+        return time.monotonic() - pooled.created_at > self.max_age
+
+    def _is_healthy(self, pooled):
+        if time.monotonic() - pooled.last_checked < self.health_check_interval:
+            return True
+        try:
+            pooled.session.sql("SELECT 1").collect()
+        except Exception:
+            with self._lock:
+                self._stats["health_check_failures"] += 1
+            return False
+        pooled.last_checked = time.monotonic()
+        return True
+
+    def _reconnect(self, pooled):
+        pooled.close()
+        fresh = self._connect()
+        with self._lock:
+            self._stats["reconnects"] += 1
+        return fresh
+
+    def _acquire(self):
+        if self._closed:
+            raise RuntimeError("Session pool is closed")
+
+        start = time.monotonic()
+        pooled = None
+        try:
+            pooled = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                try:
+                    pooled = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                try:
+                    pooled = self._idle.get(timeout=self.checkout_timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self._stats["timeouts"] += 1
+                    raise PoolTimeout(
+                        f"No Snowflake session free after {self.checkout_timeout}s"
+                    )
+
+        waited_ms = (time.monotonic() - start) * 1000
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["wait_time_total_ms"] += waited_ms
+            self._stats["wait_time_max_ms"] = max(self._stats["wait_time_max_ms"], waited_ms)
+
+        if self._is_expired(pooled) or not self._is_healthy(pooled):
+            try:
+                pooled = self._reconnect(pooled)
+            except Exception:
+                self._discard()
+                raise
+        return pooled
+
+    def _release(self, pooled):
+        if self._closed:
+            pooled.close()
+            self._discard()
+            return
+        self._idle.put(pooled)
+
+    def _discard(self):
+        with self._lock:
+            self._created -= 1
+
+    @contextmanager
+    def checkout(self):
+        """
+        Borrow a session for the duration of the block.
+
+        If the block raises, the session is re-authenticated on its next
+        checkout instead of being trusted blindly.
+        """
+        pooled = self._acquire()
+        try:
+            yield pooled
+        except Exception:
+            with self._lock:
+                self._stats["errors"] += 1
+            # Force a health check before this session is handed out again
+            pooled.last_checked = 0
+            self._release(pooled)
+            raise
+        else:
+            self._release(pooled)
+
+    def refresh_idle(self, margin=0):
+        """
+        Health-check idle sessions and re-authenticate any that failed or
+        will pass `max_age` within `margin` seconds, so callers never pay
+        for the reconnect themselves.
+        """
+        refreshed = 0
+        for _ in range(self._idle.qsize()):
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            expiring = time.monotonic() - pooled.created_at > self.max_age - margin
+            if expiring or not self._is_healthy(pooled):
+                try:
+                    pooled = self._reconnect(pooled)
+                except Exception:
+                    self._discard()
+                    continue
+                refreshed += 1
+            self._release(pooled)
+        return refreshed
+
+    def start_keepalive(self, interval=60):
+        """Refresh idle sessions every `interval` seconds on a daemon thread"""
+        def run():
+            while not self._closed:
+                time.sleep(interval)
+                if self._closed:
+                    break
+                try:
+                    self.refresh_idle(margin=interval)
+                except Exception as e:
+                    print(f"Session keepalive failed: {e}")
+
+        thread = threading.Thread(target=run, name="snowflake-keepalive", daemon=True)
+        thread.start()
+        return thread
+
+    def metrics(self):
+        """Snapshot of pool counters for the health endpoints"""
+        with self._lock:
+            stats = dict(self._stats)
+            created = self._created
+        idle = self._idle.qsize()
+        checkouts = stats["checkouts"]
+        stats["wait_time_avg_ms"] = (
+            stats["wait_time_total_ms"] / checkouts if checkouts else 0.0
+        )
+        stats.update({
+            "size": self.size,
+            "open": created,
+            "idle": idle,
+            "in_use": max(created - idle, 0),
+        })
+        return stats
+
+    def close(self):
+        """Close every idle session; sessions still checked out close on release"""
+        self._closed = True
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            pooled.close()
+            self._discard()
@@ -1,11 +1,20 @@
 import asyncio
+import json
 import random
 from re import X
 import sounddevice as sd
 import numpy as np
 import os
-from snowflake.core import Root
-from snowflake.snowpark import Session
+from typing import Optional
+from pydantic import BaseModel, Field
+from audio_capture import EnergyVAD, MicrophoneSource, WavFileSource, stream_audio
+from audio_playback import AudioPlayer
+from cortex_search_client import CortexSearchClient, build_filter, merge_results
+from local_index import ReloadingIndex
+from turn_tracing import TurnTracer
+from search_cache import SearchCache
+from semantic_cache import SemanticCache
+from stall_locator import StallLocator, StatusEventTail, describe_stalls, load_chargers
 
 from agents import (
     function_tool,
@@ -28,33 +37,115 @@ client = OpenAI(
   base_url="https://<account-identifier>.snowflakecomputing.com/api/v2/cortex/v1"
 )
 
-@function_tool
-def get_info() -> str:
-    CONNECTION_PARAMETERS = {
+CONNECTION_PARAMETERS = {
     "account": "TFLNRNC-FXB95084",  # or just hardcode
     "user": "ATKSINGH",
-    "password": os.environ["SNOWFLAKE_PASS"],
+    "password": os.environ.get("SNOWFLAKE_PASS"),
     "role": "ACCOUNTADMIN",
     "database": "cortext_search_db",
     "warehouse": "CORTEXT_SEARCH_WH",
     "schema": "PUBLIC",
 }
 
-    session = Session.builder.configs(CONNECTION_PARAMETERS).create()
-    root = Root(session)
+# One search client for the life of the process; it logs in lazily and keeps
+# its session fresh in the background. Repeated troubleshooting questions, and
+# close paraphrases of them, are answered from its cache instead of Cortex Search.
+search_client = CortexSearchClient(
+    CONNECTION_PARAMETERS,
+    database="cortex_search_db",
+    schema="public",
+    service="chunks_search_service",
+    pool_size=3,
+    cache=SemanticCache(SearchCache(max_entries=256, ttl=300)),
+    # Exported copy of the chunks (local_index.py export) that answers when
+    # Cortex Search takes longer than the budget
+    local_index=ReloadingIndex(os.environ["LOCAL_INDEX_PATH"], text_column="text")
+    if os.environ.get("LOCAL_INDEX_PATH") else None,
+    latency_budget_ms=int(os.environ.get("CORTEX_BUDGET_MS", "800")),
+)
 
-    search_service = (root
-    .databases["cortex_search_db"]
-    .schemas["public"]
-    .cortex_search_services["chunks_search_service"]
-    )
+# Cortex Search attribute columns the get_info filters map onto; these must be
+# declared as ATTRIBUTES on chunks_search_service
+FILTER_COLUMNS = {
+    "station": "STATION_ID",
+    "connector": "CONNECTOR_TYPE",
+    "vehicle": "VEHICLE_MODEL",
+}
+MAX_QUERIES = 5
+RESULTS_PER_QUERY = 3
+MAX_RESULTS = 5
+
+class InfoQuery(BaseModel):
+    query: str = Field(description="Short, specific question, e.g. the exact error code or symptom")
+    station: Optional[str] = Field(None, description="Station name or id, if known")
+    connector: Optional[str] = Field(None, description="NACS, CCS, CHAdeMO or J1772, if known")
+    vehicle: Optional[str] = Field(None, description="Vehicle make/model/year, if known")
 
-    resp = search_service.search(
-    query="My car wont plug into the charger. What could be the issues?",
-    columns=["text"],
-    limit=1
+@function_tool
+async def get_info(queries: list[InfoQuery]) -> str:
+    """Search the EV charging troubleshooting knowledge base.
+
+    Args:
+        queries: One entry per fact needed (e.g. error code, vehicle quirk, site SOP); they are searched together.
+    """
+    queries = queries[:MAX_QUERIES]
+    requests = [
+        (
+            q.query,
+            build_filter(**{
+                FILTER_COLUMNS[name]: getattr(q, name)
+                for name in FILTER_COLUMNS
+            }),
+        )
+        for q in queries
+    ]
+    result_lists = await search_client.asearch_many(
+        requests,
+        columns=["text"],
+        limit=RESULTS_PER_QUERY
     )
-    return resp.to_str()
+    results = merge_results(result_lists, column="text", limit=MAX_RESULTS)
+    return json.dumps({
+        "queries": [q.query for q in queries],
+        "results": results,
+    })
+
+# Charger export behind find_nearest_stall, kept current from the status events file
+stall_locator = StallLocator(load_chargers(os.environ["CHARGERS_PATH"])) if os.environ.get("CHARGERS_PATH") else None
+status_tail = StatusEventTail(os.environ["CHARGER_STATUS_FEED_PATH"], stall_locator) \
+    if stall_locator and os.environ.get("CHARGER_STATUS_FEED_PATH") else None
+
+@function_tool
+async def find_nearest_stall(
+    stall: Optional[str] = None,
+    station: Optional[str] = None,
+    connector: Optional[str] = None,
+    min_power_kw: float = 0,
+) -> str:
+    """Find the closest Available stalls - another stall at this station, or the nearest other station.
+
+    Args:
+        stall: The caller's stall/charger id, if known (it is excluded from the answer).
+        station: Station id, if the stall isn't known.
+        connector: NACS, CCS, CHAdeMO or J1772 - only stalls with this connector are returned.
+        min_power_kw: Minimum charger power, e.g. 150 for fast charging; 0 for any.
+    """
+    if stall_locator is None:
+        return json.dumps({"error": "Stall availability is not loaded"})
+    if status_tail is not None:
+        status_tail.poll()
+    try:
+        stalls = stall_locator.near(stall, station, k=4, connector=connector,
+                                    min_power_kw=min_power_kw, max_per_site=2)
+    except KeyError as e:
+        return json.dumps({"error": e.args[0]})
+    return json.dumps({
+        "result": describe_stalls(stalls, station or stall_locator.site_of(stall), connector),
+        "stalls": [
+            {key: s[key] for key in ("charger_id", "site_id", "distance_km", "max_power_kw")}
+            for s in stalls
+        ],
+    })
 
 agent = RealtimeAgent(
     name="Assistant",
@@ -87,6 +178,7 @@ agent = RealtimeAgent(
         • You need model- or site-specific steps (vehicle quirks, stall layouts, SOPs).  
         • The first quick triage fails or guidance conflicts.  
         - Compose short, specific queries including: station name/id, stall, connector type, vehicle model/year, exact error text/code, timestamp, ambient conditions if relevant.
+        - When you need several facts (e.g. error code + vehicle quirk + site SOP), send them as separate entries in ONE get_info call; fill station/connector/vehicle when known.
         - If get_info returns low-confidence or conflicting guidance, default to the safest option or escalate.
 
         UNIVERSAL QUICK TRIAGE (≤90s)
@@ -162,6 +254,7 @@ agent = RealtimeAgent(
 
         GUIDED CHOICE
         “Two options now: (1) switch to Stall {alt_stall} which shows healthier status, or (2) head to {nearby_station} about {distance}. What works?”
+        Fill {alt_stall}, {nearby_station} and {distance} from find_nearest_stall (pass the stall or station and the connector); never guess them.
 
         SAFETY
         “If you see smoke, sparks, or exposed wires, step away now and call 911. I’ll note the location and guide you to a safe alternative.”
@@ -169,48 +262,81 @@ agent = RealtimeAgent(
         OPERATING PRINCIPLE
         Safety → Accuracy → Speed. One clear step at a time, minimal questions, confirm essentials, use get_info when needed, and resolve or escalate fast.
     """,
-    tools=[get_info],
+    tools=[get_info, find_nearest_stall],
 )
 async def main():
+    # Log in to Snowflake while the realtime session is being set up
+    search_client.connect_in_background()
+
+    player = AudioPlayer(buffer_ms=int(os.environ.get("AUDIO_BUFFER_MS", "400")))
+    # Per-turn latency spans; TRACE_JSONL / TRACE_PROM choose the exports
+    tracer = TurnTracer(
+        jsonl_path=os.environ.get("TRACE_JSONL"),
+        prom_path=os.environ.get("TRACE_PROM"),
+        log_events=os.environ.get("TRACE_EVENTS") == "1",
+    )
+
     # Start the session
     session = await runner.run(model_config={"api_key": API_KEY})
 
-    async with session:
-        print("Session started! The agent will stream audio responses in real-time.")
-        # Process events
-        async for event in session:
-            try:
-                if event.type == "agent_start":
-                    print(f"Agent started: {event.agent.name}")
-                elif event.type == "agent_end":
-                    print(f"Agent ended: {event.agent.name}")
-                elif event.type == "handoff":
-                    print(f"Handoff from {event.from_agent.name} to {event.to_agent.name}")
-                elif event.type == "tool_start":
-                    print(f"Tool started: {event.tool.name}")
-                elif event.type == "tool_end":
-                    print(f"Tool ended: {event.tool.name}; output: {event.output}")
-                elif event.type == "audio_end":
-                    print("Audio ended")
-                elif event.type == "audio":
-                    # Enqueue audio for callback-based playback with metadata
-                    # Non-blocking put; queue is unbounded, so drops won’t occur.
-                    pass
-                elif event.type == "audio_interrupted":
-                    print("Audio interrupted")
-                    # Begin graceful fade + flush in the audio callback and rebuild jitter buffer.
-                elif event.type == "error":
-                    print(f"Error: {event.error}")
-                elif event.type == "history_updated":
-                    pass  # Skip these frequent events
-                elif event.type == "history_added":
-                    pass  # Skip these frequent events
-                elif event.type == "raw_model_event":
-                    print(f"Raw model event: {_truncate_str(str(event.data), 200)}")
-                else:
-                    print(f"Unknown event type: {event.type}")
-            except Exception as e:
-                print(f"Error processing event: {_truncate_str(str(e), 200)}")
+    player.start()
+    try:
+        async with session:
+            print("Session started! The agent will stream audio responses in real-time.")
+            # MIC_WAV replays a WAV file instead of the microphone; MIC_VAD=1
+            # gates silence locally so it isn't uploaded
+            if os.environ.get("MIC_WAV"):
+                source = WavFileSource(os.environ["MIC_WAV"])
+            else:
+                source = MicrophoneSource()
+            vad = EnergyVAD(source.frame_samples) if os.environ.get("MIC_VAD") == "1" else None
+            capture_stats = {}
+            capture = asyncio.create_task(stream_audio(session, source, vad, capture_stats))
+            # Process events
+            async for event in session:
+                try:
+                    tracer.observe(event)
+                    if event.type == "agent_start":
+                        print(f"Agent started: {event.agent.name}")
+                    elif event.type == "agent_end":
+                        print(f"Agent ended: {event.agent.name}")
+                    elif event.type == "handoff":
+                        print(f"Handoff from {event.from_agent.name} to {event.to_agent.name}")
+                    elif event.type == "tool_start":
+                        print(f"Tool started: {event.tool.name}")
+                    elif event.type == "tool_end":
+                        print(f"Tool ended: {event.tool.name}; output: {event.output}")
+                    elif event.type == "audio_end":
+                        print("Audio ended")
+                        player.end_of_response()
+                    elif event.type == "audio":
+                        # Copy into the jitter buffer; the output callback drains it
+                        player.write(event.audio.data)
+                    elif event.type == "audio_interrupted":
+                        print("Audio interrupted")
+                        # Fade out and flush in the audio callback
+                        player.interrupt()
+                    elif event.type == "error":
+                        print(f"Error: {event.error}")
+                    elif event.type == "history_updated":
+                        pass  # Skip these frequent events
+                    elif event.type == "history_added":
+                        pass  # Skip these frequent events
+                    elif event.type == "raw_model_event":
+                        print(f"Raw model event: {_truncate_str(str(event.data), 200)}")
+                    else:
+                        print(f"Unknown event type: {event.type}")
+                except Exception as e:
+                    print(f"Error processing event: {_truncate_str(str(e), 200)}")
+            capture.cancel()
+            print(f"Capture stats: {capture_stats}")
+    finally:
+        player.stop()
+        print(f"Playback stats: {player.stats()}")
+        tracer.close()
+        print(f"Turn latency: {tracer.summary()}")
+        if search_client.race is not None:
+            print(f"Search sources: {search_client.race.stats()}")
 
 runner = RealtimeRunner(
     starting_agent=agent,
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Stall locator - nearest healthy stalls for the "switch stall / head to the
+next station" step of a call
+
+Chargers are bucketed into a fixed lat/lon grid (CELL_DEGREES per side).
+A lookup scans rings of cells outward from the caller and measures
+haversine distance to the candidates with numpy, stopping as soon as the
+k-th best match is closer than anything in the next ring could be. Bucket
+membership never changes (chargers don't move), so status changes are
+applied in place: one array write per charger, no rebuild.
+
+    python stall_locator.py fleet.parquet --charger STN_SF_FERRY_CHG_01 --connector CCS
+    python stall_locator.py fleet.parquet --bench 10000
+"""
+import argparse
+import json
+import math
+import os
+import threading
+import time
+
+import numpy as np
+
+from query_normalizer import CONNECTOR_TYPES, canonicalize
+
+CELL_DEGREES = 0.05
+KM_PER_DEGREE = 111.32
+EARTH_RADIUS_KM = 6371.0088
+DEFAULT_MAX_KM = 50
+
+STATUS_AVAILABLE = "Available"
+CONNECTOR_BITS = {name: 1 << i for i, name in enumerate(CONNECTOR_TYPES)}
+# Connectors per model, for charger tables without a CONNECTOR_TYPES column
+MODEL_CONNECTORS = {
+    "Terra184": ("CCS", "CHADEMO"),
+    "Terra54": ("CCS", "CHADEMO"),
+    "RTM75": ("CCS",),
+    "CPE250": ("CCS", "CHADEMO"),
+    "S-Series": ("CCS", "NACS"),
+    "Gen4 HPC": ("CCS", "CHADEMO"),
+}
+LOCATOR_COLUMNS = ["CHARGER_ID", "SITE_ID", "LOCATION_LAT", "LOCATION_LON", "STATUS_LAST_SEEN", "MAX_POWER_KW"]
+
+
+def haversine_km(lat, lon, lats, lons):
+    """Great-circle distance from one point to arrays of points"""
+    lat, lon = math.radians(lat), math.radians(lon)
+    lats, lons = np.radians(lats), np.radians(lons)
+    a = np.sin((lats - lat) / 2) ** 2 + math.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def connector_mask(value):
+    """Bitmask for a connector name, a comma-separated list or a list ("CCS1", "Tesla plug" -> NACS)"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return 0
+    names = value if isinstance(value, (list, tuple, np.ndarray)) else str(value).split(",")
+    mask = 0
+    for name in names:
+        for canonical in canonicalize(str(name)).connectors or (str(name).strip().upper(),):
+            mask |= CONNECTOR_BITS.get(canonical, 0)
+    return mask
+
+
+def connector_names(mask):
+    return [name for name, bit in CONNECTOR_BITS.items() if mask & bit]
+
+
+def _cell(lat, lon):
+    return np.floor(np.asarray(lat) / CELL_DEGREES).astype(np.int64), np.floor(np.asarray(lon) / CELL_DEGREES).astype(np.int64)
+
+
+def _cell_key(row, col):
+    # Rows span +-1800 and columns +-3600 at 0.05 degrees; offset both to pack them in one int
+    return (row + 4000) * 10000 + (col + 4000)
+
+
+class StallLocator:
+    """
+    Spatial index over charger records (a DataFrame or list of dicts with
+    LOCATOR_COLUMNS, plus CONNECTOR_TYPES or MODEL)
+    """
+
+    def __init__(self, chargers):
+        import pandas as pd
+
+        frame = pd.DataFrame(chargers)
+        frame = frame[frame["LOCATION_LAT"].notna() & frame["LOCATION_LON"].notna()].reset_index(drop=True)
+        self.charger_ids = frame["CHARGER_ID"].astype(str).to_numpy(dtype=object)
+        self.site_ids = frame["SITE_ID"].astype(str).to_numpy(dtype=object)
+        self.lats = frame["LOCATION_LAT"].to_numpy(dtype=np.float64)
+        self.lons = frame["LOCATION_LON"].to_numpy(dtype=np.float64)
+        self.power = pd.to_numeric(frame["MAX_POWER_KW"], errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+        self.statuses = frame["STATUS_LAST_SEEN"].fillna("Unknown").astype(str).to_numpy(dtype=object)
+        self.available = self.statuses == STATUS_AVAILABLE
+
+        if "CONNECTOR_TYPES" in frame:
+            values = frame["CONNECTOR_TYPES"].map(lambda v: ",".join(v) if isinstance(v, (list, tuple, np.ndarray)) else v)
+        else:
+            values = frame.get("MODEL", pd.Series(index=frame.index, dtype=object))
+        # Few distinct values, so parse each once
+        codes, distinct = pd.factorize(values)
+        masks = np.array([connector_mask(
+            value if "CONNECTOR_TYPES" in frame else MODEL_CONNECTORS.get(value)
+        ) for value in distinct] + [0], dtype=np.int16)
+        self.connectors = masks[codes]
+
+        self._position = {charger_id: i for i, charger_id in enumerate(self.charger_ids)}
+        self._site_position = {}
+        for i, site_id in enumerate(self.site_ids):
+            self._site_position.setdefault(site_id, i)
+
+        rows, cols = _cell(self.lats, self.lons)
+        keys = _cell_key(rows, cols)
+        order = np.argsort(keys, kind="stable")
+        distinct, starts = np.unique(keys[order], return_index=True)
+        ends = np.append(starts[1:], len(order))
+        self._cells = {int(key): order[start:end] for key, start, end in zip(distinct, starts, ends)}
+
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "status_updates": 0, "lookup_time_total_ms": 0.0, "lookup_time_max_ms": 0.0}
+
+    def __len__(self):
+        return len(self.charger_ids)
+
+    def location(self, charger_id=None, site_id=None):
+        """(lat, lon) of a charger, else of the site; None if neither is known"""
+        i = self._position.get(charger_id) if charger_id else None
+        if i is None and site_id:
+            i = self._site_position.get(site_id)
+        return None if i is None else (self.lats[i], self.lons[i])
+
+    def site_of(self, charger_id):
+        i = self._position.get(charger_id)
+        return None if i is None else self.site_ids[i]
+
+    def update_status(self, charger_ids, statuses):
+        """Apply status changes in place; returns how many known chargers changed"""
+        changed = 0
+        for charger_id, status in zip(charger_ids, statuses):
+            i = self._position.get(charger_id)
+            if i is None or self.statuses[i] == status:
+                continue
+            self.statuses[i] = status
+            self.available[i] = status == STATUS_AVAILABLE
+            changed += 1
+        with self._lock:
+            self._stats["status_updates"] += changed
+        return changed
+
+    def _ring(self, row, col, r):
+        if r == 0:
+            cells = [(row, col)]
+        else:
+            cells = [(row + dr, col + dc) for dr in (-r, r) for dc in range(-r, r + 1)]
+            cells += [(row + dr, col + dc) for dc in (-r, r) for dr in range(-r + 1, r)]
+        found = [self._cells.get(_cell_key(r_, c_)) for r_, c_ in cells]
+        found = [rows for rows in found if rows is not None]
+        return np.concatenate(found) if found else None
+
+    def _select(self, rows, distances, k, max_per_site):
+        order = np.argsort(distances, kind="stable")
+        if not max_per_site:
+            return order[:k]
+        picked, per_site = [], {}
+        for j in order:
+            site = self.site_ids[rows[j]]
+            if per_site.get(site, 0) < max_per_site:
+                per_site[site] = per_site.get(site, 0) + 1
+                picked.append(j)
+                if len(picked) == k:
+                    break
+        return np.array(picked, dtype=np.intp)
+
+    def nearest(self, lat, lon, k=3, connector=None, min_power_kw=0, max_km=DEFAULT_MAX_KM,
+                exclude=None, max_per_site=None):
+        """
+        Up to `k` Available stalls within `max_km` of (lat, lon), closest
+        first, that have `connector` (if given) and at least `min_power_kw`.
+        `exclude` is a charger id to leave out (the caller's own stall);
+        `max_per_site` spreads the answers over more stations.
+        """
+        start = time.perf_counter()
+        need = connector_mask(connector)
+        excluded = self._position.get(exclude, -1) if exclude else -1
+        row, col = (int(v) for v in _cell(lat, lon))
+        # Lower bound on the distance to any cell in ring r + 1 is r cell widths; cells
+        # narrow towards the poles, so take the width a degree poleward of the caller
+        cell_km = CELL_DEGREES * KM_PER_DEGREE * max(math.cos(math.radians(min(abs(lat) + 1, 89.9))), 0.01)
+        max_ring = int(max_km / cell_km) + 1
+
+        rows = np.empty(0, dtype=np.intp)
+        distances = np.empty(0)
+        picked = rows
+        for r in range(max_ring + 1):
+            ring = self._ring(row, col, r)
+            if ring is not None:
+                keep = self.available[ring] & (self.power[ring] >= min_power_kw)
+                if need:
+                    keep &= (self.connectors[ring] & need) == need
+                if excluded >= 0:
+                    keep &= ring != excluded
+                ring = ring[keep]
+                if len(ring):
+                    rows = np.concatenate([rows, ring])
+                    distances = np.concatenate([distances, haversine_km(lat, lon, self.lats[ring], self.lons[ring])])
+            if len(rows) >= k:
+                picked = self._select(rows, distances, k, max_per_site)
+                if len(picked) == k and distances[picked[-1]] <= r * cell_km:
+                    break
+        else:
+            picked = self._select(rows, distances, k, max_per_site)
+
+        results = [
+            {
+                "charger_id": self.charger_ids[rows[j]],
+                "site_id": self.site_ids[rows[j]],
+                "distance_km": round(float(distances[j]), 2),
+                "max_power_kw": float(self.power[rows[j]]),
+                "connectors": connector_names(int(self.connectors[rows[j]])),
+                "lat": float(self.lats[rows[j]]),
+                "lon": float(self.lons[rows[j]]),
+            }
+            for j in picked
+            if distances[j] <= max_km
+        ]
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._stats["lookups"] += 1
+            self._stats["lookup_time_total_ms"] += elapsed_ms
+            self._stats["lookup_time_max_ms"] = max(self._stats["lookup_time_max_ms"], elapsed_ms)
+        return results
+
+    def near(self, charger_id=None, site_id=None, **kwargs):
+        """nearest() around a known charger or site; the charger itself is left out"""
+        location = self.location(charger_id, site_id)
+        if location is None:
+            raise KeyError(f"Unknown {'charger' if charger_id else 'site'}: {charger_id or site_id}")
+        return self.nearest(*location, exclude=charger_id, **kwargs)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["chargers"] = len(self)
+        stats["available"] = int(self.available.sum())
+        stats["cells"] = len(self._cells)
+        stats["lookup_time_avg_ms"] = stats["lookup_time_total_ms"] / stats["lookups"] if stats["lookups"] else 0.0
+        return stats
+
+
+class StatusEventTail:
+    """
+    Tails a JSONL file of status events (CHARGER_ID, STATUS, EVENT_TIME - the
+    dashboard's CHARGER_STATUS_FEED_PATH format, read the same way as
+    frontend/status_feed.py FileStatusFeed) into a StallLocator
+    """
+
+    def __init__(self, path, locator):
+        self.path = path
+        self.locator = locator
+        self.offset = 0
+        self._lock = threading.Lock()
+
+    def poll(self):
+        """Apply events written since the last poll; returns how many stalls changed"""
+        with self._lock:
+            if not os.path.exists(self.path) or os.path.getsize(self.path) == self.offset:
+                return 0
+            with open(self.path, "rb") as f:
+                f.seek(self.offset)
+                data = f.read()
+            # Leave a partially written last line for the next poll
+            end = data.rfind(b"\n") + 1
+            self.offset += end
+            events = [json.loads(line) for line in data[:end].splitlines() if line.strip()]
+            # Newest event per charger, as FileStatusFeed keeps it
+            latest = {}
+            for event in sorted(events, key=lambda event: event["EVENT_TIME"]):
+                latest[event["CHARGER_ID"]] = event["STATUS"]
+            return self.locator.update_status(latest.keys(), latest.values())
+
+
+def stall_name(result):
+    """"CHG_03" for STN_SF_FERRY_CHG_03 - what's printed on the stall"""
+    charger_id, site_id = result["charger_id"], result["site_id"]
+    return charger_id[len(site_id) + 1:] if charger_id.startswith(site_id + "_") else charger_id
+
+
+def describe_stalls(results, site_id=None, connector=None):
+    """One or two spoken sentences: a free stall at the caller's site, then the nearest other station"""
+    if not results:
+        wanted = f" with {connector}" if connector else ""
+        return f"No available stalls{wanted} within {DEFAULT_MAX_KM} km right now."
+    here = [r for r in results if r["site_id"] == site_id]
+    elsewhere = [r for r in results if r["site_id"] != site_id]
+    sentences = []
+    if here:
+        best = here[0]
+        sentences.append(f"Stall {stall_name(best)} at this station is available ({best['max_power_kw']:g} kW).")
+    if elsewhere:
+        best = elsewhere[0]
+        count = sum(r["site_id"] == best["site_id"] for r in elsewhere)
+        sentences.append(
+            f"{'Nearest other' if here else 'Nearest'} station with a free stall: {best['site_id']}, "
+            f"{best['distance_km']:.1f} km away - stall {stall_name(best)} ({best['max_power_kw']:g} kW)"
+            + (f" and {count - 1} more." if count > 1 else ".")
+        )
+    return " ".join(sentences)
+
+
+def load_chargers(path):
+    """Charger records from a .parquet, .csv or .jsonl export"""
+    import pandas as pd
+
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    if path.endswith(".csv"):
+        return pd.read_csv(path)
+    return pd.read_json(path, lines=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the nearest Available stalls")
+    parser.add_argument("path", help="Charger export (.parquet, .csv or .jsonl)")
+    parser.add_argument("--charger", help="Search around this charger")
+    parser.add_argument("--site", help="Search around this site")
+    parser.add_argument("--lat", type=float)
+    parser.add_argument("--lon", type=float)
+    parser.add_argument("--connector")
+    parser.add_argument("--min-power-kw", type=float, default=0)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--bench", type=int, help="Time this many lookups around random chargers")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    locator = StallLocator(load_chargers(args.path))
+    print(f"Indexed {len(locator):,} chargers in {len(locator._cells):,} cells "
+          f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    if args.bench:
+        rng = np.random.default_rng(0)
+        picks = rng.integers(0, len(locator), args.bench)
+        timings = []
+        for i in picks:
+            t = time.perf_counter()
+            locator.nearest(locator.lats[i], locator.lons[i], k=args.k, connector=args.connector,
+                            min_power_kw=args.min_power_kw, max_per_site=2)
+            timings.append((time.perf_counter() - t) * 1000)
+        p50, p99 = np.percentile(timings, [50, 99])
+        print(f"{args.bench} lookups: p50 {p50:.2f} ms, p99 {p99:.2f} ms, max {max(timings):.2f} ms")
+        return
+
+    kwargs = dict(k=args.k, connector=args.connector, min_power_kw=args.min_power_kw)
+    if args.charger or args.site:
+        results = locator.near(args.charger, args.site, **kwargs)
+    else:
+        results = locator.nearest(args.lat, args.lon, **kwargs)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+from query_normalizer import canonicalize, similarity
+
+
+def test_numbers_are_kept_and_must_match():
+    a = canonicalize("ev stuck at 80 percent")
+    b = canonicalize("ev stuck at 20 percent")
+    assert a.key != b.key
+    assert similarity(a, b) == 0.0
+    assert canonicalize("ev stuck at 80%").key == a.key
+
+
+def test_charging_words_are_content():
+    assert canonicalize("car won't charge").tokens == {"charg", "not"}
+    assert canonicalize("car won't charge").key != canonicalize("car won't plug in").key
+
+
+def test_vehicle_model_is_not_an_error_code():
+    query = canonicalize("my F150 won't charge")
+    assert query.error_codes == ()
+    assert "f150" in query.tokens
+    assert canonicalize("charger shows E42").error_codes == ("E42",)
+
+
+def test_paraphrases_share_a_key():
+    keys = {canonicalize(query).key for query in
+            ["car won't plug in", "My car wont plug in!", "the car can't plug in"]}
+    assert len(keys) == 1
+
+
+def test_error_code_spellings():
+    for query in ["charger shows error E42", "what does error code e-42 mean", "error E 42 on the screen"]:
+        assert canonicalize(query).error_codes == ("E42",), query
+    assert canonicalize("err 0x1F").error_codes == ("0X1F",)
+    assert canonicalize("charger says code 503").error_codes == ("503",)
+
+
+def test_connectors_are_recognised_and_removed_from_tokens():
+    query = canonicalize("CCS2 cable won't unlock")
+    assert query.connectors == ("CCS",)
+    assert "ccs2" not in query.tokens
+    assert canonicalize("tesla plug stuck").connectors == ("NACS",)
+
+
+def test_hard_constraints_never_match():
+    assert similarity(canonicalize("screen is blank"), canonicalize("screen is not blank")) == 0.0
+    assert similarity(canonicalize("CCS plug stuck"), canonicalize("chademo plug stuck")) == 0.0
+    assert similarity(canonicalize("error E42"), canonicalize("error E43")) == 0.0
+
+
+def test_similarity_is_symmetric_and_bounded():
+    a = canonicalize("the CCS connector is stuck in my car")
+    b = canonicalize("CCS plug stuck on the car")
+    assert similarity(a, b) == similarity(b, a)
+    assert 0.0 <= similarity(a, b) <= 1.0
+    assert similarity(a, a) == 1.0
+
+
+def test_vectors_replace_token_scoring():
+    a, b = canonicalize("screen frozen"), canonicalize("display stuck")
+    assert similarity(a, b, vectors=([1.0, 0.0], [1.0, 0.0])) == 1.0
+    assert similarity(a, b, vectors=([1.0, 0.0], [0.0, 1.0])) == 0.0
@@ -0,0 +1,35 @@
+from search_cache import SearchCache, make_key
+from semantic_cache import SemanticCache
+
+
+def key(query):
+    return make_key(query, ["chunk"], limit=3)
+
+
+def test_paraphrase_is_an_exact_hit():
+    cache = SemanticCache(SearchCache(max_entries=10, ttl=60))
+    cache.put(key("car won't plug in"), ["plug"])
+    assert cache.get(key("my car wont plug in")) == ["plug"]
+    assert cache.stats()["exact_hits"] == 1
+
+
+def test_near_duplicate_is_served_above_threshold():
+    cache = SemanticCache(SearchCache(max_entries=10, ttl=60), threshold=0.7)
+    cache.put(key("charging stops at 80 percent"), ["80"])
+    assert cache.get(key("charging stuck at 80%")) == ["80"]
+    assert cache.get(key("charging stuck at 20%")) is None
+    assert cache.stats()["near_hits"] == 1
+
+
+def test_negated_query_is_not_served():
+    cache = SemanticCache(SearchCache(max_entries=10, ttl=60), threshold=0.0)
+    cache.put(key("screen is blank"), ["blank"])
+    assert cache.get(key("screen is not blank")) is None
+
+
+def test_candidates_are_bounded_by_the_inner_cache():
+    cache = SemanticCache(SearchCache(max_entries=3, ttl=60))
+    for i in range(10):
+        cache.put(key(f"question number {i} about payment"), [i])
+    assert len(cache._candidates) == 3
+    assert sum(len(group) for group in cache._groups.values()) == 3
@@ -0,0 +1,186 @@
+"""
+Turn tracing - timestamps realtime session events and turns them into
+per-turn latency spans
+
+A turn starts when server VAD reports the end of user speech and ends when
+the agent's audio finishes. For each turn we record:
+
+    first_token_ms   VAD end -> first transcript/text delta from the model
+    first_audio_ms   VAD end -> first audio chunk
+    audio_ms         first audio chunk -> audio end
+    total_ms         VAD end -> audio end
+    tools            name and duration of every tool_start -> tool_end
+
+Completed turns can be written as JSON lines and/or as Prometheus
+histograms (text exposition format, e.g. for the node_exporter textfile
+collector).
+"""
+import json
+import time
+from collections import Counter
+
+# Histogram bucket upper bounds in milliseconds
+DEFAULT_BUCKETS_MS = (50, 100, 250, 500, 750, 1000, 1500, 2000, 3000, 5000, 10000)
+
+SPAN_NAMES = ("first_token_ms", "first_audio_ms", "audio_ms", "total_ms", "tool_ms")
+
+
+def _raw_type(event):
+    """The underlying model/server event type for raw_model_event events"""
+    data = getattr(event, "data", None)
+    kind = getattr(data, "type", None)
+    if kind == "raw_server_event" and isinstance(data.data, dict):
+        return data.data.get("type")
+    return kind
+
+
+class LatencyHistograms:
+    """Cumulative Prometheus-style histograms, one per span name"""
+
+    def __init__(self, buckets_ms=DEFAULT_BUCKETS_MS, prefix="voice_agent_turn"):
+        self.buckets_ms = tuple(buckets_ms)
+        self.prefix = prefix
+        self._counts = {}
+        self._sums = {}
+
+    def observe(self, name, value_ms):
+        counts = self._counts.setdefault(name, [0] * (len(self.buckets_ms) + 1))
+        for i, bound in enumerate(self.buckets_ms):
+            if value_ms <= bound:
+                counts[i] += 1
+        counts[-1] += 1
+        self._sums[name] = self._sums.get(name, 0.0) + value_ms
+
+    def render(self):
+        lines = []
+        for name, counts in sorted(self._counts.items()):
+            metric = f"{self.prefix}_{name}"
+            lines.append(f"# TYPE {metric} histogram")
+            for bound, count in zip(self.buckets_ms, counts):
+                lines.append(f'{metric}_bucket{{le="{bound}"}} {count}')
+            lines.append(f'{metric}_bucket{{le="+Inf"}} {counts[-1]}')
+            lines.append(f"{metric}_sum {self._sums[name]:.3f}")
+            lines.append(f"{metric}_count {counts[-1]}")
+        return "\n".join(lines) + "\n"
+
+
+class TurnTracer:
+    """
+    Feed every session event to `observe()`. Finished turns are appended to
+    `turns`, written to `jsonl_path` and folded into the histograms, which
+    are rewritten to `prom_path` after each turn.
+    """
+
+    def __init__(self, jsonl_path=None, prom_path=None, log_events=False, clock=time.perf_counter):
+        self.jsonl_path = jsonl_path
+        self.prom_path = prom_path
+        self.log_events = log_events
+        self.clock = clock
+        self.histograms = LatencyHistograms()
+        self.event_counts = Counter()
+        self.turns = []
+
+        self._turn = None
+        self._open_tools = {}
+        self._jsonl = open(jsonl_path, "a") if jsonl_path else None
+
+    def _start_turn(self, now, trigger):
+        self._turn = {
+            "turn": len(self.turns) + 1,
+            "trigger": trigger,
+            "started_at": now,
+            "first_token_at": None,
+            "first_audio_at": None,
+            "audio_end_at": None,
+            "tools": [],
+        }
+        self._open_tools = {}
+
+    def observe(self, event):
+        now = self.clock()
+        kind = event.type
+        if kind == "raw_model_event":
+            kind = f"raw:{_raw_type(event)}"
+        self.event_counts[kind] += 1
+        if self.log_events and self._jsonl:
+            self._write({"event": kind, "t": now})
+
+        if kind == "raw:input_audio_buffer.speech_stopped":
+            self._start_turn(now, "vad_end")
+        elif kind == "raw:turn_started" and self._turn is None:
+            # No VAD end seen (e.g. text input) - time from the response start
+            self._start_turn(now, "response_start")
+
+        turn = self._turn
+        if turn is None:
+            return
+
+        if kind in ("raw:transcript_delta", "raw:output_text_delta"):
+            if turn["first_token_at"] is None:
+                turn["first_token_at"] = now
+        elif kind == "audio":
+            if turn["first_audio_at"] is None:
+                turn["first_audio_at"] = now
+        elif kind == "tool_start":
+            self._open_tools.setdefault(event.tool.name, []).append(now)
+        elif kind == "tool_end":
+            starts = self._open_tools.get(event.tool.name)
+            if starts:
+                started = starts.pop(0)
+                turn["tools"].append({"name": event.tool.name, "ms": (now - started) * 1000})
+        elif kind in ("audio_end", "audio_interrupted"):
+            turn["audio_end_at"] = now
+            if kind == "audio_interrupted":
+                turn["interrupted"] = True
+            self._finish_turn()
+
+    def _finish_turn(self):
+        turn = self._turn
+        self._turn = None
+        start = turn["started_at"]
+
+        def span(a, b):
+            return (b - a) * 1000 if a is not None and b is not None else None
+
+        record = {
+            "turn": turn["turn"],
+            "trigger": turn["trigger"],
+            "interrupted": turn.get("interrupted", False),
+            "first_token_ms": span(start, turn["first_token_at"]),
+            "first_audio_ms": span(start, turn["first_audio_at"]),
+            "audio_ms": span(turn["first_audio_at"], turn["audio_end_at"]),
+            "total_ms": span(start, turn["audio_end_at"]),
+            "tools": turn["tools"],
+        }
+        self.turns.append(record)
+
+        for name in SPAN_NAMES[:-1]:
+            if record[name] is not None:
+                self.histograms.observe(name, record[name])
+        for tool in record["tools"]:
+            self.histograms.observe("tool_ms", tool["ms"])
+
+        if self._jsonl:
+            self._write(record)
+        if self.prom_path:
+            with open(self.prom_path, "w") as f:
+                f.write(self.histograms.render())
+
+    def _write(self, record):
+        self._jsonl.write(json.dumps(record) + "\n")
+        self._jsonl.flush()
+
+    def summary(self):
+        """Median of each span over the finished turns"""
+        summary = {"turns": len(self.turns)}
+        for name in SPAN_NAMES[:-1]:
+            values = sorted(t[name] for t in self.turns if t[name] is not None)
+            summary[f"median_{name}"] = values[len(values) // 2] if values else None
+        tool_values = sorted(tool["ms"] for t in self.turns for tool in t["tools"])
+        summary["median_tool_ms"] = tool_values[len(tool_values) // 2] if tool_values else None
+        return summary
+
+    def close(self):
+        if self._jsonl:
+            self._jsonl.close()
+            self._jsonl = None
@@ -2,28 +2,223 @@
 """
 Vapi Tool Server - Handles custom tool calls from Vapi
 """
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 import json
 import os
-from snowflake.core import Root
-from snowflake.snowpark import Session
+import threading
+from itertools import islice
+from cortex_response import iter_results, json_fragment, search_raw
+from local_index import ReloadingIndex
+from search_cache import SearchCache, make_key
+from search_race import SearchRace
+from semantic_cache import DEFAULT_THRESHOLD, SemanticCache
+from snowflake_config import CONNECTION_PARAMETERS
+from snowflake_pool import SnowflakeSessionPool
+from stall_locator import StallLocator, StatusEventTail, describe_stalls, load_chargers
 
 app = Flask(__name__)
 
-# Snowflake connection parameters
-CONNECTION_PARAMETERS = {
-    "account": "TFLNRNC-FXB95084",
-    "user": "ATKSINGH",
-    "password": os.environ.get("SNOWFLAKE_PASSWORD"),
-    "role": "ACCOUNTADMIN",
-    "database": "cortext_search_db",
-    "warehouse": "CORTEXT_SEARCH_WH",
-    "schema": "PUBLIC",
-}
-
-def get_snowflake_session():
-    """Get Snowflake session"""
-    return Session.builder.configs(CONNECTION_PARAMETERS).create()
+# Shared session pool - sessions are warmed at startup and reused across tool calls
+session_pool = SnowflakeSessionPool(
+    CONNECTION_PARAMETERS,
+    size=int(os.environ.get("SNOWFLAKE_POOL_SIZE", "4")),
+    max_age=int(os.environ.get("SNOWFLAKE_SESSION_MAX_AGE", "3600")),
+)
+# Seconds between refreshes of idle pooled sessions, so they are renewed before
+# they expire rather than on a caller's request
+SNOWFLAKE_KEEPALIVE_SECONDS = int(os.environ.get("SNOWFLAKE_KEEPALIVE_SECONDS", "60"))
+
+# Cortex Search results, keyed on canonical query + columns + filter + limit;
+# paraphrases scoring SEARCH_CACHE_SIMILARITY or more share an entry
+search_cache = SemanticCache(
+    SearchCache(
+        max_entries=int(os.environ.get("SEARCH_CACHE_SIZE", "512")),
+        ttl=int(os.environ.get("SEARCH_CACHE_TTL", "300")),
+    ),
+    threshold=float(os.environ.get("SEARCH_CACHE_SIMILARITY", DEFAULT_THRESHOLD)),
+)
+
+# Local BM25 copy of the service's chunks (exported with local_index.py). When
+# it's configured, Cortex Search gets CORTEX_BUDGET_MS to answer before the
+# local index answers instead.
+LOCAL_INDEX_PATH = os.environ.get("LOCAL_INDEX_PATH")
+local_index = ReloadingIndex(LOCAL_INDEX_PATH, text_column="DOCUMENT_CONTENTS") if LOCAL_INDEX_PATH else None
+search_race = SearchRace(
+    budget_ms=int(os.environ.get("CORTEX_BUDGET_MS", "800")),
+    workers=session_pool.size,
+)
+
+# Charger export (.parquet/.csv/.jsonl with the CHARGERS columns) behind
+# find_nearest_stall, kept current from the dashboard's status events file
+CHARGERS_PATH = os.environ.get("CHARGERS_PATH")
+stall_locator = StallLocator(load_chargers(CHARGERS_PATH)) if CHARGERS_PATH else None
+STATUS_FEED_PATH = os.environ.get("CHARGER_STATUS_FEED_PATH")
+status_tail = StatusEventTail(STATUS_FEED_PATH, stall_locator) if stall_locator and STATUS_FEED_PATH else None
+NEAREST_STALLS = 4
+STALLS_PER_SITE = 2
+
+EV_INFO_COLUMNS = ["DOCUMENT_CONTENTS", "LIKES"]
+EV_INFO_LIMIT = 3
+# Results read out to the caller, and how much of each one
+EV_INFO_SPOKEN = 2
+EV_INFO_SNIPPET_CHARS = 200
+# Upper bound on the "result" text handed back to Vapi
+MAX_RESULT_CHARS = int(os.environ.get("TOOL_RESULT_MAX_CHARS", "1000"))
+
+def format_ev_info(rows):
+    # Rows are trimmed as they're read, so only snippets are kept and cached
+    return [
+        {
+            "content": (row.get("DOCUMENT_CONTENTS") or "")[:EV_INFO_SNIPPET_CHARS],
+            "relevance": row.get("LIKES", 0),
+        }
+        for row in islice(rows, EV_INFO_LIMIT)
+    ]
+
+def search_ev_info(query):
+    """Run the Cortex Search for an EV question and return formatted results"""
+    # Borrow a warm session and search for EV information
+    with session_pool.checkout() as pooled:
+        # Replace with your actual service details
+        my_service = pooled.search_service("YOUR_DB", "YOUR_SCHEMA", "YOUR_SERVICE")
+        body = search_raw(my_service, query, EV_INFO_COLUMNS, limit=EV_INFO_LIMIT)
+
+    # Rows are decoded lazily, so the ones past the limit never are
+    return format_ev_info(iter_results(body))
+
+def local_ev_info(query):
+    """Answer an EV question from the local index"""
+    return format_ev_info(local_index.search(query, EV_INFO_COLUMNS, limit=EV_INFO_LIMIT))
+
+# Framework-agnostic tool bodies, shared by the Flask app and the ASGI app
+# in vapi_tool_server_asgi.py
+
+def ev_info_key(query):
+    return make_key(query, EV_INFO_COLUMNS, limit=EV_INFO_LIMIT)
+
+def ev_info_results(query, check_cache=True):
+    """
+    Snippets for an EV question and the source that answered: cache, cortex
+    or local. Callers that already missed the cache pass check_cache=False.
+    """
+    key = ev_info_key(query)
+    if check_cache:
+        results = search_cache.get(key)
+        if results is not None:
+            return results, "cache"
+
+    results, source = search_race.run(
+        lambda: search_ev_info(query),
+        (lambda: local_ev_info(query)) if local_index is not None else None,
+        # A Cortex answer that arrives after the budget still warms the cache
+        on_late=lambda late: search_cache.put(key, late),
+    )
+    # Local answers are a stopgap; don't let them displace a Cortex answer
+    if source == search_race.primary:
+        search_cache.put(key, results)
+    return results, source
+
+def ev_info_parts(query, results):
+    """Pieces of the spoken answer, cut off once MAX_RESULT_CHARS is reached"""
+    budget = MAX_RESULT_CHARS
+    parts = [f"Found {len(results)} results for '{query}': "] + [
+        (" " if i else "") + r["content"] + "..." for i, r in enumerate(results[:EV_INFO_SPOKEN])
+    ]
+    for part in parts:
+        if budget <= 0:
+            return
+        yield part[:budget]
+        budget -= len(part)
+
+def ev_info_response(query, results, source):
+    # Format response for Vapi
+    return {"result": "".join(ev_info_parts(query, results)), "source": source}
+
+def ev_info_result(query, check_cache=True):
+    """Build the Vapi tool response for an EV question"""
+    return ev_info_response(query, *ev_info_results(query, check_cache))
+
+def cached_ev_info_result(query):
+    """ev_info_result's response if the answer is cached, else None; never touches Snowflake"""
+    results = search_cache.get(ev_info_key(query))
+    return ev_info_response(query, results, "cache") if results is not None else None
+
+def ev_info_chunks(query):
+    """
+    The same response as ev_info_result as JSON text chunks, for chunked
+    transfer - the opening is sent before the search runs
+    """
+    yield '{"result": "'
+    try:
+        results, source = ev_info_results(query)
+    except Exception as e:
+        # Headers are already out, so report the failure in the body
+        yield f'", "error": "{json_fragment(str(e))}"}}'
+        return
+    for part in ev_info_parts(query, results):
+        yield json_fragment(part)
+    yield f'", "source": "{source}"}}'
+
+def nearest_stall_result(params):
+    """
+    Build the Vapi tool response for find_nearest_stall: free stalls near the
+    caller's stall, station or coordinates, matching connector and power
+    """
+    if stall_locator is None:
+        raise LookupError("Stall locations are not loaded (set CHARGERS_PATH)")
+    if status_tail is not None:
+        status_tail.poll()
+
+    stall, station = params.get('stall'), params.get('station')
+    connector = params.get('connector')
+    options = dict(
+        k=NEAREST_STALLS,
+        connector=connector,
+        min_power_kw=float(params.get('min_power_kw') or 0),
+        max_per_site=STALLS_PER_SITE,
+    )
+    if stall or station:
+        stalls = stall_locator.near(stall, station, **options)
+        site_id = station or stall_locator.site_of(stall)
+    elif params.get('lat') is not None and params.get('lon') is not None:
+        stalls = stall_locator.nearest(float(params['lat']), float(params['lon']), **options)
+        site_id = None
+    else:
+        raise ValueError("Pass a stall, a station or lat/lon")
+    return {"result": describe_stalls(stalls, site_id, connector), "stalls": stalls}
+
+def weather_result(location):
+    """Build the Vapi tool response for the example weather tool"""
+    # Simulate weather data (replace with actual weather API)
+    weather_data = {
+        "location": location,
+        "temperature": "72°F",
+        "condition": "Sunny",
+        "humidity": "45%"
+    }
+
+    return {
+        "result": f"Weather in {location}: {weather_data['temperature']}, {weather_data['condition']}"
+    }
+
+# Tool-call payloads are appended here when set, for replay with bench_tool_server.py
+RECORD_PATH = os.environ.get("TOOL_CALL_RECORD_PATH")
+_record_lock = threading.Lock()
+
+def record_call(path, body):
+    """Append one tool call to RECORD_PATH as a JSON line"""
+    if RECORD_PATH:
+        with _record_lock, open(RECORD_PATH, "a") as f:
+            f.write(json.dumps({"method": "POST", "path": path, "body": body}) + "\n")
+
+def health_result():
+    return {
+        "status": "healthy",
+        "pool": session_pool.metrics(),
+        "cache": search_cache.stats(),
+        "search": search_race.stats(),
+        "stalls": stall_locator.stats() if stall_locator is not None else None,
+    }
 
 @app.route('/tools/get_ev_info', methods=['POST'])
 def get_ev_info():
@@ -32,38 +227,26 @@ def get_ev_info():
     """
     try:
         data = request.get_json()
+        record_call(request.path, data)
         query = data.get('parameters', {}).get('query', '')
-        
-        # Connect to Snowflake and search for EV information
-        session = get_snowflake_session()
-        root = Root(session)
-        
-        # Replace with your actual service details
-        my_service = (
-            root.databases["YOUR_DB"]
-                .schemas["YOUR_SCHEMA"] 
-                .cortex_search_services["YOUR_SERVICE"]
-        )
-        
-        resp = my_service.search(
-            query=query,
-            columns=["DOCUMENT_CONTENTS", "LIKES"],
-            limit=3
-        )
-        
-        # Format response for Vapi
-        results = []
-        for row in resp.to_pandas().to_dict('records'):
-            results.append({
-                "content": row.get("DOCUMENT_CONTENTS", ""),
-                "relevance": row.get("LIKES", 0)
-            })
-        
-        return jsonify({
-            "result": f"Found {len(results)} results for '{query}': " + 
-                     " ".join([r["content"][:200] + "..." for r in results[:2]])
-        })
-        
+        # ?stream=1 sends the answer with chunked transfer encoding
+        if request.args.get('stream'):
+            return Response(stream_with_context(ev_info_chunks(query)), mimetype='application/json')
+        return jsonify(ev_info_result(query))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/tools/find_nearest_stall', methods=['POST'])
+def find_nearest_stall():
+    """
+    Nearest Available stalls with the caller's connector and power
+    """
+    try:
+        data = request.get_json()
+        record_call(request.path, data)
+        return jsonify(nearest_stall_result(data.get('parameters', {})))
+    except KeyError as e:
+        return jsonify({"error": e.args[0]}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -74,33 +257,60 @@ def get_weather():
     """
     try:
         data = request.get_json()
+        record_call(request.path, data)
         location = data.get('parameters', {}).get('location', '')
-        
-        # Simulate weather data (replace with actual weather API)
-        weather_data = {
-            "location": location,
-            "temperature": "72°F",
-            "condition": "Sunny",
-            "humidity": "45%"
-        }
-        
-        return jsonify({
-            "result": f"Weather in {location}: {weather_data['temperature']}, {weather_data['condition']}"
-        })
-        
+        return jsonify(weather_result(location))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({"status": "healthy"})
+    return jsonify(health_result())
+
+@app.route('/health/pool', methods=['GET'])
+def pool_metrics():
+    """Snowflake session pool metrics (checkouts, wait time, reconnects)"""
+    return jsonify(session_pool.metrics())
+
+@app.route('/health/cache', methods=['GET'])
+def cache_stats():
+    """Search result cache counters (hits, misses, evictions)"""
+    return jsonify(search_cache.stats())
+
+@app.route('/health/search', methods=['GET'])
+def search_stats():
+    """Which source answered (cortex/local), timeouts and the fallback rate"""
+    return jsonify(search_race.stats())
+
+@app.route('/cache/invalidate', methods=['POST'])
+def invalidate_cache():
+    """
+    Drop cached search results - one query if given, otherwise everything
+    """
+    data = request.get_json(silent=True) or {}
+    removed = search_cache.invalidate(data.get('query'))
+    return jsonify({"invalidated": removed})
 
 if __name__ == '__main__':
     print("Starting Vapi Tool Server...")
     print("Available tools:")
     print("- /tools/get_ev_info - Search for EV information")
+    print("- /tools/find_nearest_stall - Nearest available stalls")
     print("- /tools/get_weather - Get weather information")
     print("- /health - Health check")
-    
-    app.run(host='0.0.0.0', port=3000, debug=True)
+    print("- /health/pool - Snowflake session pool metrics")
+    print("- /health/cache - Search cache metrics")
+    print("- /health/search - Cortex/local fallback metrics")
+    print("- /cache/invalidate - Drop cached search results")
+
+    try:
+        warmed = session_pool.warm()
+        print(f"Warmed {warmed} Snowflake session(s)")
+    except Exception as e:
+        print(f"Could not warm Snowflake sessions, will connect on demand: {e}")
+    session_pool.start_keepalive(SNOWFLAKE_KEEPALIVE_SECONDS)
+
+    # FLASK_DEBUG=1 turns on the debugger; the reloader stays off either way,
+    # since it would fork a second process and warm a second pool
+    app.run(host='0.0.0.0', port=3000, debug=os.environ.get("FLASK_DEBUG") == "1", use_reloader=False)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Vapi Tool Server (ASGI) - async serving mode for the tool server
+
+Same routes as vapi_tool_server.py, but served by uvicorn. Blocking Snowflake
+work runs on a bounded thread pool, so one event loop keeps many tool calls
+in flight instead of queueing them behind each other.
+
+    pip install starlette uvicorn
+    python vapi_tool_server_asgi.py --workers 4
+"""
+import argparse
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from vapi_tool_server import (
+    SNOWFLAKE_KEEPALIVE_SECONDS,
+    cached_ev_info_result,
+    ev_info_chunks,
+    ev_info_result,
+    health_result,
+    nearest_stall_result,
+    record_call,
+    search_cache,
+    search_race,
+    session_pool,
+    weather_result,
+)
+
+# Threads beyond the pool size would only wait on a session checkout
+SNOWFLAKE_THREADS = int(os.environ.get("SNOWFLAKE_THREADS", str(session_pool.size)))
+
+executor = ThreadPoolExecutor(max_workers=SNOWFLAKE_THREADS, thread_name_prefix="snowflake")
+
+async def run_blocking(func, *args):
+    """Run a blocking Snowflake call on the executor without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, func, *args)
+
+async def _chunks_on_executor(query):
+    # Step the blocking chunk generator on the Snowflake executor
+    chunks = ev_info_chunks(query)
+    while True:
+        chunk = await run_blocking(next, chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+async def _parameters(request):
+    data = await request.json()
+    record_call(request.url.path, data)
+    return data.get('parameters', {})
+
+async def get_ev_info(request: Request):
+    """
+    Custom tool to get electric vehicle information from Snowflake
+    """
+    try:
+        query = (await _parameters(request)).get('query', '')
+        # ?stream=1 sends the answer with chunked transfer encoding
+        if request.query_params.get('stream'):
+            return StreamingResponse(_chunks_on_executor(query), media_type='application/json')
+        # Cache hits are answered on the event loop instead of queueing
+        # behind slow Cortex searches for an executor thread
+        cached = cached_ev_info_result(query)
+        if cached is not None:
+            return JSONResponse(cached)
+        return JSONResponse(await run_blocking(ev_info_result, query, False))
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+async def find_nearest_stall(request: Request):
+    """
+    Nearest Available stalls with the caller's connector and power
+    """
+    try:
+        # Polls the status events file, so it runs off the event loop
+        return JSONResponse(await run_blocking(nearest_stall_result, await _parameters(request)))
+    except KeyError as e:
+        return JSONResponse({"error": e.args[0]}, status_code=404)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+async def get_weather(request: Request):
+    """
+    Example weather tool
+    """
+    try:
+        location = (await _parameters(request)).get('location', '')
+        return JSONResponse(weather_result(location))
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+async def health_check(request: Request):
+    """Health check endpoint"""
+    return JSONResponse(health_result())
+
+async def pool_metrics(request: Request):
+    """Snowflake session pool metrics (checkouts, wait time, reconnects)"""
+    return JSONResponse(session_pool.metrics())
+
+async def cache_stats(request: Request):
+    """Search result cache counters (hits, misses, evictions)"""
+    return JSONResponse(search_cache.stats())
+
+async def search_stats(request: Request):
+    """Which source answered (cortex/local), timeouts and the fallback rate"""
+    return JSONResponse(search_race.stats())
+
+async def invalidate_cache(request: Request):
+    """
+    Drop cached search results - one query if given, otherwise everything
+    """
+    try:
+        data = await request.json()
+    except ValueError:
+        data = {}
+    removed = search_cache.invalidate((data or {}).get('query'))
+    return JSONResponse({"invalidated": removed})
+
+def log(message):
+    # stderr, so the server can run inside tools that print JSON on stdout
+    print(message, file=sys.stderr)
+
+@asynccontextmanager
+async def lifespan(app):
+    try:
+        warmed = await run_blocking(session_pool.warm)
+        log(f"Warmed {warmed} Snowflake session(s)")
+    except Exception as e:
+        log(f"Could not warm Snowflake sessions, will connect on demand: {e}")
+    session_pool.start_keepalive(SNOWFLAKE_KEEPALIVE_SECONDS)
+    yield
+    # uvicorn has stopped accepting connections and drained in-flight
+    # requests (up to --graceful-timeout) by the time we get here
+    log("Shutting down: waiting for Snowflake calls to finish...")
+    executor.shutdown(wait=True)
+    search_race.close()
+    session_pool.close()
+
+app = Starlette(
+    routes=[
+        Route('/tools/get_ev_info', get_ev_info, methods=['POST']),
+        Route('/tools/find_nearest_stall', find_nearest_stall, methods=['POST']),
+        Route('/tools/get_weather', get_weather, methods=['POST']),
+        Route('/health', health_check, methods=['GET']),
+        Route('/health/pool', pool_metrics, methods=['GET']),
+        Route('/health/cache', cache_stats, methods=['GET']),
+        Route('/health/search', search_stats, methods=['GET']),
+        Route('/cache/invalidate', invalidate_cache, methods=['POST']),
+    ],
+    lifespan=lifespan,
+)
+
+if __name__ == '__main__':
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the Vapi tool server in async mode")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=3000)
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("TOOL_SERVER_WORKERS", "1")),
+                        help="Worker processes, each with its own event loop and session pool")
+    parser.add_argument("--graceful-timeout", type=int, default=30,
+                        help="Seconds to let in-flight tool calls finish on shutdown")
+    args = parser.parse_args()
+
+    print(f"Starting Vapi Tool Server (async, {args.workers} worker(s))...")
+    uvicorn.run(
+        "vapi_tool_server_asgi:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_graceful_shutdown=args.graceful_timeout,
+    )